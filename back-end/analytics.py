@@ -0,0 +1,225 @@
+"""Artist time-series analytics over columnar NumPy arrays.
+
+The whole ArtistStats history is loaded once into artist x month matrices
+(NaN where an artist has no row for a month). Month-over-month price change,
+rolling averages, momentum and volatility are then computed for every artist
+at once with array operations and kept until the game clock moves or the TTL
+runs out, so the endpoints only slice precomputed matrices.
+"""
+import threading
+import time
+import warnings
+
+import numpy as np
+
+ROLLING_WINDOW = 3
+MOMENTUM_MONTHS = 3
+VOLATILITY_WINDOW = 6
+
+
+def period_ordinal(month, year):
+    return year * 12 + (month - 1)
+
+
+def _shifted_ratio(values, months):
+    # values[:, t] / values[:, t - months] - 1, NaN where either side is missing or zero
+    out = np.full(values.shape, np.nan, dtype=np.float32)
+    if values.shape[1] > months:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = values[:, months:] / values[:, :-months] - 1
+        ratio[~np.isfinite(ratio)] = np.nan
+        out[:, months:] = ratio
+    return out
+
+
+def _rolling(values, window, reducer):
+    # Trailing window ending at each month; months without a full window stay NaN
+    out = np.full(values.shape, np.nan, dtype=np.float32)
+    if values.shape[1] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=1)
+        # All-NaN windows legitimately reduce to NaN; silence NumPy's "empty slice" warning
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            out[:, window - 1:] = reducer(windows, axis=-1)
+    return out
+
+
+class StatsHistory:
+    def __init__(self, artist_ids, first_period, price, popularity, listeners):
+        self.artist_ids = artist_ids
+        self.first_period = first_period
+        self.price = price
+        self.popularity = popularity
+        self.listeners = listeners
+        self.loaded_at = time.monotonic()
+
+        # Derived matrices, every artist at once
+        self.price_change = np.full(price.shape, np.nan, dtype=np.float32)
+        self.price_change[:, 1:] = price[:, 1:] - price[:, :-1]
+        self.price_change_pct = _shifted_ratio(price, 1)
+        self.rolling_price = _rolling(price, ROLLING_WINDOW, np.nanmean)
+        self.momentum = _shifted_ratio(price, MOMENTUM_MONTHS)
+        self.volatility = _rolling(self.price_change_pct, VOLATILITY_WINDOW, np.nanstd)
+
+    @property
+    def months(self):
+        return self.price.shape[1]
+
+    def column(self, month, year):
+        index = period_ordinal(month, year) - self.first_period
+        return index if 0 <= index < self.months else None
+
+    def row(self, artist_id):
+        index = np.searchsorted(self.artist_ids, artist_id)
+        if index < len(self.artist_ids) and self.artist_ids[index] == artist_id:
+            return int(index)
+        return None
+
+
+def load_history(connection, batch_size=50000):
+    # Imported here like columnar.py, so the matrix code has no MySQLdb dependency
+    import MySQLdb.cursors
+
+    # Unbuffered, tuple rows: a buffered DictCursor holds the whole history in
+    # Python objects however small the fetchmany batches. Bounds, artists and
+    # stats are read from one snapshot, so every stats row fits the matrices.
+    cursor = connection.cursor(MySQLdb.cursors.SSCursor)
+    try:
+        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+        # An unbuffered result must be read to the end before the next statement
+        cursor.execute("SELECT MIN(year * 12 + month - 1), MAX(year * 12 + month - 1) FROM ArtistStats")
+        first, last = cursor.fetchall()[0]
+        cursor.execute("SELECT artistId FROM Artist ORDER BY artistId")
+        artist_ids = np.fromiter((row[0] for row in cursor.fetchall()), dtype=np.int64)
+
+        if first is None:
+            connection.commit()
+            empty = np.empty((len(artist_ids), 0))
+            return StatsHistory(artist_ids, 0, empty, empty.copy(), empty.copy())
+
+        # Raw stats stay float64 (listener counts overflow float32's exact range);
+        # the derived matrices are float32
+        first, last = int(first), int(last)
+        shape = (len(artist_ids), last - first + 1)
+        price = np.full(shape, np.nan)
+        popularity = np.full(shape, np.nan)
+        listeners = np.full(shape, np.nan)
+
+        cursor.execute("""
+            SELECT artistId, year * 12 + month - 1 AS period, price, popularity, listeners
+            FROM ArtistStats
+        """)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            batch = np.array(rows, dtype=np.float64)
+            r = np.searchsorted(artist_ids, batch[:, 0].astype(np.int64))
+            c = batch[:, 1].astype(np.int64) - first
+            price[r, c] = batch[:, 2]
+            popularity[r, c] = batch[:, 3]
+            listeners[r, c] = batch[:, 4]
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return StatsHistory(artist_ids, first, price, popularity, listeners)
+
+
+def _value(x):
+    return None if np.isnan(x) else round(float(x), 4)
+
+
+class Analytics:
+    def __init__(self, ttl=300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Held for the whole load, so only one request per process scans ArtistStats
+        self._loading = threading.Lock()
+        self._history = None
+        self._version = None
+
+    def _current(self, version):
+        # Under self._lock: the stored history if it is at least `version` and within the TTL
+        history = self._history
+        if (history is not None and self._version >= version
+                and time.monotonic() - history.loaded_at < self.ttl):
+            return history
+        return None
+
+    def history(self, cursor, version):
+        with self._lock:
+            history = self._current(version)
+            previous = self._history
+        if history is not None:
+            return history
+
+        # While another request reloads, serve what is already in memory rather
+        # than queue behind it; only the very first load makes callers wait
+        if not self._loading.acquire(blocking=previous is None):
+            return previous
+        try:
+            with self._lock:
+                history = self._current(version)
+            if history is not None:
+                return history
+
+            history = load_history(cursor.connection)
+            with self._lock:
+                # A load for an older clock version never replaces a newer one
+                if self._version is None or version >= self._version:
+                    self._history, self._version = history, version
+            return history
+        finally:
+            self._loading.release()
+
+    def top_movers(self, history, month, year, limit=10, direction='up'):
+        column = history.column(month, year)
+        if column is None:
+            return []
+
+        change = history.price_change_pct[:, column]
+        valid = np.flatnonzero(~np.isnan(change))
+        if not len(valid):
+            return []
+
+        keyed = -change[valid] if direction == 'up' else change[valid]
+        limit = min(limit, len(valid))
+        top = valid[np.argpartition(keyed, limit - 1)[:limit]]
+        top = top[np.argsort(-change[top] if direction == 'up' else change[top], kind='stable')]
+
+        return [{
+            "artistId": int(history.artist_ids[i]),
+            "price": _value(history.price[i, column]),
+            "priceChange": _value(history.price_change[i, column]),
+            "priceChangePct": _value(change[i] * 100),
+            "momentum": _value(history.momentum[i, column]),
+            "volatility": _value(history.volatility[i, column]),
+        } for i in top]
+
+    def trend(self, history, artist_id, month, year, months=12):
+        row = history.row(artist_id)
+        if row is None:
+            return None
+        # Never show months past the current game month, even if they are already loaded
+        end = min(period_ordinal(month, year) - history.first_period, history.months - 1)
+        start = max(0, end - months + 1)
+
+        points = []
+        for column in range(start, end + 1):
+            period = history.first_period + column
+            points.append({
+                "month": period % 12 + 1,
+                "year": period // 12,
+                "price": _value(history.price[row, column]),
+                "popularity": _value(history.popularity[row, column]),
+                "listeners": _value(history.listeners[row, column]),
+                "priceChange": _value(history.price_change[row, column]),
+                "rollingPrice": _value(history.rolling_price[row, column]),
+                "momentum": _value(history.momentum[row, column]),
+                "volatility": _value(history.volatility[row, column]),
+            })
+        return points
@@ -1,44 +1,210 @@
-from flask import Flask, request, jsonify
-from flask_mysqldb import MySQL
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
 import os
+import time
+import MySQLdb
 from config import Config
+from db import PooledMySQL, PoolTimeout, connect
+from game_clock import GameClock
+from artist_index import ArtistIndex
+from settlement import settle
+from standings import StandingsIndex, LeagueNotFound
+from trades import apply_trade, purchase_artist, TradeError
+from analytics import Analytics
+from listing import parse_list_args, ListArgsError, fetch_page, stream_rows
+from metrics import Metrics, RequestStats
+from auth import Auth, AuthError
+from queries import Queries
+from jobs import JobRunner, JobAborted
+from events import EventBroker, TooManySubscribers
 
 app = Flask(__name__)
 app.config.from_object(Config) 
-CORS(app) 
+CORS(app, expose_headers=['X-Next-Offset', 'X-Next-After', 'X-Last-Write']) 
 
-mysql = MySQL(app)
+metrics = Metrics(slow_query_seconds=Config.SLOW_QUERY_SECONDS)
+mysql = PooledMySQL(app, metrics=metrics)
+queries = Queries(prepare=Config.MYSQL_PREPARE_STATEMENTS)
+game_clock = GameClock(ttl=Config.GAME_CLOCK_TTL)
+artist_index = ArtistIndex(sync_ttl=Config.ARTIST_INDEX_SYNC_TTL)
+standings_index = StandingsIndex(ttl=Config.STANDINGS_TTL)
+analytics = Analytics(ttl=Config.ANALYTICS_TTL)
+auth = Auth(
+    Config.SECRET_KEY,
+    token_ttl=Config.SESSION_TOKEN_TTL,
+    hash_iterations=Config.PASSWORD_HASH_ITERATIONS,
+    required=Config.AUTH_REQUIRED
+)
+job_runner = JobRunner(
+    Config,
+    workers=Config.JOB_WORKERS,
+    max_running=Config.JOB_MAX_RUNNING,
+    max_attempts=Config.JOB_MAX_ATTEMPTS,
+    poll_seconds=Config.JOB_POLL_SECONDS,
+    stale_seconds=Config.JOB_STALE_SECONDS,
+    retry_seconds=Config.JOB_RETRY_SECONDS
+)
+event_broker = EventBroker(
+    lambda: connect(Config),
+    standings_index,
+    buffer_size=Config.EVENTS_BUFFER_SIZE,
+    poll_seconds=Config.EVENTS_POLL_SECONDS,
+    heartbeat_seconds=Config.EVENTS_HEARTBEAT_SECONDS,
+    max_subscribers=Config.EVENTS_MAX_SUBSCRIBERS
+)
+
+@app.before_first_request
+def build_artist_index():
+    artist_index.ensure(mysql.cache_cursor())
+
+@app.before_first_request
+def start_job_workers():
+    job_runner.start()
+
+@app.before_first_request
+def start_clock_watcher():
+    game_clock.watch(lambda: connect(Config), Config.GAME_CLOCK_POLL_SECONDS)
 
 from calendar import month_name
 
+@app.before_request
+def start_request_metrics():
+    g._request_started = time.perf_counter()
+    g._request_stats = RequestStats(request.endpoint or 'unmatched')
+
+@app.after_request
+def record_response_status(response):
+    g._response_status = response.status_code
+    return response
+
+@app.teardown_request
+def record_request_metrics(exception):
+    # Runs after a streamed body has been sent, so streamed rows are counted too
+    started = g.pop('_request_started', None)
+    if started is None:
+        return
+    request_stats = g.pop('_request_stats', None)
+    status = g.pop('_response_status', 500 if exception else 200)
+    metrics.observe_request(
+        request.endpoint or 'unmatched', request.method, status,
+        time.perf_counter() - started, request_stats
+    )
+
+@app.errorhandler(PoolTimeout)
+def pool_exhausted(e):
+    return jsonify({"error": str(e)}), 503
+
+@app.errorhandler(TooManySubscribers)
+def too_many_subscribers(e):
+    return jsonify({"error": str(e)}), 503
+
+@app.errorhandler(AuthError)
+def auth_failed(e):
+    return jsonify({"error": str(e)}), e.status
+
+@app.errorhandler(ListArgsError)
+def bad_list_args(e):
+    return jsonify({"error": str(e)}), 400
+
+def wants_background(data=None):
+    # ?background=1 on any verb, or "background": true in a JSON body
+    return request.args.get('background') == '1' or bool(data and data.get('background'))
+
+def authorize_roster(roster_id):
+    # Without a token (and with AUTH_REQUIRED off) there is no one to check against;
+    # a missing roster is left for the handler to report
+    session = auth.acting_player()
+    if session is None:
+        return
+    cursor = mysql.connection.cursor()
+    try:
+        roster = queries.one(cursor, 'roster', (roster_id,))
+    finally:
+        cursor.close()
+    if roster and str(roster['playerId']) != str(session.player_id):
+        raise AuthError("Session does not belong to this roster's player", 403)
+
+def authorize_advance():
+    # Moving the clock settles every league: admins and league owners only
+    session = auth.acting_player()
+    if session is None or session.player_id in Config.ADMIN_PLAYER_IDS:
+        return
+    cursor = mysql.connection.cursor()
+    try:
+        owned = queries.one(cursor, 'league_owned_by', (session.player_id,))
+    finally:
+        cursor.close()
+    if not owned:
+        raise AuthError("Only an admin or a league owner can advance the game", 403)
+
+def queue_job(kind, params, message):
+    job_id = job_runner.submit(mysql.connection, kind, params)
+    return jsonify({
+        "message": message,
+        "jobId": job_id,
+        "status": "queued"
+    }), 202
+
+def list_response(list_args, select, key, key_name, where=(), params=()):
+    # Streamed NDJSON/JSON from a server-side cursor, or one keyset page
+    if list_args.stream:
+        return stream_rows(mysql.connection, select, key, list_args, where, params)
+    
+    cursor = mysql.connection.cursor()
+    try:
+        rows, next_after = fetch_page(cursor, select, key, key_name, list_args, where, params)
+    finally:
+        cursor.close()
+    
+    response = jsonify(rows)
+    if next_after is not None:
+        response.headers['X-Next-After'] = str(next_after)
+    return response
+
+@app.route('/api/pool-stats', methods=['GET'])
+def get_pool_stats():
+    return jsonify(mysql.stats())
+
+@app.route('/api/query-stats', methods=['GET'])
+def get_query_stats():
+    return jsonify(queries.stats())
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(mysql.stats()), mimetype='text/plain; version=0.0.4')
+
+# How many ranked artist ids are priced per query while filling a search page
+SEARCH_CHUNK_SIZE = 200
+
 @app.route('/api/current-date', methods=['GET'])
 def get_current_date():
-    cursor = mysql.connection.cursor()
     try:
-        cursor.execute("SELECT current_month, current_year FROM GameSettings WHERE id = 1")
-        settings = cursor.fetchone()
+        settings = game_clock.get(mysql.cache_cursor())
         
         if not settings:
-            # Initialize if first time
+            # Initialize if first time; a GET may be reading from a replica, the insert goes to the primary
             current_month, current_year = 1, 2024
-            cursor.execute(
-                "INSERT INTO GameSettings (id, current_month, current_year) VALUES (1, %s, %s)",
-                (current_month, current_year)
-            )
-            mysql.connection.commit()
-        else:
-            current_month, current_year = settings['current_month'], settings['current_year']
+            primary_cursor = mysql.primary.cursor()
+            try:
+                primary_cursor.execute(
+                    "INSERT INTO GameSettings (id, current_month, current_year) VALUES (1, %s, %s)",
+                    (current_month, current_year)
+                )
+                mysql.primary.commit()
+            finally:
+                primary_cursor.close()
+            settings = game_clock.set(current_month, current_year, 0)
+        
+        current_month, current_year = settings['current_month'], settings['current_year']
         
         return jsonify({
             "month": current_month,
             "year": current_year,
-            "month_name": month_name[current_month]
+            "month_name": month_name[current_month],
+            "version": settings['version']
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        cursor.close()
 
 
 @app.route('/api/create_player', methods=['POST'])
@@ -53,14 +219,13 @@ def create_player():
     
     cursor = mysql.connection.cursor()
     
-    cursor.execute("SELECT * FROM Player WHERE username = %s", (username,))
-    existing_user = cursor.fetchone()
+    existing_user = queries.one(cursor, 'player_by_username', (username,))
     if existing_user:
         return jsonify({"error": "Username already exists"}), 409
     
     cursor.execute(
         "INSERT INTO Player (playerName, username, password) VALUES (%s, %s, %s)",
-        (player_name, username, password)
+        (player_name, username, auth.hash(password))
     )
     mysql.connection.commit()
     
@@ -69,7 +234,8 @@ def create_player():
     
     return jsonify({
         "message": "Player account created successfully!",
-        "playerId": player_id
+        "playerId": player_id,
+        "token": auth.issue({"playerId": player_id, "playerName": player_name})
     })
 
 @app.route('/api/login', methods=['POST'])
@@ -82,21 +248,32 @@ def login():
         return jsonify({"error": "Username and password are required"}), 400
     
     cursor = mysql.connection.cursor()
-    cursor.execute("SELECT playerId, playerName, username FROM Player WHERE username = %s AND password = %s", 
-                 (username, password))
-    player = cursor.fetchone()
-    cursor.close()
+    try:
+        player = queries.one(cursor, 'player_login', (username,))
+        
+        matches, needs_rehash = auth.check(password, player.pop('password')) if player else (False, False)
+        if not matches:
+            return jsonify({"error": "Invalid username or password"}), 401
+        
+        if needs_rehash:
+            # Plaintext or weaker hash from before: upgrade it now that we know the password
+            queries.execute(cursor, 'player_password', (auth.hash(password), player['playerId']))
+            mysql.connection.commit()
+    finally:
+        cursor.close()
     
-    if player:
-        return jsonify({
-            "message": "Login successful",
-            "player": player
-        })
-    else:
-        return jsonify({"error": "Invalid username or password"}), 401
+    return jsonify({
+        "message": "Login successful",
+        "player": player,
+        "token": auth.issue(player)
+    })
 
 @app.route('/api/get_players', methods=['GET'])
 def get_players():
+    list_args = parse_list_args(request.args)
+    if not list_args.legacy:
+        return list_response(list_args, "SELECT playerId, playerName, username FROM Player", "playerId", "playerId")
+    
     cursor = mysql.connection.cursor()
     cursor.execute("SELECT playerId, playerName, username FROM Player")
     players = cursor.fetchall()
@@ -105,13 +282,17 @@ def get_players():
 
 @app.route('/api/delete_player/<int:player_id>', methods=['DELETE'])
 def delete_player(player_id):
+    auth.acting_player(player_id)
     cursor = mysql.connection.cursor()
-    cursor.execute("SELECT * FROM Player WHERE playerId = %s", (player_id,))
-    player = cursor.fetchone()
+    player = queries.one(cursor, 'player', (player_id,))
     
     if not player:
         return jsonify({"error": "Player not found"}), 404
     
+    if wants_background():
+        cursor.close()
+        return queue_job('delete_player', {"playerId": player_id}, "Player deletion queued")
+    
     try:
         cursor.execute("START TRANSACTION")
     
@@ -123,11 +304,12 @@ def delete_player(player_id):
         
         cursor.execute("DELETE FROM Roster WHERE playerId = %s", (player_id,))
         
-        cursor.execute("UPDATE League SET ownerId = NULL WHERE ownerId = %s", (player_id,))
+        queries.execute(cursor, 'league_clear_owner', (player_id,))
         
-        cursor.execute("DELETE FROM Player WHERE playerId = %s", (player_id,))
+        queries.execute(cursor, 'player_delete', (player_id,))
         
         mysql.connection.commit()
+        standings_index.drop_player(player_id)
     except Exception as e:
         mysql.connection.rollback()
         return jsonify({"error": str(e)}), 500
@@ -144,28 +326,34 @@ def update_password(player_id):
     if not new_password:
         return jsonify({"error": "New password is required"}), 400
 
+    auth.acting_player(player_id)
     cursor = mysql.connection.cursor()
-    cursor.execute("SELECT * FROM Player WHERE playerId = %s", (player_id,))
-    player = cursor.fetchone()
-
-    if not player:
-        return jsonify({"error": "Player not found"}), 404
     
-    cursor.execute("UPDATE Player SET password = %s WHERE playerId = %s", (new_password, player_id))
+    # No row changed means no such player, even when a token vouched for one
+    if not queries.execute(cursor, 'player_password', (auth.hash(new_password), player_id)).rowcount:
+        mysql.connection.rollback()
+        cursor.close()
+        return jsonify({"error": "Player not found"}), 404
     mysql.connection.commit()
     cursor.close()
 
     return jsonify({"message": "Password updated successfully!"})
 
 
+LEAGUE_LIST_QUERY = """
+    SELECT l.leagueId, l.leagueName, l.playerCount, l.ownerId, p.playerName as ownerName
+    FROM League l
+    LEFT JOIN Player p ON l.ownerId = p.playerId
+"""
+
 @app.route('/api/leagues', methods=['GET'])
 def get_leagues():
+    list_args = parse_list_args(request.args)
+    if not list_args.legacy:
+        return list_response(list_args, LEAGUE_LIST_QUERY, "l.leagueId", "leagueId")
+    
     cursor = mysql.connection.cursor()
-    cursor.execute("""
-        SELECT l.leagueId, l.leagueName, l.playerCount, l.ownerId, p.playerName as ownerName
-        FROM League l
-        LEFT JOIN Player p ON l.ownerId = p.playerId
-    """)
+    cursor.execute(LEAGUE_LIST_QUERY)
     leagues = cursor.fetchall()
     cursor.close()
     return jsonify(leagues)
@@ -173,13 +361,7 @@ def get_leagues():
 @app.route('/api/leagues/<int:league_id>', methods=['GET'])
 def get_league(league_id):
     cursor = mysql.connection.cursor()
-    cursor.execute("""
-        SELECT l.leagueId, l.leagueName, l.playerCount, l.ownerId, p.playerName as ownerName
-        FROM League l
-        LEFT JOIN Player p ON l.ownerId = p.playerId
-        WHERE l.leagueId = %s
-    """, (league_id,))
-    league = cursor.fetchone()
+    league = queries.one(cursor, 'league_detail', (league_id,))
     
     if not league:
         return jsonify({"error": "League not found"}), 404
@@ -187,6 +369,9 @@ def get_league(league_id):
     cursor.close()
     return jsonify(league)
 
+# MySQL error for an insert whose foreign key points at a missing row
+FOREIGN_KEY_MISSING = 1452
+
 @app.route('/api/leagues', methods=['POST'])
 def create_league():
     data = request.json
@@ -196,11 +381,12 @@ def create_league():
     if not league_name:
         return jsonify({"error": "League name is required"}), 400
     
+    auth.acting_player(owner_id)
     cursor = mysql.connection.cursor()
     
     if owner_id:
-        cursor.execute("SELECT * FROM Player WHERE playerId = %s", (owner_id,))
-        owner = cursor.fetchone()
+        # Looked up even with a token: a token outlives the player it was issued to
+        owner = queries.one(cursor, 'player', (owner_id,))
         if not owner:
             cursor.close()
             return jsonify({"error": "Owner not found"}), 404
@@ -218,14 +404,17 @@ def create_league():
         # If there's an owner, create a roster for them
         if owner_id:
             default_roster_name = f"{owner['playerName']}'s Roster"
-            default_budget = 2000
+            default_budget = Config.ROSTER_STARTING_BUDGET
             
-            cursor.execute(
-                "INSERT INTO Roster (rosterName, budget, points, playerId, leagueId) VALUES (%s, %s, %s, %s, %s)",
-                (default_roster_name, default_budget, 0, owner_id, league_id)
-            )
+            queries.execute(cursor, 'roster_insert', (default_roster_name, default_budget, 0, owner_id, league_id))
         
         mysql.connection.commit()
+    except MySQLdb.IntegrityError as e:
+        mysql.connection.rollback()
+        if e.args and e.args[0] == FOREIGN_KEY_MISSING:
+            # The owner was deleted between the lookup and the insert
+            return jsonify({"error": "Owner not found"}), 404
+        return jsonify({"error": str(e)}), 500
     except Exception as e:
         mysql.connection.rollback()
         return jsonify({"error": str(e)}), 500
@@ -240,7 +429,8 @@ def create_league():
 @app.route('/api/leagues/<int:league_id>/join', methods=['POST'])
 def join_league(league_id):
     data = request.json
-    player_id = data.get('playerId')
+    session = auth.acting_player(data.get('playerId'))
+    player_id = session.player_id if session else data.get('playerId')
     
     if not player_id:
         return jsonify({"error": "Player ID is required"}), 400
@@ -251,36 +441,31 @@ def join_league(league_id):
         cursor.execute("START TRANSACTION")
         
         # Check if league exists
-        cursor.execute("SELECT * FROM League WHERE leagueId = %s", (league_id,))
-        league = cursor.fetchone()
+        league = queries.one(cursor, 'league', (league_id,))
         if not league:
             return jsonify({"error": "League not found"}), 404
         
-        # Check if player exists
-        cursor.execute("SELECT * FROM Player WHERE playerId = %s", (player_id,))
-        player = cursor.fetchone()
+        # Check if player exists; a token outlives the player it was issued to
+        player = queries.one(cursor, 'player', (player_id,))
         if not player:
             return jsonify({"error": "Player not found"}), 404
         
         # Check if player already has a roster in this league
-        cursor.execute("SELECT * FROM Roster WHERE playerId = %s AND leagueId = %s", (player_id, league_id))
-        existing_roster = cursor.fetchone()
+        existing_roster = queries.one(cursor, 'roster_in_league', (player_id, league_id))
         if existing_roster:
             return jsonify({"error": "Player already has a roster in this league"}), 409
         
         # Create roster for the player
         default_roster_name = f"{player['playerName']}'s Roster"
-        default_budget = 2000 
+        default_budget = Config.ROSTER_STARTING_BUDGET
         
-        cursor.execute(
-            "INSERT INTO Roster (rosterName, budget, points, playerId, leagueId) VALUES (%s, %s, %s, %s, %s)",
-            (default_roster_name, default_budget, 0, player_id, league_id)
-        )
+        queries.execute(cursor, 'roster_insert', (default_roster_name, default_budget, 0, player_id, league_id))
         
         # Update league player count
-        cursor.execute("UPDATE League SET playerCount = playerCount + 1 WHERE leagueId = %s", (league_id,))
+        queries.execute(cursor, 'league_join', (league_id,))
         
         mysql.connection.commit()
+        standings_index.drop_league(league_id)
         
         return jsonify({
             "message": "Successfully joined the league and roster created!",
@@ -296,7 +481,8 @@ def join_league(league_id):
 @app.route('/api/leagues/<int:league_id>/leave', methods=['POST'])
 def leave_league(league_id):
     data = request.json
-    player_id = data.get('playerId')
+    session = auth.acting_player(data.get('playerId'))
+    player_id = session.player_id if session else data.get('playerId')
     
     if not player_id:
         return jsonify({"error": "Player ID is required"}), 400
@@ -307,19 +493,24 @@ def leave_league(league_id):
         cursor.execute("START TRANSACTION")
         
         # Check if league exists
-        cursor.execute("SELECT * FROM League WHERE leagueId = %s", (league_id,))
-        league = cursor.fetchone()
+        league = queries.one(cursor, 'league', (league_id,))
         if not league:
             return jsonify({"error": "League not found"}), 404
         
         # Check if player is in the league
-        cursor.execute("SELECT * FROM Roster WHERE playerId = %s AND leagueId = %s", (player_id, league_id))
-        rosters = cursor.fetchall()
+        rosters = queries.all(cursor, 'roster_in_league', (player_id, league_id))
         
         if not rosters:
             return jsonify({"error": "Player is not in this league"}), 404
         
         # If the player is the owner, delete all rosters in the league
+        if league['ownerId'] == player_id and wants_background(data):
+            # Every roster in the league goes; do it in committed chunks off the request
+            mysql.connection.rollback()
+            return queue_job(
+                'leave_league', {"leagueId": league_id, "playerId": player_id}, "League removal queued"
+            )
+        
         if league['ownerId'] == player_id:
             # Delete all roster members in the league
             cursor.execute("""
@@ -332,20 +523,13 @@ def leave_league(league_id):
             cursor.execute("DELETE FROM Roster WHERE leagueId = %s", (league_id,))
             
             # If there are other players, transfer ownership to the first player
-            cursor.execute("""
-                SELECT r.playerId 
-                FROM Roster r 
-                WHERE r.leagueId = %s 
-                LIMIT 1
-            """, (league_id,))
-            new_owner = cursor.fetchone()
+            new_owner = queries.one(cursor, 'league_first_member', (league_id,))
             
             if new_owner:
-                cursor.execute("UPDATE League SET ownerId = %s WHERE leagueId = %s", 
-                             (new_owner['playerId'], league_id))
+                queries.execute(cursor, 'league_set_owner', (new_owner['playerId'], league_id))
             else:
                 # If no players remain, delete the league
-                cursor.execute("DELETE FROM League WHERE leagueId = %s", (league_id,))
+                queries.execute(cursor, 'league_delete', (league_id,))
         else:
             # If the player is not the owner, delete only their rosters
             cursor.execute("""
@@ -358,9 +542,10 @@ def leave_league(league_id):
                          (player_id, league_id))
         
         # Update league player count
-        cursor.execute("UPDATE League SET playerCount = playerCount - 1 WHERE leagueId = %s", (league_id,))
+        queries.execute(cursor, 'league_leave', (league_id,))
         
         mysql.connection.commit()
+        standings_index.drop_league(league_id)
         
         return jsonify({"message": "Successfully left the league!"})
         
@@ -370,38 +555,82 @@ def leave_league(league_id):
     finally:
         cursor.close()
 
+def clock_version():
+    settings = game_clock.get(mysql.cache_cursor())
+    return settings['version'] if settings else None
+
 @app.route('/api/standings/<int:league_id>', methods=['GET'])
 def get_standings(league_id):
-    cursor = mysql.connection.cursor()
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if offset < 0 or (limit is not None and limit < 1):
+        return jsonify({"error": "offset must be >= 0 and limit positive"}), 400
     
     try:
-        # Verify league exists
-        cursor.execute("SELECT * FROM League WHERE leagueId = %s", (league_id,))
-        league = cursor.fetchone()
-        if not league:
-            return jsonify({"error": "League not found"}), 404
+        # Served from the in-memory standings tree; the first read of a league loads it
+        standings = standings_index.query(mysql.cache_cursor(), league_id, clock_version(), 'top', limit, offset)
         
-        # Get current standings with points
-        cursor.execute("""
-            SELECT 
-                p.playerId,
-                p.playerName,
-                r.points,
-                r.rosterId
-            FROM Roster r
-            JOIN Player p ON r.playerId = p.playerId
-            WHERE r.leagueId = %s
-            ORDER BY r.points DESC
-        """, (league_id,))
+        return jsonify(standings)
         
-        standings = cursor.fetchall()
+    except LeagueNotFound:
+        return jsonify({"error": "League not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/standings/<int:league_id>/players/<int:player_id>', methods=['GET'])
+def get_player_standing(league_id, player_id):
+    try:
+        standing = standings_index.query(mysql.cache_cursor(), league_id, clock_version(), 'player', player_id)
+        if not standing:
+            return jsonify({"error": "Player is not in this league"}), 404
+        
+        return jsonify(standing)
+        
+    except LeagueNotFound:
+        return jsonify({"error": "League not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/standings/<int:league_id>/players/<int:player_id>/around', methods=['GET'])
+def get_standings_around_player(league_id, player_id):
+    radius = request.args.get('radius', 2, type=int)
+    if not 0 <= radius <= 50:
+        return jsonify({"error": "radius must be between 0 and 50"}), 400
+    
+    try:
+        standings = standings_index.query(mysql.cache_cursor(), league_id, clock_version(), 'around', player_id, radius)
+        if standings is None:
+            return jsonify({"error": "Player is not in this league"}), 404
         
         return jsonify(standings)
         
+    except LeagueNotFound:
+        return jsonify({"error": "League not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@app.route('/api/events/leagues/<int:league_id>', methods=['GET'])
+def league_events(league_id):
+    cursor = mysql.connection.cursor()
+    try:
+        league = queries.one(cursor, 'league', (league_id,))
     finally:
         cursor.close()
+    
+    if not league:
+        return jsonify({"error": "League not found"}), 404
+    
+    # The pooled connection goes back at teardown; the open stream holds none
+    subscription = event_broker.subscribe(league_id)
+    return Response(
+        event_broker.stream(subscription),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/api/events/stats', methods=['GET'])
+def get_event_stats():
+    return jsonify(event_broker.stats())
 
 
 @app.route('/api/rosters', methods=['GET'])
@@ -411,6 +640,21 @@ def get_rosters():
     if not player_id:
         return jsonify({"error": "Player ID is required"}), 400
     
+    list_args = parse_list_args(request.args)
+    if not list_args.legacy:
+        # Paged and streamed lists follow rosterId, the only stable key here
+        return list_response(
+            list_args,
+            """
+            SELECT r.rosterId, r.rosterName, r.budget, r.points,
+                   r.playerId, r.leagueId, l.leagueName
+            FROM Roster r
+            JOIN League l ON r.leagueId = l.leagueId
+            """,
+            "r.rosterId", "rosterId",
+            where=["r.playerId = %s"], params=[player_id]
+        )
+    
     cursor = mysql.connection.cursor()
     
     try:
@@ -433,11 +677,99 @@ def get_rosters():
     finally:
         cursor.close()
 
+@app.route('/api/players/<int:player_id>/dashboard', methods=['GET'])
+def get_player_dashboard(player_id):
+    cursor = mysql.connection.cursor()
+    
+    try:
+        date_settings = game_clock.get(mysql.cache_cursor())
+        if not date_settings:
+            return jsonify({"error": "Game settings not initialized"}), 500
+        
+        current_month = date_settings['current_month']
+        current_year = date_settings['current_year']
+        
+        # Every roster of the player with its league rank, holdings priced at the
+        # current month and total holding value, in one statement. Rank is computed
+        # over every roster in the player's leagues, then narrowed to the player's own.
+        cursor.execute("""
+            SELECT
+                r.rosterId,
+                r.rosterName,
+                r.budget,
+                r.points,
+                r.leagueId,
+                l.leagueName,
+                ranked.leagueRank,
+                ranked.leagueSize,
+                CAST(COALESCE(SUM(s.price) OVER (PARTITION BY r.rosterId), 0) AS SIGNED) AS totalValue,
+                a.artistId,
+                a.artistName,
+                s.price,
+                s.listeners,
+                s.followers,
+                s.popularity
+            FROM (
+                SELECT rosterId,
+                       playerId,
+                       RANK() OVER (PARTITION BY leagueId ORDER BY points DESC) AS leagueRank,
+                       COUNT(*) OVER (PARTITION BY leagueId) AS leagueSize
+                FROM Roster
+                WHERE leagueId IN (SELECT leagueId FROM Roster WHERE playerId = %s)
+            ) ranked
+            JOIN Roster r ON r.rosterId = ranked.rosterId
+            JOIN League l ON l.leagueId = r.leagueId
+            LEFT JOIN (
+                RosterMember rm
+                JOIN Artist a ON a.artistId = rm.artistId
+                JOIN ArtistStats s ON s.artistId = rm.artistId AND s.month = %s AND s.year = %s
+            ) ON rm.rosterId = r.rosterId
+            WHERE ranked.playerId = %s
+            ORDER BY l.leagueName, r.rosterName, a.artistName
+        """, (player_id, current_month, current_year, player_id))
+        
+        rosters = {}
+        for row in cursor.fetchall():
+            roster = rosters.get(row['rosterId'])
+            if roster is None:
+                roster = rosters[row['rosterId']] = {
+                    key: row[key] for key in (
+                        'rosterId', 'rosterName', 'budget', 'points', 'leagueId',
+                        'leagueName', 'leagueRank', 'leagueSize', 'totalValue'
+                    )
+                }
+                roster['playerId'] = player_id
+                roster['artists'] = []
+            if row['artistId'] is not None:
+                roster['artists'].append({
+                    key: row[key] for key in (
+                        'artistId', 'artistName', 'price', 'listeners', 'followers', 'popularity'
+                    )
+                })
+        
+        if not rosters:
+            # Tell an unknown player apart from one who has not joined a league yet
+            if not queries.one(cursor, 'player', (player_id,)):
+                return jsonify({"error": "Player not found"}), 404
+        
+        return jsonify({
+            "playerId": player_id,
+            "month": current_month,
+            "year": current_year,
+            "rosters": list(rosters.values())
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+
 @app.route('/api/rosters', methods=['POST'])
 def create_roster():
     data = request.json
     roster_name = data.get('rosterName')
-    player_id = data.get('playerId')
+    session = auth.acting_player(data.get('playerId'))
+    player_id = session.player_id if session else data.get('playerId')
     league_id = data.get('leagueId')
     
     if not all([roster_name, player_id, league_id]):
@@ -445,36 +777,30 @@ def create_roster():
     
     cursor = mysql.connection.cursor()
     
-    cursor.execute("SELECT * FROM Player WHERE playerId = %s", (player_id,))
-    player = cursor.fetchone()
+    # Looked up even with a token: a token outlives the player it was issued to
+    player = queries.one(cursor, 'player', (player_id,))
     if not player:
         return jsonify({"error": "Player not found"}), 404
     
-    cursor.execute("SELECT * FROM League WHERE leagueId = %s", (league_id,))
-    league = cursor.fetchone()
+    league = queries.one(cursor, 'league', (league_id,))
     if not league:
         return jsonify({"error": "League not found"}), 404
     
-    cursor.execute("SELECT * FROM Roster WHERE playerId = %s AND leagueId = %s", (player_id, league_id))
-    existing_roster = cursor.fetchone()
+    existing_roster = queries.one(cursor, 'roster_in_league', (player_id, league_id))
     if existing_roster:
         return jsonify({"error": "Player already has a roster in this league"}), 409
     
-    default_budget = 2000 
-    cursor.execute(
-        "INSERT INTO Roster (rosterName, budget, points, playerId, leagueId) VALUES (%s, %s, %s, %s, %s)",
-        (roster_name, default_budget, 0, player_id, league_id)
-    )
+    default_budget = Config.ROSTER_STARTING_BUDGET
+    queries.execute(cursor, 'roster_insert', (roster_name, default_budget, 0, player_id, league_id))
     mysql.connection.commit()
+    standings_index.drop_league(league_id)
     
     roster_id = cursor.lastrowid
     
-    cursor.execute("SELECT COUNT(*) as roster_count FROM Roster WHERE playerId = %s AND leagueId = %s", 
-                 (player_id, league_id))
-    roster_count = cursor.fetchone()['roster_count']
+    roster_count = queries.one(cursor, 'roster_count_in_league', (player_id, league_id))['roster_count']
     
     if roster_count == 1:
-        cursor.execute("UPDATE League SET playerCount = playerCount + 1 WHERE leagueId = %s", (league_id,))
+        queries.execute(cursor, 'league_join', (league_id,))
         mysql.connection.commit()
     
     cursor.close()
@@ -488,16 +814,7 @@ def create_roster():
 def get_roster(roster_id):
     cursor = mysql.connection.cursor()
     
-    cursor.execute("""
-        SELECT r.rosterId, r.rosterName, r.budget, r.points, r.playerId, r.leagueId,
-               p.playerName, l.leagueName
-        FROM Roster r
-        JOIN Player p ON r.playerId = p.playerId
-        JOIN League l ON r.leagueId = l.leagueId
-        WHERE r.rosterId = %s
-    """, (roster_id,))
-    
-    roster = cursor.fetchone()
+    roster = queries.one(cursor, 'roster_detail', (roster_id,))
     
     if not roster:
         return jsonify({"error": "Roster not found"}), 404
@@ -510,12 +827,13 @@ def get_roster(roster_id):
 def delete_roster(roster_id):
     cursor = mysql.connection.cursor()
     
-    cursor.execute("SELECT * FROM Roster WHERE rosterId = %s", (roster_id,))
-    roster = cursor.fetchone()
+    roster = queries.one(cursor, 'roster', (roster_id,))
     
     if not roster:
         return jsonify({"error": "Roster not found"}), 404
     
+    auth.acting_player(roster['playerId'])
+    
     try:
         cursor.execute("START TRANSACTION")
         
@@ -523,21 +841,20 @@ def delete_roster(roster_id):
         
         cursor.execute("DELETE FROM Roster WHERE rosterId = %s", (roster_id,))
         
-        cursor.execute("SELECT COUNT(*) as roster_count FROM Roster WHERE playerId = %s AND leagueId = %s", 
-                     (roster['playerId'], roster['leagueId']))
-        roster_count = cursor.fetchone()['roster_count']
+        roster_count = queries.one(
+            cursor, 'roster_count_in_league', (roster['playerId'], roster['leagueId'])
+        )['roster_count']
         
         if roster_count == 0:
-            cursor.execute("UPDATE League SET playerCount = playerCount - 1 WHERE leagueId = %s", 
-                         (roster['leagueId'],))
+            queries.execute(cursor, 'league_leave', (roster['leagueId'],))
             
-            cursor.execute("SELECT playerCount FROM League WHERE leagueId = %s", (roster['leagueId'],))
-            player_count = cursor.fetchone()['playerCount']
+            player_count = queries.one(cursor, 'league_player_count', (roster['leagueId'],))['playerCount']
             
             if player_count <= 0:
-                cursor.execute("DELETE FROM League WHERE leagueId = %s", (roster['leagueId'],))
+                queries.execute(cursor, 'league_delete', (roster['leagueId'],))
         
         mysql.connection.commit()
+        standings_index.drop_league(roster['leagueId'])
     except Exception as e:
         mysql.connection.rollback()
         return jsonify({"error": str(e)}), 500
@@ -554,19 +871,112 @@ def search_artists():
     if not search_term or len(search_term) < 2:
         return jsonify({"error": "Search term must be at least 2 characters"}), 400
     
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', 15, type=int)
+    if offset < 0 or not 1 <= limit <= 100:
+        return jsonify({"error": "offset must be >= 0 and limit between 1 and 100"}), 400
+    
     cursor = mysql.connection.cursor()
     
     try:
         # First get the current game month/year
-        cursor.execute("SELECT current_month, current_year FROM GameSettings WHERE id = 1")
-        date_settings = cursor.fetchone()
+        date_settings = game_clock.get(mysql.cache_cursor())
+        if not date_settings:
+            return jsonify({"error": "Game settings not initialized"}), 500
+        
+        current_month = date_settings['current_month']
+        current_year = date_settings['current_year']
+        
+        # Rank matching names from the in-memory index instead of a LIKE '%term%' scan.
+        # Only artists with stats for the current month/year are listed, so widen the
+        # ranked window until the requested page (plus one look-ahead row) is filled
+        artist_index.ensure(mysql.cache_cursor())
+        wanted = offset + limit + 1
+        window = wanted
+        priced = 0
+        artists = []
+        while True:
+            ranked_ids = artist_index.search(search_term, window)
+            for start in range(priced, len(ranked_ids), SEARCH_CHUNK_SIZE):
+                chunk = ranked_ids[start:start + SEARCH_CHUNK_SIZE]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"""
+                    SELECT 
+                        a.artistId, 
+                        a.artistName, 
+                        s.price, 
+                        s.listeners, 
+                        s.followers, 
+                        s.popularity,
+                        s.month,
+                        s.year
+                    FROM Artist a
+                    JOIN ArtistStats s ON a.artistId = s.artistId
+                    WHERE a.artistId IN ({placeholders})
+                      AND s.month = %s
+                      AND s.year = %s
+                """, (*chunk, current_month, current_year))
+                
+                found = {row['artistId']: row for row in cursor.fetchall()}
+                artists.extend(found[artist_id] for artist_id in chunk if artist_id in found)
+            
+            if len(artists) >= wanted or len(ranked_ids) < window:
+                break
+            priced = len(ranked_ids)
+            window *= 2
+        
+        response = jsonify(artists[offset:offset + limit])
+        if len(artists) > offset + limit:
+            response.headers['X-Next-Offset'] = str(offset + limit)
+        return response
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+
+@app.route('/api/artists', methods=['POST'])
+def create_artist():
+    data = request.json
+    artist_name = data.get('artistName')
+    
+    if not artist_name:
+        return jsonify({"error": "Artist name is required"}), 400
+    
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute("INSERT INTO Artist (artistName) VALUES (%s)", (artist_name,))
+        mysql.connection.commit()
+        artist_id = cursor.lastrowid
+    except Exception as e:
+        mysql.connection.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+    
+    # Keep the search index in step without waiting for the next sync
+    artist_index.add(artist_id, artist_name)
+    
+    return jsonify({
+        "message": "Artist created successfully!",
+        "artistId": artist_id
+    })
+
+@app.route('/api/artists/<int:artist_id>', methods=['GET'])
+def get_artist(artist_id):
+    cursor = mysql.connection.cursor()
+    
+    try:
+        # Get current game month/year
+        date_settings = game_clock.get(mysql.cache_cursor())
         if not date_settings:
             return jsonify({"error": "Game settings not initialized"}), 500
         
         current_month = date_settings['current_month']
         current_year = date_settings['current_year']
         
-        # Search artists with stats for current month/year
+        # Get artist with current month's stats: a point read of the latest-stats
+        # snapshot, which only matches when the latest row is the current month
         cursor.execute("""
             SELECT 
                 a.artistId, 
@@ -578,69 +988,160 @@ def search_artists():
                 s.month,
                 s.year
             FROM Artist a
-            JOIN ArtistStats s ON a.artistId = s.artistId
-            WHERE a.artistName LIKE %s
+            JOIN ArtistLatestStats s ON a.artistId = s.artistId
+            WHERE a.artistId = %s
               AND s.month = %s
               AND s.year = %s
-            LIMIT 15
-        """, (f'%{search_term}%', current_month, current_year))
+        """, (artist_id, current_month, current_year))
         
-        artists = cursor.fetchall()
+        artist = cursor.fetchone()
         
-        return jsonify(artists)
+        if not artist:
+            return jsonify({"error": "Artist not found for current period"}), 404
+
+        # Share of all rosters holding the artist, from the maintained counters
+        ownership = queries.one(cursor, 'artist_owners', (artist_id,))
+        rosters = queries.one(cursor, 'roster_total')['rosters']
+        artist['owners'] = ownership['owners'] if ownership else 0
+        artist['ownedPct'] = owned_pct(artist['owners'], rosters)
+
+        return jsonify(artist)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
         cursor.close()
 
-@app.route('/api/artists/<int:artist_id>', methods=['GET'])
-def get_artist(artist_id):
-    cursor = mysql.connection.cursor()
+@app.route('/api/analytics/top-movers', methods=['GET'])
+def get_top_movers():
+    limit = request.args.get('limit', default=10, type=int)
+    direction = request.args.get('direction', default='up')
+    if not 1 <= limit <= 100:
+        return jsonify({"error": "limit must be between 1 and 100"}), 400
+    if direction not in ('up', 'down'):
+        return jsonify({"error": "direction must be 'up' or 'down'"}), 400
     
     try:
-        # Get current game month/year
-        cursor.execute("SELECT current_month, current_year FROM GameSettings WHERE id = 1")
-        date_settings = cursor.fetchone()
-        if not date_settings:
+        settings = game_clock.get(mysql.cache_cursor())
+        if not settings:
             return jsonify({"error": "Game settings not initialized"}), 500
         
-        current_month = date_settings['current_month']
-        current_year = date_settings['current_year']
-        
-        # Get artist with current month's stats
-        # Advanced #1
-        cursor.execute("""
-            SELECT 
-            a.artistId, 
-            a.artistName, 
-            s.price, 
-            s.listeners, 
-            s.followers, 
-            s.popularity,
-            s.month,
-            s.year
-        FROM Artist a
-        JOIN (
-            SELECT 
-                s.*,
-                RANK() OVER (PARTITION BY artistId ORDER BY year DESC, month DESC) as recency_rank
-            FROM ArtistStats s
-            WHERE s.artistId = %s
-        ) s ON a.artistId = s.artistId
-        WHERE a.artistId = %s
-        AND s.month = %s
-        AND s.year = %s
-        AND s.recency_rank = 1  -- Still gets same row as original
-    """, (artist_id, artist_id, current_month, current_year))
+        history = analytics.history(mysql.cache_cursor(), settings['version'])
+        movers = analytics.top_movers(
+            history, settings['current_month'], settings['current_year'], limit, direction
+        )
         
-        artist = cursor.fetchone()
+        if movers:
+            # The only query not served from memory, so the only one that takes a connection
+            ids = [mover['artistId'] for mover in movers]
+            cursor = mysql.connection.cursor()
+            try:
+                cursor.execute(
+                    f"SELECT artistId, artistName FROM Artist WHERE artistId IN ({', '.join(['%s'] * len(ids))})",
+                    ids
+                )
+                names = {row['artistId']: row['artistName'] for row in cursor.fetchall()}
+            finally:
+                cursor.close()
+            for mover in movers:
+                mover['artistName'] = names.get(mover['artistId'])
         
-        if not artist:
-            return jsonify({"error": "Artist not found for current period"}), 404
+        return jsonify({
+            "month": settings['current_month'],
+            "year": settings['current_year'],
+            "direction": direction,
+            "artists": movers
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analytics/artists/<int:artist_id>/trend', methods=['GET'])
+def get_artist_trend(artist_id):
+    months = request.args.get('months', default=12, type=int)
+    if not 1 <= months <= 120:
+        return jsonify({"error": "months must be between 1 and 120"}), 400
+    
+    try:
+        settings = game_clock.get(mysql.cache_cursor())
+        if not settings:
+            return jsonify({"error": "Game settings not initialized"}), 500
         
-        return jsonify(artist)
+        history = analytics.history(mysql.cache_cursor(), settings['version'])
+        points = analytics.trend(
+            history, artist_id, settings['current_month'], settings['current_year'], months
+        )
+        if points is None:
+            return jsonify({"error": "Artist not found"}), 404
         
+        return jsonify({"artistId": artist_id, "trend": points})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def owned_pct(owners, rosters):
+    return round(100.0 * owners / rosters, 2) if rosters else 0.0
+
+def ownership_leaderboard(rows, rosters):
+    # Artists tied on owners share a rank; the next distinct count skips past them
+    rank = 0
+    for position, row in enumerate(rows, start=1):
+        if position == 1 or row['owners'] != rows[position - 2]['owners']:
+            rank = position
+        row['rank'] = rank
+        row['ownedPct'] = owned_pct(row['owners'], rosters)
+    return rows
+
+@app.route('/api/artists/most-owned', methods=['GET'])
+def get_most_owned_artists():
+    limit = request.args.get('limit', default=10, type=int)
+    if not 1 <= limit <= 100:
+        return jsonify({"error": "limit must be between 1 and 100"}), 400
+
+    cursor = mysql.connection.cursor()
+    try:
+        settings = game_clock.get(mysql.cache_cursor())
+        if not settings:
+            return jsonify({"error": "Game settings not initialized"}), 500
+
+        rosters = queries.one(cursor, 'roster_total')['rosters']
+        artists = queries.all(cursor, 'most_owned', (limit,))
+
+        return jsonify({
+            "month": settings['current_month'],
+            "year": settings['current_year'],
+            "rosters": rosters,
+            "artists": ownership_leaderboard(list(artists), rosters)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+
+@app.route('/api/leagues/<int:league_id>/most-owned', methods=['GET'])
+def get_league_most_owned_artists(league_id):
+    limit = request.args.get('limit', default=10, type=int)
+    if not 1 <= limit <= 100:
+        return jsonify({"error": "limit must be between 1 and 100"}), 400
+
+    cursor = mysql.connection.cursor()
+    try:
+        settings = game_clock.get(mysql.cache_cursor())
+        if not settings:
+            return jsonify({"error": "Game settings not initialized"}), 500
+
+        league = queries.one(cursor, 'league', (league_id,))
+        if not league:
+            return jsonify({"error": "League not found"}), 404
+
+        rosters = queries.one(cursor, 'league_roster_total', (league_id,))['rosters']
+        artists = queries.all(cursor, 'league_most_owned', (league_id, limit))
+
+        return jsonify({
+            "leagueId": league_id,
+            "month": settings['current_month'],
+            "year": settings['current_year'],
+            "rosters": rosters,
+            "artists": ownership_leaderboard(list(artists), rosters)
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -651,8 +1152,7 @@ def get_roster_artists(roster_id):
     cursor = mysql.connection.cursor()
     
     # First get the current month/year
-    cursor.execute("SELECT current_month, current_year FROM GameSettings WHERE id = 1")
-    date_settings = cursor.fetchone()
+    date_settings = game_clock.get(mysql.cache_cursor())
     if not date_settings:
         cursor.close()
         return jsonify({"error": "Game settings not initialized"}), 500
@@ -661,8 +1161,7 @@ def get_roster_artists(roster_id):
     current_year = date_settings['current_year']
     
     # Verify roster exists
-    cursor.execute("SELECT * FROM Roster WHERE rosterId = %s", (roster_id,))
-    roster = cursor.fetchone()
+    roster = queries.one(cursor, 'roster', (roster_id,))
     if not roster:
         cursor.close()
         return jsonify({"error": "Roster not found"}), 404
@@ -710,79 +1209,59 @@ def add_artist_to_roster(roster_id):
     if not artist_id:
         return jsonify({"error": "Artist ID is required"}), 400
     
-    cursor = mysql.connection.cursor()
-    
-    cursor.execute("SELECT * FROM Roster WHERE rosterId = %s", (roster_id,))
-    roster = cursor.fetchone()
-    
-    if not roster:
-        return jsonify({"error": "Roster not found"}), 404
-    
-    cursor.execute("""
-        SELECT a.artistId, a.artistName, 
-               s.price, s.listeners, s.followers, s.popularity
-        FROM Artist a
-        JOIN ArtistStats s ON a.artistId = s.artistId
-        WHERE a.artistId = %s
-              AND s.month = (SELECT MAX(month) FROM ArtistStats WHERE artistId = a.artistId)
-              AND s.year = (SELECT MAX(year) FROM ArtistStats WHERE artistId = a.artistId AND month = s.month)
-    """, (artist_id,))
-    
-    artist = cursor.fetchone()
-    
-    if not artist:
-        return jsonify({"error": "Artist not found"}), 404
-    
-    cursor.execute("SELECT * FROM RosterMember WHERE rosterId = %s AND artistId = %s", 
-                 (roster_id, artist_id))
-    existing = cursor.fetchone()
-    
-    if existing:
-        return jsonify({"error": "Artist is already in the roster"}), 409
-    
-    if roster['budget'] < artist['price']:
-        return jsonify({"error": "Not enough budget to add this artist"}), 400
+    authorize_roster(roster_id)
     
+    # Existence, duplicate and budget checks all happen inside the one CALL
     try:
-        cursor.callproc('AddArtistToRoster', [roster_id, artist_id])
-        mysql.connection.commit()
+        purchase = purchase_artist(mysql.connection, roster_id, artist_id)
+    except TradeError as e:
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
-    cursor.close()
-    
     return jsonify({
         "message": "Artist added to roster successfully!",
         "artistId": artist_id,
-        "rosterId": roster_id
+        "rosterId": roster_id,
+        "price": purchase['price'],
+        "budget": purchase['budget']
+    })
+
+@app.route('/api/rosters/<int:roster_id>/artists', methods=['PATCH'])
+def trade_roster_artists(roster_id):
+    data = request.json or {}
+    authorize_roster(roster_id)
+    
+    try:
+        result = apply_trade(mysql.connection, roster_id, data.get('add', []), data.get('drop', []))
+    except TradeError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify({
+        "message": "Trade completed successfully!",
+        "rosterId": roster_id,
+        **result
     })
 
 @app.route('/api/rosters/<int:roster_id>/artists/<int:artist_id>', methods=['DELETE'])
 def remove_artist_from_roster(roster_id, artist_id):
     cursor = mysql.connection.cursor()
     
-    cursor.execute("SELECT * FROM Roster WHERE rosterId = %s", (roster_id,))
-    roster = cursor.fetchone()
+    roster = queries.one(cursor, 'roster', (roster_id,))
     
     if not roster:
         return jsonify({"error": "Roster not found"}), 404
     
-    cursor.execute("SELECT * FROM RosterMember WHERE rosterId = %s AND artistId = %s", 
-                 (roster_id, artist_id))
-    member = cursor.fetchone()
+    auth.acting_player(roster['playerId'])
+    
+    member = queries.one(cursor, 'roster_member', (roster_id, artist_id))
     
     if not member:
         return jsonify({"error": "Artist is not in the roster"}), 404
     
-    cursor.execute("""
-        SELECT s.price
-        FROM ArtistStats s
-        WHERE s.artistId = %s
-              AND s.month = (SELECT MAX(month) FROM ArtistStats WHERE artistId = s.artistId)
-              AND s.year = (SELECT MAX(year) FROM ArtistStats WHERE artistId = s.artistId AND month = s.month)
-    """, (artist_id,))
-    
-    artist_stats = cursor.fetchone()
+    artist_stats = queries.one(cursor, 'artist_latest_price', (artist_id,))
     
     try:
         cursor.callproc('RemoveArtistFromRoster', [roster_id, artist_id])
@@ -799,17 +1278,39 @@ def remove_artist_from_roster(roster_id, artist_id):
 
 @app.route('/api/advance-month', methods=['POST'])
 def advance_month():
+    data = request.get_json(silent=True) or {}
+    months = data.get('months', 1)
+    chunked = data.get('chunked', False)
+    
+    if not isinstance(months, int) or not 1 <= months <= 120:
+        return jsonify({"error": "months must be an integer between 1 and 120"}), 400
+    
+    authorize_advance()
+    
+    if wants_background(data):
+        return queue_advance_month(months, data.get('chunkSize', Config.SETTLEMENT_CHUNK_SIZE))
+    
+    if chunked or months > 1:
+        return advance_month_chunked(months, data.get('chunkSize', Config.SETTLEMENT_CHUNK_SIZE))
+    
     cursor = mysql.connection.cursor()
     try:
         cursor.execute("START TRANSACTION")
         
         # Get current date
-        cursor.execute("SELECT current_month, current_year FROM GameSettings WHERE id = 1 FOR UPDATE")
+        cursor.execute("SELECT current_month, current_year, version FROM GameSettings WHERE id = 1 FOR UPDATE")
         settings = cursor.fetchone()
         
         if not settings:
             raise Exception("Game settings not initialized")
         
+        # A half-finished chunked run must be resumed, not settled a second time. Runs
+        # register under the clock lock taken above, so none can appear after this check
+        cursor.execute("SELECT runId FROM SettlementRun WHERE status = 'running' LIMIT 1 FOR UPDATE")
+        if cursor.fetchone():
+            mysql.connection.rollback()
+            return jsonify({"error": "A chunked settlement is in progress; resume it with chunked=true"}), 409
+        
         current_month, current_year = settings['current_month'], settings['current_year']
         
         # Calculate next month
@@ -840,17 +1341,30 @@ def advance_month():
         
         # Update game date to next month
         cursor.execute(
-            "UPDATE GameSettings SET current_month = %s, current_year = %s WHERE id = 1",
+            "UPDATE GameSettings SET current_month = %s, current_year = %s, version = version + 1 WHERE id = 1",
             (next_month, next_year)
         )
         
         mysql.connection.commit()
         
+        # Drop the cached clock and seed it with the committed row so this worker
+        # serves the new month immediately; other workers catch up via the version
+        game_clock.invalidate()
+        game_clock.set(next_month, next_year, settings['version'] + 1)
+        
+        # Every roster may have moved; pull the new points into the leagues held in memory
+        try:
+            standings_index.refresh(cursor, settings['version'] + 1)
+        except Exception:
+            standings_index.invalidate()
+        event_broker.poke()
+        
         return jsonify({
             "message": f"Advanced to {month_name[next_month]} {next_year}",
             "month": next_month,
             "year": next_year,
-            "month_name": month_name[next_month]
+            "month_name": month_name[next_month],
+            "version": settings['version'] + 1
         })
         
     except Exception as e:
@@ -859,6 +1373,216 @@ def advance_month():
     finally:
         cursor.close()
 
+def advance_month_chunked(months, chunk_size):
+    if not isinstance(chunk_size, int) or chunk_size < 1:
+        return jsonify({"error": "chunkSize must be a positive integer"}), 400
+    
+    cursor = mysql.connection.cursor()
+    
+    def refresh_standings(lower, upper):
+        queries.execute(cursor, 'roster_points_range', (lower, upper))
+        standings_index.apply(cursor.fetchall())
+    
+    try:
+        result = settle(mysql.connection, months=months, chunk_size=chunk_size, on_chunk=refresh_standings)
+    except Exception as e:
+        standings_index.invalidate()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+    
+    return jsonify(settlement_summary(result))
+
+def settlement_summary(result):
+    settings = result['settings']
+    next_month, next_year = settings['current_month'], settings['current_year']
+    game_clock.invalidate()
+    game_clock.set(next_month, next_year, settings['version'])
+    standings_index.stamp(settings['version'])
+    event_broker.poke()
+    
+    return {
+        "message": f"Advanced to {month_name[next_month]} {next_year}",
+        "month": next_month,
+        "year": next_year,
+        "month_name": month_name[next_month],
+        "version": settings['version'],
+        "runId": result['runId'],
+        "resumed": result['resumed'],
+        "months": result['months'],
+        "rostersSettled": result['rostersSettled']
+    }
+
+def queue_advance_month(months, chunk_size):
+    if not isinstance(chunk_size, int) or chunk_size < 1:
+        return jsonify({"error": "chunkSize must be a positive integer"}), 400
+    
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute("SELECT version FROM GameSettings WHERE id = 1")
+        settings = cursor.fetchone()
+    finally:
+        cursor.close()
+    if not settings:
+        return jsonify({"error": "Game settings not initialized"}), 500
+    
+    # The job only advances from this clock version, so a retry after it finished is a no-op
+    return queue_job(
+        'advance_month',
+        {"months": months, "chunkSize": chunk_size, "fromVersion": settings['version']},
+        f"Advancing {months} month(s) queued"
+    )
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    cursor = mysql.connection.cursor()
+    try:
+        job = job_runner.get(cursor, job_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+    
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@job_runner.handler('advance_month')
+def advance_month_job(connection, params, progress):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT lastRosterId FROM SettlementRun WHERE status = 'running' LIMIT 1")
+        running = cursor.fetchone()
+        cursor.execute("SELECT version FROM GameSettings WHERE id = 1")
+        version = cursor.fetchone()['version']
+        if not running and version != params['fromVersion']:
+            # Already applied by an earlier attempt, or another advance got there first
+            connection.commit()
+            return {"skipped": True, "version": version}
+        
+        cursor.execute("SELECT COUNT(*) AS total FROM Roster")
+        total = cursor.fetchone()['total']
+        cursor.execute(
+            "SELECT COUNT(*) AS done FROM Roster WHERE rosterId <= %s",
+            (running['lastRosterId'] if running else 0,)
+        )
+        done = cursor.fetchone()['done']
+        connection.commit()
+        progress(done, total)
+        
+        def on_chunk(lower, upper):
+            nonlocal done
+            queries.execute(cursor, 'roster_points_range', (lower, upper))
+            rows = cursor.fetchall()
+            standings_index.apply(rows)
+            done += len(rows)
+            progress(done)
+        
+        try:
+            result = settle(
+                connection, months=params['months'], chunk_size=params['chunkSize'],
+                on_chunk=on_chunk, job_id=progress.job_id
+            )
+        except Exception:
+            standings_index.invalidate()
+            raise
+    finally:
+        cursor.close()
+    
+    summary = settlement_summary(result)
+    del summary['message']
+    
+    if result['jobId'] != progress.job_id:
+        # The run resumed above was another advance's; it has moved the clock,
+        # and this job only advances from the version it was queued against
+        if summary['version'] != params['fromVersion']:
+            raise JobAborted(
+                f"Finished settlement run {result['runId']} left by another advance, which moved the "
+                f"game clock from version {params['fromVersion']} to {summary['version']}; this job's "
+                f"advance was not applied, queue it again if another month is wanted"
+            )
+        return advance_month_job(connection, params, progress)
+    return summary
+
+def delete_rosters_in_chunks(connection, roster_ids, progress, done=0):
+    # Each chunk commits on its own so no lock is held across the whole operation
+    cursor = connection.cursor()
+    try:
+        for start in range(0, len(roster_ids), Config.JOB_DELETE_CHUNK_SIZE):
+            chunk = roster_ids[start:start + Config.JOB_DELETE_CHUNK_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute("START TRANSACTION")
+            cursor.execute(f"DELETE FROM RosterMember WHERE rosterId IN ({placeholders})", chunk)
+            cursor.execute(f"DELETE FROM Roster WHERE rosterId IN ({placeholders})", chunk)
+            connection.commit()
+            progress(done + start + len(chunk))
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+# Parent table of each Roster foreign key a job drains rosters by
+ROSTER_PARENTS = {'playerId': 'Player', 'leagueId': 'League'}
+
+def drain_rosters(connection, column, key, progress, finish):
+    """Delete every roster whose `column` is `key` in chunks, then run `finish(cursor)` in the
+    transaction that finds none left; returns how many rosters were deleted.
+
+    Rosters cascaded away by deleting their Player or League skip before_roster_delete and leave
+    the ArtistOwnership counters behind. The parent row is locked before the final check, so a
+    roster added after the last chunk (its foreign key check waits on that lock) is found and
+    deleted in another round instead.
+    """
+    parent = ROSTER_PARENTS[column]
+    deleted = 0
+    cursor = connection.cursor()
+    try:
+        while True:
+            cursor.execute("START TRANSACTION")
+            cursor.execute(f"SELECT {column} FROM {parent} WHERE {column} = %s FOR UPDATE", (key,))
+            cursor.execute(f"SELECT rosterId FROM Roster WHERE {column} = %s ORDER BY rosterId", (key,))
+            roster_ids = [row['rosterId'] for row in cursor.fetchall()]
+            if not roster_ids:
+                finish(cursor)
+                connection.commit()
+                return deleted
+            
+            # Let go of the parent row while the chunks run
+            connection.rollback()
+            progress(deleted, deleted + len(roster_ids) + 1)
+            delete_rosters_in_chunks(connection, roster_ids, progress, done=deleted)
+            deleted += len(roster_ids)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+@job_runner.handler('delete_player')
+def delete_player_job(connection, params, progress):
+    player_id = params['playerId']
+    
+    def finish(cursor):
+        queries.execute(cursor, 'league_clear_owner', (player_id,))
+        queries.execute(cursor, 'player_delete', (player_id,))
+    
+    deleted = drain_rosters(connection, 'playerId', player_id, progress, finish)
+    standings_index.drop_player(player_id)
+    return {"playerId": player_id, "rostersDeleted": deleted}
+
+@job_runner.handler('leave_league')
+def leave_league_job(connection, params, progress):
+    league_id = params['leagueId']
+    
+    # Same ending as the synchronous owner path: with every roster gone the league is removed
+    def finish(cursor):
+        queries.execute(cursor, 'league_delete', (league_id,))
+    
+    deleted = drain_rosters(connection, 'leagueId', league_id, progress, finish)
+    standings_index.drop_league(league_id)
+    return {"leagueId": league_id, "rostersDeleted": deleted}
+
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,128 @@
+import bisect
+import threading
+import time
+from array import array
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class ArtistIndex:
+    """In-memory n-gram index over Artist.artistName.
+
+    Lowercased names are kept in one sorted list, so exact and prefix matches for
+    a term are a single contiguous slice of it (the exact match sorts first).
+    Every name is also split into bigrams and trigrams; each gram maps to a
+    compact array of artist ids kept in the same alphabetical order. Substring
+    matches walk the rarest gram of the term and stop as soon as the requested
+    number of results is found, so a search costs roughly the page size rather
+    than the size of the catalog.
+    """
+
+    def __init__(self, sync_ttl=30.0):
+        self.sync_ttl = sync_ttl
+        self._lock = threading.RLock()
+        self._folded = {}
+        self._sorted = []
+        self._postings = {}
+        self._max_id = 0
+        self._built = False
+        self._synced_at = 0.0
+
+    def __len__(self):
+        return len(self._folded)
+
+    def _key(self, artist_id):
+        return self._folded[artist_id], artist_id
+
+    def add(self, artist_id, artist_name):
+        folded = artist_name.casefold()
+        with self._lock:
+            if artist_id in self._folded:
+                return
+            self._folded[artist_id] = folded
+            bisect.insort(self._sorted, (folded, artist_id))
+            for gram in _grams(folded, 2) | _grams(folded, 3):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    posting = self._postings[gram] = array('I')
+                bisect.insort(posting, artist_id, key=self._key)
+            self._max_id = max(self._max_id, artist_id)
+
+    def load(self, cursor):
+        # Full rebuild, used once at startup
+        cursor.execute("SELECT artistId, artistName FROM Artist")
+        entries = sorted((row['artistName'].casefold(), row['artistId']) for row in cursor.fetchall())
+
+        # Entries arrive in sorted order, so postings can be appended without insort
+        postings = {}
+        for folded, artist_id in entries:
+            for gram in _grams(folded, 2) | _grams(folded, 3):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array('I')
+                posting.append(artist_id)
+
+        with self._lock:
+            self._folded = {artist_id: folded for folded, artist_id in entries}
+            self._sorted = entries
+            self._postings = postings
+            self._max_id = max(self._folded, default=0)
+            self._built = True
+            self._synced_at = time.monotonic()
+
+    def sync(self, cursor):
+        # Artists are only ever appended, so catching up means reading past the highest id we hold
+        cursor.execute(
+            "SELECT artistId, artistName FROM Artist WHERE artistId > %s ORDER BY artistId",
+            (self._max_id,)
+        )
+        for row in cursor.fetchall():
+            self.add(row['artistId'], row['artistName'])
+        self._synced_at = time.monotonic()
+
+    def ensure(self, cursor):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.load(cursor)
+        elif time.monotonic() - self._synced_at >= self.sync_ttl:
+            self.sync(cursor)
+
+    def search(self, term, limit):
+        """Return up to `limit` artist ids ranked exact match, then prefix, then substring.
+
+        Ties within each group are broken alphabetically.
+        """
+        term = term.casefold()
+        if len(term) < 2 or limit <= 0:
+            return []
+
+        with self._lock:
+            # Exact and prefix matches: one contiguous run of the sorted names
+            ranked = []
+            position = bisect.bisect_left(self._sorted, (term,))
+            while len(ranked) < limit and position < len(self._sorted):
+                folded, artist_id = self._sorted[position]
+                if not folded.startswith(term):
+                    break
+                ranked.append(artist_id)
+                position += 1
+
+            if len(ranked) >= limit:
+                return ranked
+
+            # Substring matches: verify candidates from the rarest gram of the term
+            n = 3 if len(term) >= 3 else 2
+            postings = [self._postings.get(gram) for gram in _grams(term, n)]
+            if not postings or None in postings:
+                return ranked
+            for artist_id in min(postings, key=len):
+                folded = self._folded[artist_id]
+                if term in folded and not folded.startswith(term):
+                    ranked.append(artist_id)
+                    if len(ranked) >= limit:
+                        break
+
+        return ranked
@@ -0,0 +1,294 @@
+"""ASGI entry point: async read endpoints in front of the Flask app.
+
+The hottest read endpoints are served here by coroutines on an aiomysql pool,
+so a request waiting on MySQL holds no thread and one process can keep
+thousands of reads in flight. Queries that do not depend on each other are
+issued together (e.g. the game clock and the roster lookup). Every other
+route, including all writes, falls through to the unchanged Flask app via
+asgiref's WsgiToAsgi, which runs it on a thread as before. The one exception
+is /api/current-date creating the GameSettings row on an empty database.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+The game clock cache and the metrics registry are shared with the Flask app
+in the same process, so an advance_month served by Flask is seen here at once
+and /api/metrics covers both paths.
+"""
+import asyncio
+import time
+from calendar import month_name
+
+import aiomysql
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import app as flask_app, event_broker, game_clock, metrics, owned_pct, start_clock_watcher
+from config import Config
+from events import TooManySubscribers
+from metrics import RequestStats
+from queries import STATEMENTS
+
+
+class AsyncDatabase:
+    def __init__(self):
+        self.pool = None
+
+    async def connect(self):
+        self.pool = await aiomysql.create_pool(
+            host=Config.MYSQL_HOST,
+            port=Config.MYSQL_PORT,
+            user=Config.MYSQL_USER,
+            password=Config.MYSQL_PASSWORD,
+            db=Config.MYSQL_DB,
+            connect_timeout=Config.MYSQL_CONNECT_TIMEOUT,
+            minsize=1,
+            maxsize=Config.ASYNC_MYSQL_POOL_SIZE,
+            pool_recycle=int(Config.MYSQL_POOL_RECYCLE),
+            charset='utf8mb4',
+            cursorclass=aiomysql.DictCursor,
+            # Each statement is its own transaction, so nothing is held between requests
+            autocommit=True,
+        )
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+
+    async def _acquire(self):
+        try:
+            return await asyncio.wait_for(self.pool.acquire(), Config.MYSQL_POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise PoolExhausted(f"No database connection free after {Config.MYSQL_POOL_TIMEOUT:.1f}s")
+
+    async def fetch(self, request_stats, sql, args=(), one=False):
+        connection = await self._acquire()
+        try:
+            async with connection.cursor() as cursor:
+                started = time.perf_counter()
+                try:
+                    await cursor.execute(sql, args)
+                    rows = [await cursor.fetchone()] if one else await cursor.fetchall()
+                finally:
+                    label = metrics.observe_statement(request_stats, sql, time.perf_counter() - started)
+        finally:
+            self.pool.release(connection)
+
+        rows = [row for row in rows if row is not None]
+        metrics.observe_rows(request_stats, label, len(rows))
+        return (rows[0] if rows else None) if one else rows
+
+    async def execute(self, request_stats, sql, args=()):
+        # For the rare write a read route has to make; autocommit commits it at once
+        connection = await self._acquire()
+        try:
+            async with connection.cursor() as cursor:
+                started = time.perf_counter()
+                try:
+                    return await cursor.execute(sql, args)
+                finally:
+                    metrics.observe_statement(request_stats, sql, time.perf_counter() - started)
+        finally:
+            self.pool.release(connection)
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+db = AsyncDatabase()
+
+
+def instrumented(endpoint):
+    # Same per-endpoint series as the Flask handlers, keyed by the async endpoint name
+    def decorate(handler):
+        async def wrapper(request):
+            request_stats = RequestStats(endpoint)
+            started = time.perf_counter()
+            status = 500
+            try:
+                response = await handler(request, request_stats)
+                status = response.status_code
+                return response
+            except PoolExhausted as e:
+                status = 503
+                return JSONResponse({"error": str(e)}, status_code=503)
+            except Exception as e:
+                return JSONResponse({"error": str(e)}, status_code=500)
+            finally:
+                metrics.observe_request(endpoint, request.method, status, time.perf_counter() - started, request_stats)
+        return wrapper
+    return decorate
+
+
+async def current_settings(request_stats, cached=True):
+    settings = game_clock.cached() if cached else None
+    if settings is not None:
+        return settings
+    row = await db.fetch(
+        request_stats, "SELECT current_month, current_year, version FROM GameSettings WHERE id = 1", one=True
+    )
+    if not row:
+        return None
+    return game_clock.set(row['current_month'], row['current_year'], row['version'])
+
+
+@instrumented('async_get_current_date')
+async def get_current_date(request, request_stats):
+    settings = await current_settings(request_stats)
+    if not settings:
+        # Initialize if first time, as the Flask handler does; IGNORE leaves a row
+        # another worker inserted meanwhile, so read back whichever row won
+        await db.execute(
+            request_stats,
+            "INSERT IGNORE INTO GameSettings (id, current_month, current_year) VALUES (1, %s, %s)",
+            (1, 2024)
+        )
+        settings = await current_settings(request_stats, cached=False)
+    return JSONResponse({
+        "month": settings['current_month'],
+        "year": settings['current_year'],
+        "month_name": month_name[settings['current_month']],
+        "version": settings['version']
+    })
+
+
+@instrumented('async_get_roster_artists')
+async def get_roster_artists(request, request_stats):
+    roster_id = request.path_params['roster_id']
+
+    # The clock (usually cached) and the roster check do not depend on each other
+    settings, roster = await asyncio.gather(
+        current_settings(request_stats),
+        db.fetch(request_stats, "SELECT rosterId FROM Roster WHERE rosterId = %s", (roster_id,), one=True),
+    )
+    if not settings:
+        return JSONResponse({"error": "Game settings not initialized"}, status_code=500)
+    if not roster:
+        return JSONResponse({"error": "Roster not found"}, status_code=404)
+
+    # RosterMember's primary key already rules out duplicates; each stats row is a primary-key lookup
+    artists = await db.fetch(request_stats, """
+        SELECT
+            a.artistId,
+            a.artistName,
+            s.price,
+            s.listeners,
+            s.followers,
+            s.popularity,
+            s.month,
+            s.year
+        FROM RosterMember rm
+        JOIN Artist a ON a.artistId = rm.artistId
+        JOIN ArtistStats s ON s.artistId = rm.artistId AND s.month = %s AND s.year = %s
+        WHERE rm.rosterId = %s
+    """, (settings['current_month'], settings['current_year'], roster_id))
+    return JSONResponse(artists)
+
+
+@instrumented('async_get_roster')
+async def get_roster(request, request_stats):
+    roster = await db.fetch(request_stats, """
+        SELECT r.rosterId, r.rosterName, r.budget, r.points, r.playerId, r.leagueId,
+               p.playerName, l.leagueName
+        FROM Roster r
+        JOIN Player p ON r.playerId = p.playerId
+        JOIN League l ON r.leagueId = l.leagueId
+        WHERE r.rosterId = %s
+    """, (request.path_params['roster_id'],), one=True)
+    if not roster:
+        return JSONResponse({"error": "Roster not found"}, status_code=404)
+    return JSONResponse(roster)
+
+
+@instrumented('async_get_league')
+async def get_league(request, request_stats):
+    league = await db.fetch(request_stats, """
+        SELECT l.leagueId, l.leagueName, l.playerCount, l.ownerId, p.playerName as ownerName
+        FROM League l
+        LEFT JOIN Player p ON l.ownerId = p.playerId
+        WHERE l.leagueId = %s
+    """, (request.path_params['league_id'],), one=True)
+    if not league:
+        return JSONResponse({"error": "League not found"}, status_code=404)
+    return JSONResponse(league)
+
+
+@instrumented('async_get_artist')
+async def get_artist(request, request_stats):
+    settings = await current_settings(request_stats)
+    if not settings:
+        return JSONResponse({"error": "Game settings not initialized"}, status_code=500)
+
+    artist = await db.fetch(request_stats, """
+        SELECT
+            a.artistId,
+            a.artistName,
+            s.price,
+            s.listeners,
+            s.followers,
+            s.popularity,
+            s.month,
+            s.year
+        FROM Artist a
+        JOIN ArtistLatestStats s ON a.artistId = s.artistId
+        WHERE a.artistId = %s
+          AND s.month = %s
+          AND s.year = %s
+    """, (request.path_params['artist_id'], settings['current_month'], settings['current_year']), one=True)
+    if not artist:
+        return JSONResponse({"error": "Artist not found for current period"}, status_code=404)
+
+    # Same ownership fields as the Flask handler, which this route shadows
+    ownership, total = await asyncio.gather(
+        db.fetch(request_stats, STATEMENTS['artist_owners'], (artist['artistId'],), one=True),
+        db.fetch(request_stats, STATEMENTS['roster_total'], one=True),
+    )
+    artist['owners'] = ownership['owners'] if ownership else 0
+    artist['ownedPct'] = owned_pct(artist['owners'], total['rosters'])
+    return JSONResponse(artist)
+
+
+@instrumented('async_league_events')
+async def league_events(request, request_stats):
+    league_id = request.path_params['league_id']
+    league = await db.fetch(request_stats, "SELECT leagueId FROM League WHERE leagueId = %s", (league_id,), one=True)
+    if not league:
+        return JSONResponse({"error": "League not found"}, status_code=404)
+
+    # A waiting stream is a suspended coroutine here, not a parked thread as under Flask
+    try:
+        subscription = event_broker.subscribe(league_id)
+    except TooManySubscribers as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+    return StreamingResponse(
+        event_broker.astream(subscription),
+        media_type='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(event_broker.unsubscribe, subscription),
+    )
+
+
+app = Starlette(
+    routes=[
+        Route('/api/current-date', get_current_date, methods=['GET']),
+        Route('/api/rosters/{roster_id:int}/artists', get_roster_artists, methods=['GET']),
+        Route('/api/rosters/{roster_id:int}', get_roster, methods=['GET']),
+        Route('/api/leagues/{league_id:int}', get_league, methods=['GET']),
+        Route('/api/artists/{artist_id:int}', get_artist, methods=['GET']),
+        Route('/api/events/leagues/{league_id:int}', league_events, methods=['GET']),
+        # Everything else, including every write, is the Flask app as before
+        Mount('', app=WsgiToAsgi(flask_app)),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'],
+                   expose_headers=['X-Next-Offset', 'X-Next-After', 'X-Last-Write']),
+    ],
+    on_startup=[db.connect, start_clock_watcher],
+    on_shutdown=[db.close],
+)
@@ -0,0 +1,120 @@
+"""Signed session tokens and salted password hashes.
+
+Login hands out a token signed with SECRET_KEY carrying the player's id and
+name. A request that presents it as `Authorization: Bearer <token>` is
+authenticated by checking the signature and age in memory, without a query.
+Without a token the old body-trusting path still works unless AUTH_REQUIRED
+is set; with it set, a missing or development SECRET_KEY refuses to start,
+since anyone could then sign tokens.
+
+Passwords are stored as PBKDF2-SHA256 with a random salt and a configurable
+iteration count. Hashing runs inline on the request thread, which is busy for
+the whole derivation; hashlib releases the GIL meanwhile, so other requests
+keep running, and the iteration count is what bounds the cost of a login.
+Rows still holding a plaintext password (or a hash with an outdated iteration
+count) are rehashed on the next successful login.
+"""
+import base64
+import hashlib
+import hmac
+import logging
+import os
+
+from flask import request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+log = logging.getLogger(__name__)
+
+HASH_SCHEME = 'pbkdf2_sha256'
+SALT_BYTES = 16
+# Used when SECRET_KEY is unset; only acceptable while tokens are optional
+DEV_SECRET_KEY = 'dev-only-change-me'
+
+
+class AuthError(Exception):
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.status = status
+
+
+class Session:
+    __slots__ = ('player_id', 'player_name')
+
+    def __init__(self, player_id, player_name):
+        self.player_id = player_id
+        self.player_name = player_name
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode('ascii')
+
+
+def hash_password(password, iterations):
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f"{HASH_SCHEME}${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password, stored, iterations):
+    """Returns (matches, needs_rehash) for a stored hash or a legacy plaintext value."""
+    if not stored.startswith(HASH_SCHEME + '$'):
+        # Legacy plaintext row
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8')), True
+
+    _, rounds, salt, expected = stored.split('$')
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), base64.b64decode(salt), int(rounds))
+    matches = hmac.compare_digest(_b64(digest), expected)
+    return matches, matches and int(rounds) != iterations
+
+
+class Auth:
+    def __init__(self, secret_key=None, token_ttl=86400, hash_iterations=200000, required=False):
+        if not secret_key or secret_key == DEV_SECRET_KEY:
+            if required:
+                raise ValueError("AUTH_REQUIRED is set but SECRET_KEY is missing or the development default")
+            log.warning("SECRET_KEY is not set; session tokens are signed with a public development key")
+            secret_key = DEV_SECRET_KEY
+        self.token_ttl = token_ttl
+        self.hash_iterations = hash_iterations
+        self.required = required
+        self._serializer = URLSafeTimedSerializer(secret_key, salt='session')
+
+    def hash(self, password):
+        return hash_password(password, self.hash_iterations)
+
+    def check(self, password, stored):
+        return verify_password(password, stored, self.hash_iterations)
+
+    def issue(self, player):
+        return self._serializer.dumps({"pid": player['playerId'], "name": player['playerName']})
+
+    def session(self):
+        """The Session for this request's bearer token; None when no token was sent."""
+        header = request.headers.get('Authorization', '')
+        if not header:
+            return None
+        scheme, _, token = header.partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            raise AuthError("Authorization header must be 'Bearer <token>'")
+        try:
+            claims = self._serializer.loads(token, max_age=self.token_ttl)
+        except SignatureExpired:
+            raise AuthError("Session expired, please log in again")
+        except BadSignature:
+            raise AuthError("Invalid session token")
+        return Session(claims['pid'], claims['name'])
+
+    def acting_player(self, claimed_id=None):
+        """Session of the player making this request, checked against a playerId from the request.
+
+        Returns None when there is no token and tokens are optional; the caller
+        then has to look the player up itself as before.
+        """
+        session = self.session()
+        if session is None:
+            if self.required:
+                raise AuthError("Authentication required")
+            return None
+        if claimed_id is not None and str(claimed_id) != str(session.player_id):
+            raise AuthError("Session does not belong to this player", 403)
+        return session
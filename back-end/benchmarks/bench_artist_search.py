@@ -0,0 +1,92 @@
+"""Artist search latency as the catalog grows.
+
+Compares the n-gram ArtistIndex against a linear '%term%' scan (what MySQL does
+for the old LIKE query) over synthetic catalogs. No database is needed.
+
+    python benchmarks/bench_artist_search.py --sizes 1000 10000 100000 250000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from artist_index import ArtistIndex
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ne', 'to', 'su', 'vi', 'del', 'mar', 'zon', 'bel', 'ty', 'quo', 'an']
+SUFFIXES = ['', '', '', ' Band', ' Trio', ' & The Echoes', ' DJ', ' Collective']
+
+
+def make_name(rng):
+    words = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+             for _ in range(rng.randint(1, 2))]
+    return ' '.join(words) + rng.choice(SUFFIXES)
+
+
+class CatalogCursor:
+    # Just enough of a DictCursor for ArtistIndex.load()
+    def __init__(self, names):
+        self.names = names
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return [{'artistId': artist_id, 'artistName': name} for artist_id, name in self.names]
+
+
+def linear_scan(names, term):
+    term = term.casefold()
+    return [artist_id for artist_id, name in names if term in name.casefold()][:15]
+
+
+def timed(fn, terms):
+    samples = []
+    for term in terms:
+        start = time.perf_counter()
+        fn(term)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 250000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=411)
+    args = parser.parse_args()
+
+    print(f"{'artists':>9} {'build s':>8} {'index p50':>10} {'index p95':>10} {'scan p50':>9} {'scan p95':>9} {'add':>7}  (ms)")
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        names = [(artist_id, make_name(rng)) for artist_id in range(1, size + 1)]
+
+        start = time.perf_counter()
+        index = ArtistIndex()
+        index.load(CatalogCursor(names))
+        build = time.perf_counter() - start
+
+        # Incremental adds, as done by POST /api/artists
+        start = time.perf_counter()
+        for artist_id in range(size + 1, size + 101):
+            index.add(artist_id, make_name(rng))
+        add_ms = (time.perf_counter() - start) * 10
+
+        # Keystroke-like terms: 2-5 character slices of real names
+        terms = []
+        for _ in range(args.queries):
+            name = rng.choice(names)[1]
+            start_at = rng.randrange(max(1, len(name) - 2))
+            terms.append(name[start_at:start_at + rng.randint(2, 5)])
+
+        index_p50, index_p95 = timed(lambda term: index.search(term, 15), terms)
+        scan_p50, scan_p95 = timed(lambda term: linear_scan(names, term), terms)
+        print(f"{size:>9} {build:>8.2f} {index_p50:>10.3f} {index_p95:>10.3f} {scan_p50:>9.3f} {scan_p95:>9.3f} {add_ms:>7.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""Concurrent artist purchases on the same roster: correctness and throughput.
+
+Many buyers, each on its own connection, are released at once against a
+few rosters whose budget covers only some of the artists they try to buy.
+Two purchase paths are compared:
+
+    checked  the old endpoint: read budget, price and membership in Python,
+             then CALL AddArtistToRoster (which re-reads the budget unlocked)
+    atomic   trades.purchase_artist: one CALL PurchaseArtist, budget reserved
+             by a conditional UPDATE
+
+After each run every roster is audited: the budget must not be negative and
+must equal the starting budget minus the price of every artist that ended up
+on it. The checked path can overspend under contention; the atomic one must
+not.
+
+    MYSQL_DB=music_fantasy_league_bench python benchmarks/seed.py
+    MYSQL_DB=music_fantasy_league_bench python migrate.py
+    MYSQL_DB=music_fantasy_league_bench python benchmarks/bench_purchase.py --buyers 64 --rosters 4
+
+Needs seeded artists with latest stats. Adds its own player, league and
+rosters, and removes them again when done.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from db import connect
+from loadtest import percentile
+from trades import TradeError, purchase_artist
+
+PROTECTED_DB = 'music_fantasy_league'
+MODES = ('checked', 'atomic')
+
+
+def checked_purchase(connection, roster_id, artist_id):
+    # The pre-registry add_artist_to_roster handler, statement for statement
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT * FROM Roster WHERE rosterId = %s", (roster_id,))
+        roster = cursor.fetchone()
+        cursor.execute("SELECT price FROM ArtistLatestStats WHERE artistId = %s", (artist_id,))
+        artist = cursor.fetchone()
+        cursor.execute("SELECT * FROM RosterMember WHERE rosterId = %s AND artistId = %s", (roster_id, artist_id))
+        if cursor.fetchone():
+            raise TradeError("Artist is already in the roster", 409)
+        if roster['budget'] < artist['price']:
+            raise TradeError("Not enough budget to add this artist")
+        cursor.callproc('AddArtistToRoster', [roster_id, artist_id])
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def atomic_purchase(connection, roster_id, artist_id):
+    purchase_artist(connection, roster_id, artist_id)
+
+
+def create_fixture(connection, rosters, budget):
+    cursor = connection.cursor()
+    cursor.execute(
+        "INSERT INTO Player (playerName, username, password) VALUES (%s, %s, %s)",
+        ('Purchase Bench', f'purchase-bench-{os.getpid()}-{time.time_ns()}', '-')
+    )
+    player_id = cursor.lastrowid
+    roster_ids = []
+    for i in range(rosters):
+        # One league per roster: a player may hold only one roster per league
+        cursor.execute(
+            "INSERT INTO League (leagueName, playerCount, ownerId) VALUES (%s, 0, %s)",
+            (f'Purchase Bench {i}', player_id)
+        )
+        cursor.execute(
+            "INSERT INTO Roster (rosterName, budget, points, playerId, leagueId) VALUES (%s, %s, 0, %s, %s)",
+            (f'Purchase Bench {i}', budget, player_id, cursor.lastrowid)
+        )
+        roster_ids.append(cursor.lastrowid)
+    connection.commit()
+    cursor.close()
+    return player_id, roster_ids
+
+
+def drop_fixture(connection, player_id, roster_ids):
+    cursor = connection.cursor()
+    placeholders = ', '.join(['%s'] * len(roster_ids))
+    cursor.execute(f"DELETE FROM RosterMember WHERE rosterId IN ({placeholders})", roster_ids)
+    cursor.execute(f"DELETE FROM Roster WHERE rosterId IN ({placeholders})", roster_ids)
+    cursor.execute("DELETE FROM League WHERE ownerId = %s", (player_id,))
+    cursor.execute("DELETE FROM Player WHERE playerId = %s", (player_id,))
+    connection.commit()
+    cursor.close()
+
+
+def reset_rosters(connection, roster_ids, budget):
+    cursor = connection.cursor()
+    placeholders = ', '.join(['%s'] * len(roster_ids))
+    cursor.execute(f"DELETE FROM RosterMember WHERE rosterId IN ({placeholders})", roster_ids)
+    cursor.execute(f"UPDATE Roster SET budget = %s WHERE rosterId IN ({placeholders})", [budget] + roster_ids)
+    connection.commit()
+    cursor.close()
+
+
+def audit(connection, roster_ids, budget):
+    cursor = connection.cursor()
+    placeholders = ', '.join(['%s'] * len(roster_ids))
+    cursor.execute(f"""
+        SELECT r.rosterId, r.budget, COUNT(rm.artistId) AS members, COALESCE(SUM(s.price), 0) AS cost
+        FROM Roster r
+        LEFT JOIN RosterMember rm ON rm.rosterId = r.rosterId
+        LEFT JOIN ArtistLatestStats s ON s.artistId = rm.artistId
+        WHERE r.rosterId IN ({placeholders})
+        GROUP BY r.rosterId, r.budget
+    """, roster_ids)
+    rows = cursor.fetchall()
+    connection.commit()
+    cursor.close()
+
+    overspent = [row for row in rows if row['cost'] > budget or row['budget'] < 0]
+    mismatched = [row for row in rows if budget - row['cost'] != row['budget']]
+    return {
+        "members": sum(row['members'] for row in rows),
+        "overspentRosters": len(overspent),
+        "worstOverspend": max((int(row['cost']) - budget for row in overspent), default=0),
+        "budgetMismatches": len(mismatched),
+    }
+
+
+def run(mode, roster_ids, artist_ids, buyers, attempts_per_buyer):
+    purchase = checked_purchase if mode == 'checked' else atomic_purchase
+    barrier = threading.Barrier(buyers)
+    lock = threading.Lock()
+    latencies = []
+    outcomes = {}
+
+    def buyer(index):
+        connection = connect(Config)
+        try:
+            barrier.wait()
+            for attempt in range(attempts_per_buyer):
+                slot = index * attempts_per_buyer + attempt
+                # Every buyer hits every roster; each (roster, artist) pair is tried once
+                roster_id = roster_ids[slot % len(roster_ids)]
+                artist_id = artist_ids[slot // len(roster_ids) % len(artist_ids)]
+                started = time.perf_counter()
+                try:
+                    purchase(connection, roster_id, artist_id)
+                    outcome = 'bought'
+                except TradeError as e:
+                    outcome = f'rejected {e.status}'
+                except Exception as e:
+                    outcome = f'error {type(e).__name__}'
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=buyer, args=(i,)) for i in range(buyers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "seconds": round(wall, 3),
+        "throughput": round(len(latencies) / wall, 1) if wall else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "outcomes": outcomes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--buyers', type=int, default=64, help="concurrent connections buying at once")
+    parser.add_argument('--rosters', type=int, default=4, help="rosters the buyers compete for")
+    parser.add_argument('--attempts', type=int, default=8, help="purchases tried per buyer")
+    parser.add_argument('--affordable', type=int, default=10,
+                        help="budget covers about this many artists per roster")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--force', action='store_true', help=f"allow running against {PROTECTED_DB}")
+    args = parser.parse_args()
+
+    if Config.MYSQL_DB == PROTECTED_DB and not args.force:
+        sys.exit(f"refusing to write to {PROTECTED_DB}; point MYSQL_DB at a scratch database or pass --force")
+
+    total = args.buyers * args.attempts
+    wanted = -(-total // args.rosters)
+
+    connection = connect(Config)
+    cursor = connection.cursor()
+    cursor.execute("SELECT artistId, price FROM ArtistLatestStats WHERE price > 0 ORDER BY artistId LIMIT %s", (wanted,))
+    artists = cursor.fetchall()
+    cursor.close()
+    if len(artists) < wanted:
+        sys.exit(f"need {wanted} priced artists, found {len(artists)}; seed more artists or lower --buyers/--attempts")
+
+    prices = sorted(artist['price'] for artist in artists)
+    budget = sum(prices[:args.affordable])
+    artist_ids = [artist['artistId'] for artist in artists]
+
+    player_id, roster_ids = create_fixture(connection, args.rosters, budget)
+    print(f"{args.buyers} buyers x {args.attempts} purchases on {args.rosters} rosters, "
+          f"{len(artist_ids)} artists, budget {budget} per roster")
+    try:
+        for mode in args.modes:
+            reset_rosters(connection, roster_ids, budget)
+            result = run(mode, roster_ids, artist_ids, args.buyers, args.attempts)
+            result.update(audit(connection, roster_ids, budget))
+            outcomes = ', '.join(f"{name}: {count}" for name, count in sorted(result['outcomes'].items()))
+            print(f"\n{mode}")
+            print(f"  {result['throughput']} purchases/s, p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms")
+            print(f"  {outcomes}")
+            print(f"  {result['members']} artists held, {result['overspentRosters']} roster(s) overspent "
+                  f"(worst by {result['worstOverspend']}), {result['budgetMismatches']} budget mismatch(es)")
+    finally:
+        drop_fixture(connection, player_id, roster_ids)
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""Before/after timings for roster point recomputation.
+
+Needs a scratch MySQL database created from create_database.sql,
+stored_procedures.sql and triggers.sql (with the USE lines pointed at it).
+Everything in that database is wiped and reseeded:
+
+    MYSQL_DB=music_fantasy_league_bench python benchmarks/bench_roster_points.py --artists 2000 --rosters 5000
+
+It times
+  * UpdateAllRosterPoints: the old cursor loop vs the set-based UPDATE
+  * loading one month of stats: per-row trigger (old cursor trigger, new
+    set-based trigger) vs a deferred load + one RecomputeRosterPointsForPeriod
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from db import connect
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LEGACY_PROCEDURES = {
+    'LegacyCalculateRosterPoints': """
+        CREATE PROCEDURE LegacyCalculateRosterPoints(IN p_rosterId INT)
+        BEGIN
+            DECLARE total_points INT DEFAULT 0;
+            SELECT SUM((s.listeners / 1000000) + (s.followers / 1000000) + (s.popularity * 2))
+            INTO total_points
+            FROM RosterMember rm
+            JOIN ArtistStats s ON rm.artistId = s.artistId
+            WHERE rm.rosterId = p_rosterId
+            AND (s.year, s.month) IN (
+                SELECT MAX(year), MAX(month) FROM ArtistStats WHERE artistId = s.artistId GROUP BY artistId
+            );
+            UPDATE Roster SET points = COALESCE(total_points, 0) WHERE rosterId = p_rosterId;
+        END
+    """,
+    'LegacyUpdateAllRosterPoints': """
+        CREATE PROCEDURE LegacyUpdateAllRosterPoints()
+        BEGIN
+            DECLARE done INT DEFAULT 0;
+            DECLARE roster_id INT;
+            DECLARE cur CURSOR FOR SELECT rosterId FROM Roster;
+            DECLARE CONTINUE HANDLER FOR NOT FOUND SET done = 1;
+            OPEN cur;
+            roster_loop: LOOP
+                FETCH cur INTO roster_id;
+                IF done THEN
+                    LEAVE roster_loop;
+                END IF;
+                CALL LegacyCalculateRosterPoints(roster_id);
+            END LOOP;
+            CLOSE cur;
+        END
+    """,
+}
+
+LEGACY_TRIGGER = """
+    CREATE TRIGGER after_artist_stats_update
+    AFTER INSERT ON ArtistStats
+    FOR EACH ROW
+    BEGIN
+        DECLARE done INT DEFAULT 0;
+        DECLARE roster_id INT;
+        DECLARE cur CURSOR FOR SELECT rm.rosterId FROM RosterMember rm WHERE rm.artistId = NEW.artistId;
+        DECLARE CONTINUE HANDLER FOR NOT FOUND SET done = 1;
+        OPEN cur;
+        roster_loop: LOOP
+            FETCH cur INTO roster_id;
+            IF done THEN
+                LEAVE roster_loop;
+            END IF;
+            CALL LegacyCalculateRosterPoints(roster_id);
+        END LOOP;
+        CLOSE cur;
+    END
+"""
+
+
+def sql_blocks(path):
+    """Map object name -> CREATE statement for every DELIMITER // block in a repo SQL file."""
+    with open(path) as f:
+        text = f.read()
+    blocks = {}
+    for body in re.findall(r'DELIMITER //\s*(.*?)//\s*DELIMITER ;', text, re.S):
+        name = re.search(r'CREATE\s+(?:PROCEDURE|TRIGGER)\s+(\w+)', body).group(1)
+        blocks[name] = body.strip()
+    return blocks
+
+
+def seed(connection, args):
+    rng = random.Random(args.seed)
+    cursor = connection.cursor()
+    cursor.execute("SET @defer_stats_triggers = 1")
+    for table in ('RosterMember', 'ArtistStats', 'Roster', 'League', 'Artist', 'Player'):
+        cursor.execute(f"DELETE FROM {table}")
+
+    cursor.executemany(
+        "INSERT INTO Player (playerId, playerName, username, password) VALUES (%s, %s, %s, %s)",
+        [(i, f'Player {i}', f'player{i}', 'x') for i in range(1, args.rosters + 1)]
+    )
+    leagues = max(1, args.rosters // 10)
+    cursor.executemany(
+        "INSERT INTO League (leagueId, leagueName, playerCount) VALUES (%s, %s, 10)",
+        [(i, f'League {i}') for i in range(1, leagues + 1)]
+    )
+    cursor.executemany(
+        "INSERT INTO Artist (artistId, artistName) VALUES (%s, %s)",
+        [(i, f'Artist {i}') for i in range(1, args.artists + 1)]
+    )
+    cursor.executemany(
+        "INSERT INTO Roster (rosterId, rosterName, budget, points, playerId, leagueId) VALUES (%s, %s, 2000, 0, %s, %s)",
+        [(i, f'Roster {i}', i, (i - 1) % leagues + 1) for i in range(1, args.rosters + 1)]
+    )
+    members = []
+    for roster_id in range(1, args.rosters + 1):
+        for artist_id in rng.sample(range(1, args.artists + 1), args.members):
+            members.append((artist_id, roster_id))
+    cursor.executemany("INSERT INTO RosterMember (artistId, rosterId) VALUES (%s, %s)", members)
+    cursor.executemany(
+        "INSERT INTO ArtistStats (artistId, month, year, listeners, followers, popularity, price) "
+        "VALUES (%s, 1, 2024, %s, %s, %s, %s)",
+        [(i, rng.randint(0, 5_000_000), rng.randint(0, 2_000_000), rng.randint(0, 100), rng.randint(10, 500))
+         for i in range(1, args.artists + 1)]
+    )
+    cursor.execute("SET @defer_stats_triggers = 0")
+    cursor.execute("CALL RefreshAllArtistLatestStats()")
+    connection.commit()
+    cursor.close()
+
+
+def month_rows(rng, artists, month):
+    return [(i, month, 2024, rng.randint(0, 5_000_000), rng.randint(0, 2_000_000), rng.randint(0, 100),
+             rng.randint(10, 500)) for i in range(1, artists + 1)]
+
+
+def load_month(connection, rows, deferred):
+    cursor = connection.cursor()
+    start = time.perf_counter()
+    if deferred:
+        cursor.execute("SET @defer_stats_triggers = 1")
+    cursor.executemany(
+        "INSERT INTO ArtistStats (artistId, month, year, listeners, followers, popularity, price) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        rows
+    )
+    if deferred:
+        cursor.execute("SET @defer_stats_triggers = 0")
+        cursor.execute("CALL RecomputeRosterPointsForPeriod(%s, %s)", (rows[0][1], rows[0][2]))
+    connection.commit()
+    elapsed = time.perf_counter() - start
+    cursor.close()
+    return elapsed
+
+
+def timed_call(connection, procedure):
+    cursor = connection.cursor()
+    start = time.perf_counter()
+    cursor.callproc(procedure)
+    connection.commit()
+    elapsed = time.perf_counter() - start
+    cursor.close()
+    return elapsed
+
+
+def set_trigger(connection, statement):
+    cursor = connection.cursor()
+    cursor.execute("DROP TRIGGER IF EXISTS after_artist_stats_update")
+    cursor.execute(statement)
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--rosters', type=int, default=5000)
+    parser.add_argument('--members', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=411)
+    args = parser.parse_args()
+
+    connection = connect(Config)
+    cursor = connection.cursor()
+    for name, statement in LEGACY_PROCEDURES.items():
+        cursor.execute(f"DROP PROCEDURE IF EXISTS {name}")
+        cursor.execute(statement)
+    cursor.close()
+    current_trigger = sql_blocks(os.path.join(REPO_ROOT, 'triggers.sql'))['after_artist_stats_update']
+
+    print(f"seeding {args.artists} artists, {args.rosters} rosters x {args.members} members")
+    seed(connection, args)
+    rng = random.Random(args.seed + 1)
+
+    results = [
+        ('UpdateAllRosterPoints, cursor loop', timed_call(connection, 'LegacyUpdateAllRosterPoints')),
+        ('UpdateAllRosterPoints, set-based', timed_call(connection, 'UpdateAllRosterPoints')),
+    ]
+    try:
+        set_trigger(connection, LEGACY_TRIGGER)
+        results.append(('load 1 month, cursor trigger per row', load_month(connection, month_rows(rng, args.artists, 2), False)))
+        set_trigger(connection, current_trigger)
+        results.append(('load 1 month, set-based trigger per row', load_month(connection, month_rows(rng, args.artists, 3), False)))
+        results.append(('load 1 month, deferred + one recompute', load_month(connection, month_rows(rng, args.artists, 4), True)))
+    finally:
+        set_trigger(connection, current_trigger)
+
+    for label, elapsed in results:
+        print(f"{label:<42} {elapsed:>9.3f} s")
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
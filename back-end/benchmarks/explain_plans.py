@@ -0,0 +1,307 @@
+"""Query-plan regression check for every statement the app runs.
+
+Collects the SQL passed to cursor.execute/executemany in the app modules,
+including the aiomysql coroutines in asgi.py and their db.fetch/db.execute
+helpers (string literals, module or local string constants, f-strings with
+their IN-list placeholders or column-list constants, and the keyset queries
+built for list_response), the
+named statements in queries.py, and the DML inside every procedure and
+trigger in stored_procedures.sql, triggers.sql and migrations/. Each statement is
+EXPLAINed against the configured database with sample values for its
+placeholders. The run fails if a plan does a full scan (type ALL) or a
+filesort on a base table estimated above --max-rows rows, unless that scan is
+listed in ALLOWED_SCANS with a reason.
+
+Run it against a seeded, migrated scratch database so the row estimates mean
+something:
+
+    MYSQL_DB=music_fantasy_league_bench python benchmarks/seed.py
+    MYSQL_DB=music_fantasy_league_bench python migrate.py
+    MYSQL_DB=music_fantasy_league_bench python benchmarks/explain_plans.py --max-rows 1000
+"""
+import argparse
+import ast
+import os
+import re
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_roster_points import REPO_ROOT, sql_blocks
+from config import Config
+from db import connect
+from listing import keyset_query
+from queries import STATEMENTS
+
+# Modules whose queries run while serving requests
+APP_MODULES = (
+    'app.py', 'asgi.py', 'jobs.py', 'trades.py', 'settlement.py', 'standings.py', 'game_clock.py',
+    'artist_index.py', 'analytics.py',
+)
+SQL_FILES = ('stored_procedures.sql', 'triggers.sql') + tuple(
+    os.path.join('migrations', name)
+    for name in sorted(os.listdir(os.path.join(REPO_ROOT, 'migrations'))) if name.endswith('.sql')
+)
+
+# (source, table) -> why scanning the whole table is the point of that statement
+ALLOWED_SCANS = {
+    ('app.py:get_players', 'Player'): "legacy unpaged list of every player",
+    ('app.py:get_leagues', 'l'): "legacy unpaged list of every league",
+    ('artist_index.py:load', 'Artist'): "builds the in-memory search index from every artist",
+    ('analytics.py:load_history', 'Artist'): "loads every artist into the analytics matrices",
+    ('analytics.py:load_history', 'ArtistStats'): "loads the whole stats history once per clock version",
+    ('stored_procedures.sql:RefreshAllArtistLatestStats', 'ArtistStats'): "rebuilds the snapshot from all stats",
+    ('stored_procedures.sql:RefreshAllArtistLatestStats', 's'): "rebuilds the snapshot from all stats",
+    ('stored_procedures.sql:UpdateAllRosterPoints', 'r'): "re-scores every roster",
+    ('migrations/0000_baseline_objects.sql:RefreshAllArtistLatestStats', 'ArtistStats'):
+        "rebuilds the snapshot from all stats",
+    ('migrations/0000_baseline_objects.sql:RefreshAllArtistLatestStats', 's'): "rebuilds the snapshot from all stats",
+    ('migrations/0000_baseline_objects.sql:UpdateAllRosterPoints', 'r'): "re-scores every roster",
+    ('queries.py:roster_total', 'Roster'): "counts every roster for the ownership share",
+    ('migrations/0005_artist_ownership_counts.sql:RebuildArtistOwnership', 'RosterMember'):
+        "recounts ownership from every roster member",
+    ('migrations/0005_artist_ownership_counts.sql:RebuildArtistOwnership', 'rm'):
+        "recounts ownership from every roster member",
+    ('migrations/0005_artist_ownership_counts.sql:RebuildArtistOwnership', 'ArtistOwnership'):
+        "clears the counters before the recount",
+    ('migrations/0005_artist_ownership_counts.sql:RebuildArtistOwnership', 'LeagueArtistOwnership'):
+        "clears the counters before the recount",
+}
+
+DML = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT|REPLACE)\b', re.I)
+SKIP = re.compile(r'^\s*(START|COMMIT|ROLLBACK|SET|CALL|CREATE|DROP|TRUNCATE)\b', re.I)
+
+
+class Statement:
+    def __init__(self, source, sql, hints):
+        self.source = source
+        self.sql = sql
+        # One name per %s placeholder, used to pick a sample value
+        self.hints = hints
+
+
+def _placeholder_hints(sql):
+    hints = []
+    for match in re.finditer(r'%s', sql):
+        before = sql[:match.start()]
+        if re.search(r'LIMIT\s*$', before, re.I):
+            hints.append('limit')
+        elif re.search(r'month\s*-\s*1\s+BETWEEN\s*$', before, re.I) or \
+                re.search(r'month\s*-\s*1\s+BETWEEN\s+%s\s+AND\s*$', before, re.I):
+            hints.append('period')
+        else:
+            column = re.search(r'(\w+)\s*(?:=|<=|>=|<|>|LIKE)\s*$', before, re.I) or \
+                re.search(r'(\w+)\s+IN\s*\(\s*(?:%s\s*,\s*)*$', before, re.I)
+            hints.append(column.group(1) if column else '')
+    return hints
+
+
+def _const_strings(scope):
+    strings = {}
+    for node in ast.walk(scope):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    strings[target.id] = node.value.value
+    return strings
+
+
+def _render(node, local, module):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name):
+        return local.get(node.id, module.get(node.id))
+    if isinstance(node, ast.JoinedStr):
+        # f-strings here interpolate IN-list placeholders or a constant column list
+        return ''.join(_render_part(part, local, module) for part in node.values)
+    return None
+
+
+def _render_part(part, local, module):
+    if isinstance(part, ast.Constant):
+        return part.value
+    if isinstance(part, ast.FormattedValue) and isinstance(part.value, ast.Name):
+        constant = local.get(part.value.id, module.get(part.value.id))
+        if constant is not None:
+            return constant
+    return '%s'
+
+
+def app_statements():
+    statements = []
+    for filename in APP_MODULES:
+        with open(os.path.join(BACKEND, filename)) as f:
+            tree = ast.parse(f.read())
+        module_strings = _const_strings(tree)
+        for function in ast.walk(tree):
+            if not isinstance(function, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            local = _const_strings(function)
+            source = f"{filename}:{function.name}"
+            for call in ast.walk(function):
+                if not (isinstance(call, ast.Call) and call.args):
+                    continue
+                name = getattr(call.func, 'attr', None) or getattr(call.func, 'id', None)
+                if name in ('execute', 'executemany', 'fetch'):
+                    # asgi.py's db.fetch/db.execute take the request stats first, then the SQL
+                    sql = _render(call.args[0], local, module_strings)
+                    if sql is None and len(call.args) > 1:
+                        sql = _render(call.args[1], local, module_strings)
+                    if sql and DML.match(sql) and not re.match(r'^\s*INSERT\b(?![\s\S]*\bSELECT\b)', sql, re.I):
+                        statements.append(Statement(source, sql, _placeholder_hints(sql)))
+                elif name == 'list_response' and len(call.args) >= 4:
+                    # Keyset pages are built at runtime; explain a mid-list page
+                    select = _render(call.args[1], local, module_strings)
+                    key = _render(call.args[2], local, module_strings)
+                    where = [kw.value for kw in call.keywords if kw.arg == 'where']
+                    clauses = [_render(item, local, module_strings) for item in where[0].elts] if where else []
+                    if select and key:
+                        sql, _ = keyset_query(select, key, clauses, ['%s'] * sum(c.count('%s') for c in clauses), 1, 101)
+                        statements.append(Statement(source, sql, _placeholder_hints(sql)))
+    for name, sql in STATEMENTS.items():
+        if DML.match(sql):
+            statements.append(Statement(f"queries.py:{name}", sql, _placeholder_hints(sql)))
+    return statements
+
+
+def _procedure_statements(body):
+    body = '\n'.join(line.split('--')[0] for line in body.splitlines())
+    start = re.search(r'\bBEGIN\b', body, re.I)
+    body = body[start.end():body.rfind('END')] if start else body
+    local_names = [name for group in re.findall(r'\bDECLARE\s+(\w+(?:\s*,\s*\w+)*)', body, re.I)
+                   for name in re.split(r'\s*,\s*', group)]
+    statements = []
+    for chunk in body.split(';'):
+        # Drop IF ... THEN / ELSE / END IF wrappers around the statement
+        chunk = re.split(r'\bTHEN\b|\bELSE\b|\bEND IF\b', chunk, flags=re.I)[-1]
+        if not DML.match(chunk) or SKIP.match(chunk):
+            continue
+        if re.match(r'^\s*INSERT\b', chunk, re.I) and not re.search(r'\bSELECT\b', chunk, re.I):
+            continue
+        # SELECT ... INTO local_variable cannot be EXPLAINed; the read is what matters
+        chunk = re.sub(r'\bINTO\s+\w+(\s*,\s*\w+)*\s+(?=FROM\b)', '', chunk, flags=re.I)
+        # Local variables only feed values into the statement; a constant plans the same way
+        for name in local_names:
+            chunk = re.sub(rf'\b{name}\b', '0', chunk)
+        statements.append(chunk.strip())
+    return statements
+
+
+def procedure_statements():
+    statements = []
+    for filename in SQL_FILES:
+        for name, block in sql_blocks(os.path.join(REPO_ROOT, filename)).items():
+            for sql in _procedure_statements(block):
+                hints = []
+
+                def placeholder(match):
+                    hints.append(match.group(1))
+                    return '%s'
+
+                sql = re.sub(r'\b(?:p_|NEW\.|OLD\.)(\w+)\b', placeholder, sql)
+                statements.append(Statement(f"{filename}:{name}", sql, hints))
+    return statements
+
+
+class Samples:
+    """Real values from the seeded database for placeholder hints."""
+
+    def __init__(self, cursor):
+        cursor.execute("SELECT current_month, current_year FROM GameSettings WHERE id = 1")
+        settings = cursor.fetchone() or {'current_month': 1, 'current_year': 2024}
+        self.values = {
+            'month': settings['current_month'],
+            'year': settings['current_year'],
+            'period': settings['current_year'] * 12 + settings['current_month'] - 1,
+            'limit': 100,
+            'status': 'running',
+        }
+        for column, table in (('rosterId', 'Roster'), ('leagueId', 'League'), ('playerId', 'Player'),
+                              ('artistId', 'Artist'), ('runId', 'SettlementRun')):
+            cursor.execute(f"SELECT {column} FROM {table} ORDER BY {column} LIMIT 1 OFFSET 0")
+            row = cursor.fetchone()
+            self.values[column] = row[column] if row else 1
+        cursor.execute("SELECT username FROM Player LIMIT 1")
+        row = cursor.fetchone()
+        self.values['username'] = row['username'] if row else 'player1'
+
+    def get(self, hint):
+        hint = hint or ''
+        for key in (hint, hint.split('.')[-1], hint[0:1].lower() + hint[1:]):
+            if key in self.values:
+                return self.values[key]
+        if hint.lower().endswith('month'):
+            return self.values['month']
+        if hint.lower().endswith('year'):
+            return self.values['year']
+        if hint.lower() == 'ownerid':
+            return self.values['playerId']
+        if hint.lower() == 'lastrosterid':
+            return 0
+        return 1
+
+
+def check(cursor, statement, samples, max_rows):
+    params = [samples.get(hint) for hint in statement.hints]
+    cursor.execute("EXPLAIN " + statement.sql, params if params else None)
+    problems = []
+    for row in cursor.fetchall():
+        table = row.get('table') or ''
+        if not table or table.startswith('<'):
+            # Derived tables and unions are judged by the base tables that feed them
+            continue
+        rows = row.get('rows') or 0
+        extra = row.get('Extra') or ''
+        scan = row.get('type') == 'ALL'
+        filesort = 'Using filesort' in extra
+        if (scan or filesort) and rows > max_rows and (statement.source, table) not in ALLOWED_SCANS:
+            kind = 'full scan' if scan else 'filesort'
+            problems.append(f"{kind} of {table} (~{rows} rows, key={row.get('key')}, {extra or 'no extra'})")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every app and procedure statement and flag bad plans")
+    parser.add_argument('--max-rows', type=int, default=1000, help="largest scan/filesort tolerated")
+    parser.add_argument('--verbose', action='store_true', help="print every statement checked")
+    args = parser.parse_args()
+
+    statements = app_statements() + procedure_statements()
+
+    connection = connect(Config)
+    cursor = connection.cursor()
+    failures = errors = 0
+    try:
+        # Procedures read this session table; give their statements something to plan against
+        cursor.execute("CREATE TEMPORARY TABLE IF NOT EXISTS RecomputeArtist (artistId INT PRIMARY KEY)")
+        samples = Samples(cursor)
+        cursor.execute("INSERT IGNORE INTO RecomputeArtist (artistId) VALUES (%s)", (samples.get('artistId'),))
+
+        for statement in statements:
+            first_line = ' '.join(statement.sql.split())[:90]
+            try:
+                problems = check(cursor, statement, samples, args.max_rows)
+            except Exception as e:
+                errors += 1
+                print(f"ERROR {statement.source}: {first_line}\n      {e}")
+                continue
+            if problems:
+                failures += 1
+                print(f"FAIL  {statement.source}: {first_line}")
+                for problem in problems:
+                    print(f"      {problem}")
+            elif args.verbose:
+                print(f"ok    {statement.source}: {first_line}")
+    finally:
+        connection.rollback()
+        cursor.close()
+        connection.close()
+
+    print(f"\n{len(statements)} statements checked, {failures} with bad plans, {errors} could not be explained")
+    sys.exit(1 if failures or errors else 0)
+
+
+if __name__ == '__main__':
+    main()
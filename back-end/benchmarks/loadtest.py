@@ -0,0 +1,297 @@
+"""Concurrent HTTP load test for the hot endpoints.
+
+Seed a scratch database first (benchmarks/seed.py), then either point this at
+a running server with --base-url or let it start app.py in-process on a free
+port against the same MySQL:
+
+    MYSQL_DB=music_fantasy_league_bench python benchmarks/loadtest.py --requests 2000 --concurrency 16
+
+Each scenario fires its requests from a pool of threads and reports
+throughput and p50/p95/p99 latency. Results are written as JSON to
+benchmarks/results/ (one file per run), and --compare prints the change
+against an earlier run file (or `latest`).
+
+add_artist undoes each successful add with an untimed DELETE so rosters do
+not fill up; the 70% refund still drains budgets slowly over long runs.
+advance settles a real month each time, so it runs serially and only a few times.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from db import connect
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+SCENARIOS = ('search', 'roster_artists', 'add_artist', 'standings', 'advance')
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def call(base_url, method, path, body=None, timeout=30):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method)
+    if data is not None:
+        req.add_header('Content-Type', 'application/json')
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+class Fixture:
+    """Ids and search terms sampled from the seeded database."""
+
+    def __init__(self, cursor, sample_size=2000):
+        cursor.execute("SELECT rosterId FROM Roster ORDER BY RAND() LIMIT %s", (sample_size,))
+        self.roster_ids = [row['rosterId'] for row in cursor.fetchall()]
+        cursor.execute("SELECT leagueId FROM League ORDER BY RAND() LIMIT %s", (sample_size,))
+        self.league_ids = [row['leagueId'] for row in cursor.fetchall()]
+        cursor.execute("SELECT artistId, artistName FROM Artist ORDER BY RAND() LIMIT %s", (sample_size,))
+        artists = cursor.fetchall()
+        self.artist_ids = [row['artistId'] for row in artists]
+        self.terms = sorted({row['artistName'][:3].lower() for row in artists if len(row['artistName']) >= 3})
+
+        cursor.execute("SELECT COUNT(*) AS n FROM Player")
+        players = cursor.fetchone()['n']
+        cursor.execute("SELECT COUNT(*) AS n FROM Artist")
+        artist_count = cursor.fetchone()['n']
+        cursor.execute("SELECT COUNT(*) AS n FROM Roster")
+        rosters = cursor.fetchone()['n']
+        cursor.execute("SELECT COUNT(*) AS n FROM ArtistStats")
+        stats = cursor.fetchone()['n']
+        self.counts = {'players': players, 'artists': artist_count, 'rosters': rosters, 'artistStats': stats}
+
+        if not (self.roster_ids and self.league_ids and self.artist_ids):
+            raise SystemExit("database looks empty; run benchmarks/seed.py first")
+
+
+def scenario_request(name, base_url, fixture, rng):
+    """Issue one request for scenario `name`; returns (status, seconds) for the timed call."""
+    if name == 'search':
+        path = f"/api/artists/search?term={rng.choice(fixture.terms)}&limit=15"
+        started = time.perf_counter()
+        status, _ = call(base_url, 'GET', path)
+        return status, time.perf_counter() - started
+
+    if name == 'roster_artists':
+        started = time.perf_counter()
+        status, _ = call(base_url, 'GET', f"/api/rosters/{rng.choice(fixture.roster_ids)}/artists")
+        return status, time.perf_counter() - started
+
+    if name == 'standings':
+        started = time.perf_counter()
+        status, _ = call(base_url, 'GET', f"/api/standings/{rng.choice(fixture.league_ids)}?limit=25")
+        return status, time.perf_counter() - started
+
+    if name == 'add_artist':
+        roster_id = rng.choice(fixture.roster_ids)
+        artist_id = rng.choice(fixture.artist_ids)
+        started = time.perf_counter()
+        status, _ = call(base_url, 'POST', f"/api/rosters/{roster_id}/artists", {"artistId": artist_id})
+        elapsed = time.perf_counter() - started
+        if status == 200:
+            call(base_url, 'DELETE', f"/api/rosters/{roster_id}/artists/{artist_id}")
+        return status, elapsed
+
+    if name == 'advance':
+        started = time.perf_counter()
+        status, _ = call(base_url, 'POST', "/api/advance-month", {})
+        return status, time.perf_counter() - started
+
+    raise ValueError(name)
+
+
+def run_scenario(name, base_url, fixture, requests, concurrency, seed):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            try:
+                status, elapsed = scenario_request(name, base_url, fixture, rng)
+            except (urllib.error.URLError, OSError):
+                status, elapsed = 'connection_error', None
+            with lock:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if elapsed is not None:
+                    latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, i) for i in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.startswith('2'))
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": ok,
+        "statuses": statuses,
+        "seconds": round(wall, 3),
+        "throughput": round(requests / wall, 2) if wall else None,
+        "p50_ms": _ms(percentile(latencies, 0.50)),
+        "p95_ms": _ms(percentile(latencies, 0.95)),
+        "p99_ms": _ms(percentile(latencies, 0.99)),
+        "mean_ms": _ms(sum(latencies) / len(latencies)) if latencies else None,
+        "max_ms": _ms(latencies[-1]) if latencies else None,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def start_local_server():
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_result(path):
+    if path == 'latest':
+        runs = sorted(glob.glob(os.path.join(RESULTS_DIR, 'loadtest-*.json')))
+        if not runs:
+            return None, None
+        path = runs[-1]
+    with open(path) as f:
+        return path, json.load(f)
+
+
+def print_report(result, previous=None):
+    print(f"{'scenario':<16} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ok':>7}  statuses")
+    for name, row in result['scenarios'].items():
+        print(f"{name:<16} {_fmt(row['throughput']):>9} {_fmt(row['p50_ms']):>9} {_fmt(row['p95_ms']):>9} "
+              f"{_fmt(row['p99_ms']):>9} {row['ok']:>7}  {row['statuses']}")
+        before = (previous or {}).get('scenarios', {}).get(name)
+        if before:
+            print(f"{'  vs previous':<16} {_delta(before['throughput'], row['throughput']):>9} "
+                  f"{_delta(before['p50_ms'], row['p50_ms']):>9} {_delta(before['p95_ms'], row['p95_ms']):>9} "
+                  f"{_delta(before['p99_ms'], row['p99_ms']):>9}")
+
+
+def _fmt(value):
+    return '-' if value is None else f"{value:.2f}"
+
+
+def _delta(before, after):
+    if not before or after is None:
+        return '-'
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test of the hot API endpoints")
+    parser.add_argument('--base-url', help="running server to test; default starts app.py in-process")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--requests', type=int, default=1000, help="requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--advance-requests', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=411)
+    parser.add_argument('--label', default='', help="free-form note stored with the results")
+    parser.add_argument('--compare', help="earlier results file to diff against, or 'latest'")
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"unknown scenarios: {', '.join(unknown)}")
+
+    connection = connect(Config)
+    try:
+        cursor = connection.cursor()
+        fixture = Fixture(cursor)
+        cursor.close()
+    finally:
+        connection.close()
+
+    previous_path, previous = previous_result(args.compare) if args.compare else (None, None)
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server, base_url = start_local_server()
+
+    result = {
+        "startedAt": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "commit": git_commit(),
+        "label": args.label,
+        "baseUrl": base_url if args.base_url else 'in-process',
+        "database": Config.MYSQL_DB,
+        "dataset": fixture.counts,
+        "scenarios": {},
+    }
+    try:
+        # Warm caches (artist index, game clock, standings) so the first timed requests are not outliers
+        call(base_url, 'GET', f"/api/artists/search?term={fixture.terms[0]}")
+        call(base_url, 'GET', "/api/current-date")
+
+        for index, name in enumerate(scenarios):
+            if name == 'advance':
+                row = run_scenario(name, base_url, fixture, args.advance_requests, 1, args.seed + index)
+            else:
+                row = run_scenario(name, base_url, fixture, args.requests, args.concurrency, args.seed + index)
+            result['scenarios'][name] = row
+            print(f"{name}: {row['throughput']} req/s, p95 {row['p95_ms']} ms")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print()
+    if previous_path:
+        print(f"compared with {previous_path}")
+    print_report(result, previous)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"loadtest-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nsaved {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""Deterministic synthetic data for benchmarks and local testing.
+
+Wipes the game tables in the configured database and fills them with
+generated players, leagues, rosters, artists and months of ArtistStats. The
+same --seed always produces the same rows. Rows go in with multi-row
+executemany batches while the per-row ArtistStats and RosterMember triggers
+are deferred, and latest stats, roster points and (once migrations/ has added
+them) the artist ownership counts are computed once at the end.
+
+    MYSQL_DB=music_fantasy_league_bench python benchmarks/seed.py --players 20000 --artists 50000 --months 12
+
+Refuses to touch the default music_fantasy_league database unless --force is given.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from db import connect
+
+START_MONTH, START_YEAR = 1, 2024
+PROTECTED_DB = 'music_fantasy_league'
+
+SYLLABLES = (
+    'ka', 'lo', 'mi', 'ra', 'sen', 'tor', 'vel', 'zu', 'an', 'bri', 'cho', 'del',
+    'en', 'fa', 'gor', 'hil', 'is', 'jun', 'ko', 'lux', 'mar', 'no', 'or', 'pax',
+)
+NAME_WORDS = ('The', 'Lil', 'DJ', 'MC', 'Young', 'Big', 'Saint', 'Neon', 'Velvet', 'Midnight')
+
+TABLES = (
+    'RosterMember', 'ArtistLatestStats', 'ArtistStats', 'Roster', 'League',
+    'Artist', 'Player', 'SettlementRun',
+)
+
+
+def artist_name(rng):
+    word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    if rng.random() < 0.3:
+        return f'{rng.choice(NAME_WORDS)} {word}'
+    if rng.random() < 0.3:
+        other = ''.join(rng.choice(SYLLABLES) for _ in range(2)).capitalize()
+        return f'{word} {other}'
+    return word
+
+
+def period(offset):
+    ordinal = START_YEAR * 12 + (START_MONTH - 1) + offset
+    return ordinal % 12 + 1, ordinal // 12
+
+
+def insert_batches(cursor, sql, rows, batch_size):
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(sql, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def stats_rows(rng, artists, months):
+    # Random walk per artist so prices and popularity trend instead of jumping
+    state = [
+        (rng.randint(10_000, 5_000_000), rng.randint(1_000, 2_000_000), rng.randint(5, 95))
+        for _ in range(artists)
+    ]
+    for offset in range(months):
+        month, year = period(offset)
+        for index in range(artists):
+            listeners, followers, popularity = state[index]
+            listeners = max(0, int(listeners * rng.uniform(0.85, 1.2)))
+            followers = max(0, int(followers * rng.uniform(0.95, 1.1)))
+            popularity = min(100, max(0, popularity + rng.randint(-6, 6)))
+            state[index] = (listeners, followers, popularity)
+            price = max(10, popularity * 5 + listeners // 50_000)
+            yield (index + 1, month, year, listeners, followers, popularity, price)
+
+
+def seed(connection, players=1000, leagues=100, leagues_per_player=2, artists=5000,
+         months=6, members=6, budget=10000, seed=411, batch_size=5000, log=print):
+    """Replace the game tables with generated data; returns the row counts."""
+    rng = random.Random(seed)
+    leagues_per_player = min(leagues_per_player, leagues)
+    counts = {}
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SET @defer_stats_triggers = 1")
+        cursor.execute("SET @defer_ownership_triggers = 1")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for table in TABLES:
+            cursor.execute(f"DELETE FROM {table}")
+        # Only a migrated database has the ownership counters; the recount below also clears them
+        ownership = cursor.execute("SHOW TABLES LIKE 'ArtistOwnership'") > 0
+
+        counts['players'] = insert_batches(
+            cursor,
+            "INSERT INTO Player (playerId, playerName, username, password) VALUES (%s, %s, %s, %s)",
+            ((i, f'Player {i}', f'player{i}', f'password{i}') for i in range(1, players + 1)),
+            batch_size
+        )
+        log(f"players      {counts['players']}")
+
+        memberships = {}
+        roster_rows = []
+        for player_id in range(1, players + 1):
+            for league_id in rng.sample(range(1, leagues + 1), leagues_per_player):
+                memberships.setdefault(league_id, []).append(player_id)
+                roster_rows.append((len(roster_rows) + 1, f'Roster {len(roster_rows) + 1}', budget, player_id, league_id))
+
+        counts['leagues'] = insert_batches(
+            cursor,
+            "INSERT INTO League (leagueId, leagueName, playerCount, ownerId) VALUES (%s, %s, %s, %s)",
+            ((i, f'League {i}', len(memberships.get(i, [])), memberships[i][0] if i in memberships else None)
+             for i in range(1, leagues + 1)),
+            batch_size
+        )
+        log(f"leagues      {counts['leagues']}")
+
+        counts['artists'] = insert_batches(
+            cursor,
+            "INSERT INTO Artist (artistId, artistName) VALUES (%s, %s)",
+            ((i, artist_name(rng)) for i in range(1, artists + 1)),
+            batch_size
+        )
+        log(f"artists      {counts['artists']}")
+
+        counts['rosters'] = insert_batches(
+            cursor,
+            "INSERT INTO Roster (rosterId, rosterName, budget, points, playerId, leagueId) VALUES (%s, %s, %s, 0, %s, %s)",
+            roster_rows,
+            batch_size
+        )
+        log(f"rosters      {counts['rosters']}")
+
+        counts['rosterMembers'] = insert_batches(
+            cursor,
+            "INSERT INTO RosterMember (artistId, rosterId) VALUES (%s, %s)",
+            ((artist_id, roster[0]) for roster in roster_rows
+             for artist_id in rng.sample(range(1, artists + 1), min(members, artists))),
+            batch_size
+        )
+        log(f"members      {counts['rosterMembers']}")
+
+        counts['artistStats'] = insert_batches(
+            cursor,
+            "INSERT INTO ArtistStats (artistId, month, year, listeners, followers, popularity, price) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            stats_rows(rng, artists, months),
+            batch_size
+        )
+        log(f"artistStats  {counts['artistStats']}")
+
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        cursor.execute("SET @defer_stats_triggers = 0")
+        cursor.execute("SET @defer_ownership_triggers = 0")
+        # The per-row triggers were off, so build the latest-stats snapshot once here
+        cursor.execute("CALL RefreshAllArtistLatestStats()")
+        if ownership:
+            cursor.execute("CALL RebuildArtistOwnership()")
+
+        # The game sits in the last seeded month, so every artist has current stats
+        month, year = period(months - 1)
+        cursor.execute(
+            "INSERT INTO GameSettings (id, current_month, current_year, version) VALUES (1, %s, %s, 0) "
+            "ON DUPLICATE KEY UPDATE current_month = VALUES(current_month), current_year = VALUES(current_year), "
+            "version = GameSettings.version + 1",
+            (month, year)
+        )
+        cursor.execute("CALL UpdateAllRosterPoints()")
+        connection.commit()
+        return counts
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the configured database with deterministic synthetic data")
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--leagues', type=int, default=100)
+    parser.add_argument('--leagues-per-player', type=int, default=2)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--months', type=int, default=6)
+    parser.add_argument('--members', type=int, default=6, help="artists per roster")
+    parser.add_argument('--budget', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=411)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--force', action='store_true', help=f"allow wiping {PROTECTED_DB}")
+    args = parser.parse_args()
+
+    if Config.MYSQL_DB == PROTECTED_DB and not args.force:
+        sys.exit(f"refusing to wipe {PROTECTED_DB}; point MYSQL_DB at a scratch database or pass --force")
+    if args.months < 1:
+        sys.exit("--months must be at least 1")
+
+    connection = connect(Config)
+    started = time.perf_counter()
+    try:
+        seed(
+            connection,
+            players=args.players,
+            leagues=args.leagues,
+            leagues_per_player=args.leagues_per_player,
+            artists=args.artists,
+            months=args.months,
+            members=args.members,
+            budget=args.budget,
+            seed=args.seed,
+            batch_size=args.batch_size,
+        )
+    finally:
+        connection.close()
+    print(f"seeded {Config.MYSQL_DB} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
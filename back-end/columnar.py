@@ -0,0 +1,391 @@
+"""Columnar export and fast restore of the whole game state.
+
+    python columnar.py export state-2024-06
+    MYSQL_DB=music_fantasy_league_bench python columnar.py import state-2024-06 --load-data
+
+An export is a directory holding manifest.json and one NumPy .npy file per
+column of Player, League, Artist, Roster, RosterMember, ArtistStats and
+GameSettings. Artist is included because RosterMember and ArtistStats point
+at it. Integer columns are int32, the width of MySQL INT, so a stats row costs
+28 bytes. A text column is a uint8 file of UTF-8 bytes with an int64
+`.offsets.npy` beside it. A nullable column gets a bool `.null.npy` marking its
+NULL rows. Rows are written in primary-key order.
+
+Export reads every table in one consistent snapshot through an unbuffered
+server-side cursor. Each column file is filled a batch at a time through a
+memory map, so memory stays flat whatever the table size. Import reads the
+files memory-mapped and loads them in committed batches, with executemany or,
+given --load-data, LOAD DATA LOCAL INFILE. Foreign-key and unique checks are
+off and the per-row ArtistStats and RosterMember triggers are deferred during
+the load. ArtistLatestStats and the ownership counters are rebuilt once at the
+end.
+
+Offline tools need neither MySQL nor a load step: `read_export` maps every
+column with np.load(mmap_mode='r'), and simulator.py accepts an export
+directory wherever it takes an .npz snapshot.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+PROTECTED_DB = 'music_fantasy_league'
+
+
+class Column:
+    def __init__(self, name, kind='int', nullable=False):
+        self.name = name
+        self.kind = kind
+        self.nullable = nullable
+
+
+# (table, primary key, columns), parents before the tables that reference them
+TABLES = (
+    ('Player', 'playerId', (
+        Column('playerId'), Column('playerName', 'text'), Column('username', 'text'), Column('password', 'text'),
+    )),
+    ('League', 'leagueId', (
+        Column('leagueId'), Column('leagueName', 'text'), Column('playerCount', nullable=True),
+        Column('ownerId', nullable=True),
+    )),
+    ('Artist', 'artistId', (
+        Column('artistId'), Column('artistName', 'text'),
+    )),
+    ('Roster', 'rosterId', (
+        Column('rosterId'), Column('rosterName', 'text'), Column('budget'), Column('points'),
+        Column('playerId'), Column('leagueId'),
+    )),
+    ('RosterMember', 'artistId, rosterId', (
+        Column('artistId'), Column('rosterId'),
+    )),
+    ('ArtistStats', 'artistId, month, year', (
+        Column('artistId'), Column('month'), Column('year'), Column('listeners'), Column('followers'),
+        Column('popularity'), Column('price'),
+    )),
+    ('GameSettings', 'id', (
+        Column('id'), Column('current_month'), Column('current_year'), Column('version'),
+    )),
+)
+
+# Emptied before an import; ArtistLatestStats is derived and SettlementRun is per-database history
+WIPE_TABLES = (
+    'RosterMember', 'ArtistLatestStats', 'ArtistStats', 'Roster', 'League', 'Artist', 'Player',
+    'SettlementRun', 'GameSettings',
+)
+
+
+def _write_npy_from_raw(raw_path, path, dtype, count):
+    # The byte count of a text column is only known at the end; prepend the header then
+    with open(path, 'wb') as out, open(raw_path, 'rb') as raw:
+        np.lib.format.write_array_header_1_0(out, {
+            'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+            'fortran_order': False,
+            'shape': (count,),
+        })
+        shutil.copyfileobj(raw, out, 1 << 20)
+    os.unlink(raw_path)
+
+
+class _ColumnWriter:
+    def __init__(self, directory, table, column, rows):
+        self.column = column
+        self.directory = directory
+        self.base = f"{table}.{column.name}"
+        self.nulls = None
+        if column.nullable:
+            self.nulls = np.lib.format.open_memmap(self._path('.null.npy'), 'w+', np.bool_, (rows,))
+        if column.kind == 'text':
+            self.offsets = np.lib.format.open_memmap(self._path('.offsets.npy'), 'w+', np.int64, (rows + 1,))
+            self.offsets[0] = 0
+            self.raw = open(self._path('.npy.part'), 'wb')
+        else:
+            self.values = np.lib.format.open_memmap(self._path('.npy'), 'w+', np.int32, (rows,))
+
+    def _path(self, suffix):
+        return os.path.join(self.directory, self.base + suffix)
+
+    def write(self, start, values):
+        count = len(values)
+        if self.nulls is not None:
+            self.nulls[start:start + count] = [value is None for value in values]
+            values = [0 if value is None else value for value in values]
+        if self.column.kind == 'text':
+            encoded = [value.encode('utf-8') for value in values]
+            lengths = np.fromiter((len(value) for value in encoded), dtype=np.int64, count=count)
+            self.offsets[start + 1:start + count + 1] = self.offsets[start] + np.cumsum(lengths)
+            self.raw.write(b''.join(encoded))
+        else:
+            self.values[start:start + count] = np.fromiter(values, dtype=np.int32, count=count)
+
+    def close(self):
+        entry = {"name": self.column.name, "kind": self.column.kind}
+        if self.column.kind == 'text':
+            self.raw.close()
+            size = int(self.offsets[-1])
+            self.offsets.flush()
+            del self.offsets
+            _write_npy_from_raw(self._path('.npy.part'), self._path('.npy'), np.uint8, size)
+            entry['offsets'] = self.base + '.offsets.npy'
+        else:
+            self.values.flush()
+            del self.values
+        entry['file'] = self.base + '.npy'
+        if self.nulls is not None:
+            self.nulls.flush()
+            self.nulls = None
+            entry['nulls'] = self.base + '.null.npy'
+        return entry
+
+
+def export(connection, directory, batch_size=100000, log=print):
+    """Write every table in TABLES to `directory` from one consistent snapshot; returns the manifest."""
+    # Imported here so offline readers of an export do not need MySQLdb
+    import MySQLdb.cursors
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = {
+        "format": FORMAT_VERSION,
+        "exportedAt": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "tables": {},
+    }
+    cursor = connection.cursor(MySQLdb.cursors.SSCursor)
+    try:
+        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+        for table, key, columns in TABLES:
+            started = time.perf_counter()
+            # An unbuffered result must be read to the end before the next statement
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            rows = cursor.fetchall()[0][0]
+
+            writers = [_ColumnWriter(directory, table, column, rows) for column in columns]
+            cursor.execute(f"SELECT {', '.join(column.name for column in columns)} FROM {table} ORDER BY {key}")
+            done = 0
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                if done + len(batch) > rows:
+                    raise ValueError(f"{table} returned more rows than it counted ({rows})")
+                for writer, values in zip(writers, zip(*batch)):
+                    writer.write(done, values)
+                done += len(batch)
+            if done != rows:
+                raise ValueError(f"{table} returned {done} rows but counted {rows}")
+
+            manifest['tables'][table] = {
+                "rows": rows,
+                "key": key,
+                "columns": [writer.close() for writer in writers],
+            }
+            elapsed = time.perf_counter() - started
+            log(f"{table:<13} {rows:>11,} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class TextColumn:
+    """A memory-mapped text column: UTF-8 bytes plus row offsets, decoded on access."""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+    def slice(self, start, stop):
+        offsets = self.offsets[start:stop + 1] - self.offsets[start]
+        chunk = self.data[self.offsets[start]:self.offsets[stop]].tobytes()
+        return [chunk[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(stop - start)]
+
+
+class ExportedTable:
+    def __init__(self, directory, name, spec):
+        self.name = name
+        self.rows = spec['rows']
+        self.key = spec['key']
+        # Column name -> memory-mapped array (or TextColumn); NULL rows hold 0 and are marked in nulls
+        self.columns = {}
+        self.nulls = {}
+        for column in spec['columns']:
+            data = np.load(os.path.join(directory, column['file']), mmap_mode='r')
+            if column['kind'] == 'text':
+                data = TextColumn(data, np.load(os.path.join(directory, column['offsets']), mmap_mode='r'))
+            self.columns[column['name']] = data
+            if 'nulls' in column:
+                self.nulls[column['name']] = np.load(os.path.join(directory, column['nulls']), mmap_mode='r')
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def batch(self, names, start, stop):
+        """Rows start..stop as tuples of Python values, with None for NULL."""
+        values = []
+        for name in names:
+            data = self.columns[name]
+            column = data.slice(start, stop) if isinstance(data, TextColumn) else data[start:stop].tolist()
+            if name in self.nulls:
+                column = [None if null else value for value, null in zip(column, self.nulls[name][start:stop])]
+            values.append(column)
+        return list(zip(*values))
+
+
+class Export:
+    def __init__(self, directory, manifest):
+        self.directory = directory
+        self.manifest = manifest
+        self.tables = {name: ExportedTable(directory, name, spec) for name, spec in manifest['tables'].items()}
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+
+def read_export(directory):
+    """Open an export with every column memory-mapped; nothing is read until it is used."""
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_VERSION:
+        raise ValueError(f"{directory} is export format {manifest.get('format')}, expected {FORMAT_VERSION}")
+    return Export(directory, manifest)
+
+
+def _tsv_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+    return str(value)
+
+
+def insert_batch(cursor, table, names, rows, use_load_data):
+    if not use_load_data:
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(['%s'] * len(names))})",
+            rows
+        )
+        return
+
+    with tempfile.NamedTemporaryFile('w', suffix='.tsv', encoding='utf-8', delete=False) as f:
+        f.writelines('\t'.join(map(_tsv_value, row)) + '\n' for row in rows)
+    try:
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 ({', '.join(names)})",
+            (f.name,)
+        )
+    finally:
+        os.unlink(f.name)
+
+
+def restore(connection, directory, batch_size=50000, use_load_data=False, log=print):
+    """Replace the game tables with an export; returns the row counts loaded per table."""
+    source = read_export(directory)
+    counts = {}
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT version FROM GameSettings WHERE id = 1")
+        previous = cursor.fetchone()
+        ownership = cursor.execute("SHOW TABLES LIKE 'ArtistOwnership'") > 0
+
+        cursor.execute("SET @defer_stats_triggers = 1")
+        cursor.execute("SET @defer_ownership_triggers = 1")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        cursor.execute("SET UNIQUE_CHECKS = 0")
+        for table in WIPE_TABLES:
+            cursor.execute(f"TRUNCATE TABLE {table}")
+
+        for table, _, columns in TABLES:
+            exported = source[table]
+            names = [column.name for column in columns]
+            started = time.perf_counter()
+            for start in range(0, exported.rows, batch_size):
+                rows = exported.batch(names, start, min(start + batch_size, exported.rows))
+                insert_batch(cursor, table, names, rows, use_load_data)
+                connection.commit()
+            counts[table] = exported.rows
+            elapsed = time.perf_counter() - started
+            log(f"{table:<13} {exported.rows:>11,} rows in {elapsed:.1f}s "
+                f"({exported.rows / elapsed if elapsed else 0:,.0f} rows/s)")
+
+        cursor.execute("SET UNIQUE_CHECKS = 1")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        cursor.execute("SET @defer_stats_triggers = 0")
+        cursor.execute("SET @defer_ownership_triggers = 0")
+
+        # Derived tables are rebuilt once from what was loaded; roster points are restored as exported
+        cursor.execute("CALL RefreshAllArtistLatestStats()")
+        if ownership:
+            cursor.execute("CALL RebuildArtistOwnership()")
+
+        # A clock version this database has not used yet, so running processes drop their caches
+        exported_version = int(source['GameSettings']['version'][0]) if source['GameSettings'].rows else 0
+        version = max(exported_version, previous['version'] if previous else 0) + 1
+        cursor.execute("UPDATE GameSettings SET version = %s WHERE id = 1", (version,))
+        connection.commit()
+        return counts
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar export and restore of the game tables")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    dump = commands.add_parser('export', help="write the game tables to a directory of .npy columns")
+    dump.add_argument('directory')
+    dump.add_argument('--batch-size', type=int, default=100000)
+
+    load = commands.add_parser('import', help="replace the game tables with an export")
+    load.add_argument('directory')
+    load.add_argument('--batch-size', type=int, default=50000)
+    load.add_argument('--load-data', action='store_true',
+                      help="use LOAD DATA LOCAL INFILE per batch instead of executemany")
+    load.add_argument('--force', action='store_true', help=f"allow replacing {PROTECTED_DB}")
+    args = parser.parse_args()
+
+    from config import Config
+    from db import connect
+    from ingest_stats import peak_memory_mb
+
+    if args.command == 'import' and Config.MYSQL_DB == PROTECTED_DB and not args.force:
+        sys.exit(f"refusing to replace {PROTECTED_DB}; point MYSQL_DB at a scratch database or pass --force")
+
+    use_load_data = args.command == 'import' and args.load_data
+    connection = connect(Config, local_infile=1 if use_load_data else 0)
+    started = time.perf_counter()
+    try:
+        if args.command == 'export':
+            manifest = export(connection, args.directory, args.batch_size)
+            rows = sum(table['rows'] for table in manifest['tables'].values())
+        else:
+            rows = sum(restore(connection, args.directory, args.batch_size, use_load_data).values())
+    finally:
+        connection.close()
+
+    verb = 'exported' if args.command == 'export' else 'imported'
+    print(f"{verb} {rows:,} rows in {time.perf_counter() - started:.1f}s, peak memory {peak_memory_mb():.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
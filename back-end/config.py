@@ -2,8 +2,88 @@ import os
 
 class Config:
     MYSQL_HOST = os.getenv("MYSQL_HOST", "34.29.70.228")
+    MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
     MYSQL_USER = os.getenv("MYSQL_USER", "root")
     MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "cs411sucksass")
     MYSQL_DB = os.getenv("MYSQL_DB", "music_fantasy_league")
     MYSQL_CURSORCLASS = 'DictCursor'
+    MYSQL_CONNECT_TIMEOUT = int(os.getenv("MYSQL_CONNECT_TIMEOUT", "5"))
 
+    # Connection pool: at most MYSQL_POOL_SIZE open connections per process; a request
+    # waits up to MYSQL_POOL_TIMEOUT seconds for one before failing with a 503
+    MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "10"))
+    MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "5"))
+    MYSQL_POOL_RECYCLE = float(os.getenv("MYSQL_POOL_RECYCLE", "3600"))
+    MYSQL_POOL_PRE_PING = os.getenv("MYSQL_POOL_PRE_PING", "1") == "1"
+    # Only connections idle in the pool longer than this many seconds are pinged on checkout
+    MYSQL_POOL_PING_AFTER = float(os.getenv("MYSQL_POOL_PING_AFTER", "30"))
+    # Requests holding a connection longer than this are logged as likely leaks
+    MYSQL_POOL_LEAK_SECONDS = float(os.getenv("MYSQL_POOL_LEAK_SECONDS", "30"))
+
+    # Read replicas as "host" or "host:port", comma separated; empty sends everything to MYSQL_HOST.
+    # GET requests read from a replica pool of MYSQL_REPLICA_POOL_SIZE connections per host, unless
+    # the client wrote within REPLICA_LAG_TOLERANCE seconds, in which case they stay on the primary
+    MYSQL_REPLICA_HOSTS = [host.strip() for host in os.getenv("MYSQL_REPLICA_HOSTS", "").split(",") if host.strip()]
+    MYSQL_REPLICA_POOL_SIZE = int(os.getenv("MYSQL_REPLICA_POOL_SIZE", "10"))
+    REPLICA_LAG_TOLERANCE = float(os.getenv("REPLICA_LAG_TOLERANCE", "5"))
+
+    # PREPARE the named statements in queries.py once per pooled connection and EXECUTE them
+    MYSQL_PREPARE_STATEMENTS = os.getenv("MYSQL_PREPARE_STATEMENTS", "0") == "1"
+
+    # Seconds a worker may serve its cached game clock before re-reading GameSettings; the
+    # per-process watcher renews it every GAME_CLOCK_POLL_SECONDS while the version is unchanged
+    GAME_CLOCK_TTL = float(os.getenv("GAME_CLOCK_TTL", "2"))
+    GAME_CLOCK_POLL_SECONDS = float(os.getenv("GAME_CLOCK_POLL_SECONDS", "1"))
+
+    # Seconds between catch-up reads of newly inserted Artist rows into the search index
+    ARTIST_INDEX_SYNC_TTL = float(os.getenv("ARTIST_INDEX_SYNC_TTL", "30"))
+
+    # Budget every new roster starts with; also the --fresh starting budget in simulator.py
+    ROSTER_STARTING_BUDGET = 2000
+
+    # Rosters settled per committed transaction by the chunked /api/advance-month mode
+    SETTLEMENT_CHUNK_SIZE = int(os.getenv("SETTLEMENT_CHUNK_SIZE", "500"))
+
+    # Background jobs: worker threads per process, running jobs allowed across all processes
+    # (the cap on concurrent heavy jobs), attempts before a job is marked failed, seconds
+    # between queue polls, seconds without a progress heartbeat before a running job is
+    # assumed dead and requeued, and base retry delay
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_MAX_RUNNING = int(os.getenv("JOB_MAX_RUNNING", "2"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+    JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "600"))
+    JOB_RETRY_SECONDS = int(os.getenv("JOB_RETRY_SECONDS", "10"))
+    # Rosters deleted per committed transaction by the leave_league and delete_player jobs
+    JOB_DELETE_CHUNK_SIZE = int(os.getenv("JOB_DELETE_CHUNK_SIZE", "200"))
+
+    # Settlement event streams: events buffered per subscriber before the oldest are dropped,
+    # seconds between GameSettings polls by the watcher, seconds between keep-alive comments,
+    # and open streams allowed per process
+    EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", "8"))
+    EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", "2"))
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "5000"))
+
+    # Seconds an in-memory league standings tree is trusted before it is reloaded
+    STANDINGS_TTL = float(os.getenv("STANDINGS_TTL", "30"))
+
+    # Seconds the in-memory ArtistStats history behind /api/analytics is reused before reloading
+    ANALYTICS_TTL = float(os.getenv("ANALYTICS_TTL", "300"))
+
+    # Statements slower than this many seconds are logged and counted as slow queries
+    SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.2"))
+
+    # aiomysql connections per process for the async read endpoints in asgi.py
+    ASYNC_MYSQL_POOL_SIZE = int(os.getenv("ASYNC_MYSQL_POOL_SIZE", "50"))
+
+    # Signs session tokens; unset falls back to a public development key, which AUTH_REQUIRED refuses
+    SECRET_KEY = os.getenv("SECRET_KEY")
+    # Seconds a session token issued at login stays valid
+    SESSION_TOKEN_TTL = int(os.getenv("SESSION_TOKEN_TTL", "86400"))
+    # PBKDF2 iterations for new password hashes; older hashes are upgraded on login
+    PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "200000"))
+    # Reject mutating requests without a session token instead of trusting the playerId in the body
+    AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "0") == "1"
+    # Player ids allowed to advance the game clock besides league owners, comma separated
+    ADMIN_PLAYER_IDS = {int(pid) for pid in os.getenv("ADMIN_PLAYER_IDS", "").split(",") if pid.strip()}
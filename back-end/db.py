@@ -0,0 +1,424 @@
+"""Bounded MySQL connection pool and the per-request session built on it.
+
+`PooledMySQL` replaces flask_mysqldb's `MySQL(app)` with the same
+`mysql.connection.cursor()` interface, but the connection comes from a shared
+pool. Each app context checks out one connection on first use and gives it
+back on teardown, after closing any cursor a handler left open and rolling
+back any transaction it left unfinished. mysqlclient does not expose the
+server's in-transaction flag, so the session notes whether any statement ran
+since the last commit or rollback and skips the ROLLBACK round trip when none
+did. Likewise only connections idle longer than MYSQL_POOL_PING_AFTER are
+pinged on checkout. With a `Metrics` attached, every cursor is wrapped so its
+statements are timed and counted.
+
+With MYSQL_REPLICA_HOSTS set, `mysql.connection` in a GET or HEAD request
+comes from a replica pool (round robin across hosts) and everything else from
+the primary. A successful write stamps the client with a last-write time, as
+a cookie and an X-Last-Write response header that API clients can echo back;
+reads within REPLICA_LAG_TOLERANCE seconds of it stay on the primary so the
+client sees its own write. `mysql.primary` always gives the primary, for the
+odd GET that has to write. `mysql.cache_cursor()` is for filling the
+process-wide caches (game clock, standings, analytics, artist index): those
+are shared by every client, including ones pinned to the primary, so they are
+never loaded from a replica. Its primary connection is only checked out if a
+cache actually misses.
+"""
+import itertools
+import logging
+import threading
+import time
+
+import MySQLdb
+import MySQLdb.cursors
+from flask import g, has_request_context, request
+
+from metrics import InstrumentedCursor
+
+log = logging.getLogger(__name__)
+
+LAST_WRITE_COOKIE = 'db_last_write'
+LAST_WRITE_HEADER = 'X-Last-Write'
+READ_METHODS = ('GET', 'HEAD')
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def connect(config, **overrides):
+    options = dict(
+        host=config.MYSQL_HOST,
+        port=config.MYSQL_PORT,
+        user=config.MYSQL_USER,
+        passwd=config.MYSQL_PASSWORD,
+        db=config.MYSQL_DB,
+        connect_timeout=config.MYSQL_CONNECT_TIMEOUT,
+        cursorclass=getattr(MySQLdb.cursors, config.MYSQL_CURSORCLASS),
+        charset='utf8mb4',
+    )
+    options.update(overrides)
+    return MySQLdb.connect(**options)
+
+
+def split_host(value, default_port):
+    host, _, port = value.partition(':')
+    return host, int(port) if port else default_port
+
+
+class _Entry:
+    __slots__ = ('raw', 'created_at', 'released_at')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = self.released_at = time.monotonic()
+
+
+class ConnectionPool:
+    def __init__(self, factory, size=10, timeout=5.0, recycle=3600.0, pre_ping=True, ping_after=30.0):
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._counters = {
+            'acquired': 0,
+            'timeouts': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'ping_failures': 0,
+            'recycled': 0,
+            'discarded': 0,
+        }
+
+    def acquire(self):
+        started = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._idle and self._open >= self.size:
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(f"No database connection free after {self.timeout:.1f}s")
+                    self._cond.wait(remaining)
+
+                entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    # Reserve the slot now, open the connection outside the lock
+                    self._open += 1
+                self._in_use += 1
+            finally:
+                self._waiting -= 1
+
+            waited = time.monotonic() - started
+            self._counters['acquired'] += 1
+            self._counters['wait_seconds_total'] += waited
+            self._counters['wait_seconds_max'] = max(self._counters['wait_seconds_max'], waited)
+
+        try:
+            return self._checked(entry)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _checked(self, entry):
+        now = time.monotonic()
+        if entry is not None and now - entry.created_at > self.recycle:
+            self._close(entry)
+            self._count('recycled')
+            entry = None
+
+        # A connection back in the pool moments ago is almost certainly alive; the
+        # ping is only worth its round trip once the server may have dropped it
+        if entry is not None and self.pre_ping and now - entry.released_at > self.ping_after:
+            try:
+                entry.raw.ping()
+            except MySQLdb.Error:
+                self._close(entry)
+                self._count('ping_failures')
+                entry = None
+
+        return entry or _Entry(self.factory())
+
+    def release(self, entry, discard=False):
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._open -= 1
+                self._counters['discarded'] += 1
+            else:
+                entry.released_at = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+        if discard:
+            self._close(entry)
+
+    def _count(self, name):
+        with self._cond:
+            self._counters[name] += 1
+
+    @staticmethod
+    def _close(entry):
+        try:
+            entry.raw.close()
+        except MySQLdb.Error:
+            pass
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._counters)
+            stats.update(
+                size=self.size,
+                open=self._open,
+                in_use=self._in_use,
+                idle=len(self._idle),
+                waiting=self._waiting,
+            )
+        stats['wait_seconds_avg'] = stats['wait_seconds_total'] / stats['acquired'] if stats['acquired'] else 0.0
+        return stats
+
+
+class ScopedConnection:
+    """The connection handed to one app context; remembers every cursor it opens."""
+
+    def __init__(self, pool, entry, endpoint, metrics=None, request_stats=None):
+        self.pool = pool
+        self.entry = entry
+        self.endpoint = endpoint
+        self.metrics = metrics
+        self.request_stats = request_stats
+        self.acquired_at = time.monotonic()
+        # Set by any statement, cleared by commit/rollback: whether teardown must roll back
+        self.in_transaction = False
+        self._cursors = []
+
+    def cursor(self, *args, **kwargs):
+        cursor = self.entry.raw.cursor(*args, **kwargs)
+        self._cursors.append(cursor)
+        cursor = _TrackedCursor(cursor, self)
+        if self.metrics is not None:
+            return InstrumentedCursor(cursor, self.metrics, self.request_stats)
+        return cursor
+
+    def commit(self):
+        self.entry.raw.commit()
+        self.in_transaction = False
+
+    def rollback(self):
+        self.entry.raw.rollback()
+        self.in_transaction = False
+
+    def __getattr__(self, name):
+        return getattr(self.entry.raw, name)
+
+    def close_cursors(self):
+        leaked = 0
+        for cursor in self._cursors:
+            if cursor.connection is not None:
+                leaked += 1
+                try:
+                    cursor.close()
+                except MySQLdb.Error:
+                    pass
+        self._cursors = []
+        return leaked
+
+
+class _TrackedCursor:
+    # Marks the session as having an open transaction whenever a statement runs
+    def __init__(self, cursor, scoped):
+        self._cursor = cursor
+        self._scoped = scoped
+
+    def execute(self, query, args=None):
+        self._scoped.in_transaction = True
+        return self._cursor.execute(query, args)
+
+    def executemany(self, query, args):
+        self._scoped.in_transaction = True
+        return self._cursor.executemany(query, args)
+
+    def callproc(self, procname, args=()):
+        self._scoped.in_transaction = True
+        return self._cursor.callproc(procname, args)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _PrimaryCursor:
+    # Opens a primary cursor on first use, so a cache hit costs no primary connection
+    def __init__(self, mysql):
+        self._mysql = mysql
+        self._cursor = None
+
+    @property
+    def connection(self):
+        return self._mysql.primary
+
+    def __getattr__(self, name):
+        if self._cursor is None:
+            self._cursor = self._mysql.primary.cursor()
+        return getattr(self._cursor, name)
+
+    def close(self):
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+
+
+class PooledMySQL:
+    def __init__(self, app=None, metrics=None):
+        self.pool = None
+        self.replicas = []
+        self.metrics = metrics
+        self.leak_seconds = 30.0
+        self.lag_tolerance = 5.0
+        self.leaked_cursors = 0
+        self.slow_releases = 0
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self._next_replica = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        view = _ConfigView(config)
+        self.pool = ConnectionPool(
+            lambda: connect(view),
+            size=config['MYSQL_POOL_SIZE'],
+            timeout=config['MYSQL_POOL_TIMEOUT'],
+            recycle=config['MYSQL_POOL_RECYCLE'],
+            pre_ping=config['MYSQL_POOL_PRE_PING'],
+            ping_after=config['MYSQL_POOL_PING_AFTER'],
+        )
+        for address in config['MYSQL_REPLICA_HOSTS']:
+            host, port = split_host(address, config['MYSQL_PORT'])
+            self.replicas.append(ConnectionPool(
+                lambda host=host, port=port: connect(view, host=host, port=port),
+                size=config['MYSQL_REPLICA_POOL_SIZE'],
+                timeout=config['MYSQL_POOL_TIMEOUT'],
+                recycle=config['MYSQL_POOL_RECYCLE'],
+                pre_ping=config['MYSQL_POOL_PRE_PING'],
+                ping_after=config['MYSQL_POOL_PING_AFTER'],
+            ))
+        self._next_replica = itertools.cycle(self.replicas)
+        self.leak_seconds = config['MYSQL_POOL_LEAK_SECONDS']
+        self.lag_tolerance = config['REPLICA_LAG_TOLERANCE']
+        app.teardown_appcontext(self.teardown)
+        if self.replicas:
+            app.after_request(self.remember_write)
+
+    def _checkout(self, pool):
+        endpoint = request.endpoint if has_request_context() else None
+        return ScopedConnection(pool, pool.acquire(), endpoint, self.metrics, g.get('_request_stats'))
+
+    @property
+    def primary(self):
+        scoped = g.get('_db_primary')
+        if scoped is None:
+            scoped = g._db_primary = self._checkout(self.pool)
+        return scoped
+
+    def cache_cursor(self):
+        cursor = g.get('_db_cache_cursor')
+        if cursor is None:
+            cursor = g._db_cache_cursor = _PrimaryCursor(self)
+        return cursor
+
+    @property
+    def connection(self):
+        scoped = g.get('_db_connection')
+        if scoped is None:
+            if self._reads_from_replica():
+                self.replica_reads += 1
+                scoped = self._checkout(next(self._next_replica))
+            else:
+                if has_request_context() and request.method in READ_METHODS:
+                    self.primary_reads += 1
+                scoped = self.primary
+            g._db_connection = scoped
+        return scoped
+
+    def _reads_from_replica(self):
+        if not self.replicas or not has_request_context() or request.method not in READ_METHODS:
+            return False
+        last_write = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+        try:
+            # The client wrote recently enough that a replica may not have its write yet
+            return time.time() - float(last_write) > self.lag_tolerance
+        except (TypeError, ValueError):
+            return True
+
+    def remember_write(self, response):
+        if request.method in READ_METHODS or request.method == 'OPTIONS' or response.status_code >= 400:
+            return response
+        stamp = f"{time.time():.3f}"
+        response.set_cookie(LAST_WRITE_COOKIE, stamp, max_age=max(1, int(self.lag_tolerance + 1)), samesite='Lax')
+        response.headers[LAST_WRITE_HEADER] = stamp
+        return response
+
+    def teardown(self, exception):
+        cache_cursor = g.pop('_db_cache_cursor', None)
+        if cache_cursor is not None:
+            cache_cursor.close()
+        routed = g.pop('_db_connection', None)
+        primary = g.pop('_db_primary', None)
+        for scoped in (routed, primary) if routed is not primary else (primary,):
+            if scoped is not None:
+                self._release(scoped)
+
+    def _release(self, scoped):
+        leaked = scoped.close_cursors()
+        if leaked:
+            self.leaked_cursors += leaked
+            log.debug("%s left %d cursor(s) open", scoped.endpoint, leaked)
+
+        held = time.monotonic() - scoped.acquired_at
+        if held > self.leak_seconds:
+            self.slow_releases += 1
+            log.warning("%s held a database connection for %.1fs", scoped.endpoint, held)
+
+        # Whatever the handler did not commit is abandoned, never carried into the next request
+        if not scoped.in_transaction:
+            scoped.pool.release(scoped.entry)
+            return
+        try:
+            scoped.entry.raw.rollback()
+        except MySQLdb.Error:
+            scoped.pool.release(scoped.entry, discard=True)
+        else:
+            scoped.pool.release(scoped.entry)
+
+    def stats(self):
+        stats = self.pool.stats()
+        stats.update(leaked_cursors=self.leaked_cursors, slow_releases=self.slow_releases)
+        if self.replicas:
+            stats.update(replica_reads=self.replica_reads, primary_reads=self.primary_reads)
+            for i, pool in enumerate(self.replicas):
+                for key, value in pool.stats().items():
+                    stats[f'replica{i}_{key}'] = value
+        return stats
+
+
+class _ConfigView:
+    # Lets connect() read Flask's config mapping like the Config class
+    def __init__(self, mapping):
+        self._mapping = mapping
+
+    def __getattr__(self, name):
+        return self._mapping[name]
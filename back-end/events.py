@@ -0,0 +1,275 @@
+"""Server-sent events for month settlements, per league.
+
+Clients open /api/events/leagues/<id> instead of polling /api/current-date and
+/api/standings/<id>. One watcher thread per process notices a settlement,
+either because this process ran it (`poke`) or because the GameSettings
+version moved when it polled. It then computes each subscribed league's
+standings once, through the shared StandingsIndex, and diffs them against
+what it last published. One `settlement` event per league carries the new
+month and only the rows whose points or rank changed. The same event object
+is handed to every subscriber of that league.
+
+Each subscriber has a small bounded buffer. A client too slow to keep up loses
+its oldest events rather than growing memory, and is sent a `resync` event
+telling it to reload the standings once. Idle streams get a comment line
+every few seconds so proxies keep them open.
+"""
+import asyncio
+import json
+import logging
+import threading
+from calendar import month_name
+from collections import deque
+
+from standings import LeagueNotFound
+
+log = logging.getLogger(__name__)
+
+RESYNC = {"type": "resync"}
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+def format_event(event):
+    lines = [f"event: {event['type']}"]
+    if 'version' in event:
+        lines.append(f"id: {event['version']}")
+    lines.append(f"data: {json.dumps(event)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscription:
+    def __init__(self, league_id, buffer_size):
+        self.league_id = league_id
+        self.dropped = 0
+        self._reported = 0
+        self._events = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._wakers = []
+
+    def offer(self, event):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+            wakers = list(self._wakers)
+        for wake in wakers:
+            wake()
+
+    def _drain(self):
+        events = list(self._events)
+        self._events.clear()
+        if self.dropped > self._reported:
+            self._reported = self.dropped
+            events.insert(0, RESYNC)
+        return events
+
+    def drain(self, timeout):
+        """Block up to `timeout` seconds for events; returns them all (empty on timeout)."""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            return self._drain()
+
+    async def adrain(self, timeout):
+        """`drain` for coroutines: waits on the event loop instead of a thread."""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(ready.set)
+
+        with self._cond:
+            if self._events:
+                return self._drain()
+            self._wakers.append(wake)
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._wakers.remove(wake)
+        with self._cond:
+            return self._drain()
+
+
+class _EventStream:
+    # An object rather than a bare generator so close() unsubscribes even if iteration never started
+    def __init__(self, broker, subscription):
+        self.broker = broker
+        self.subscription = subscription
+
+    def __iter__(self):
+        yield f"retry: {int(self.broker.poll_seconds * 1000)}\n\n"
+        while True:
+            events = self.subscription.drain(self.broker.heartbeat_seconds)
+            if not events:
+                yield ": keep-alive\n\n"
+            for event in events:
+                yield format_event(event)
+                if event['type'] == 'closed':
+                    return
+
+    def close(self):
+        self.broker.unsubscribe(self.subscription)
+
+
+class EventBroker:
+    def __init__(self, connect, standings_index, buffer_size=8, poll_seconds=2.0,
+                 heartbeat_seconds=15.0, max_subscribers=5000):
+        self.connect = connect
+        self.standings_index = standings_index
+        self.buffer_size = buffer_size
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_subscribers = max_subscribers
+        self.published = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._poked = False
+        self._subscribers = {}
+        # league -> {rosterId: (points, rank)} as last published
+        self._published_rows = {}
+        self._version = None
+        self._thread = None
+
+    def subscribe(self, league_id):
+        with self._lock:
+            if sum(len(subs) for subs in self._subscribers.values()) >= self.max_subscribers:
+                raise TooManySubscribers(f"More than {self.max_subscribers} event streams open")
+            subscription = Subscription(league_id, self.buffer_size)
+            self._subscribers.setdefault(league_id, set()).add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, name='event-watcher', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subs = self._subscribers.get(subscription.league_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.league_id]
+                    self._published_rows.pop(subscription.league_id, None)
+
+    def poke(self):
+        """Check for a settlement now instead of at the next poll (called after a local advance)."""
+        with self._wake:
+            self._poked = True
+            self._wake.notify()
+
+    def stream(self, subscription):
+        """WSGI response body for one subscriber; closing it (client gone) unsubscribes."""
+        return _EventStream(self, subscription)
+
+    async def astream(self, subscription):
+        try:
+            yield f"retry: {int(self.poll_seconds * 1000)}\n\n"
+            while True:
+                events = await subscription.adrain(self.heartbeat_seconds)
+                if not events:
+                    yield ": keep-alive\n\n"
+                for event in events:
+                    yield format_event(event)
+                    if event['type'] == 'closed':
+                        return
+        finally:
+            self.unsubscribe(subscription)
+
+    def _watch(self):
+        connection = None
+        while True:
+            with self._wake:
+                if not self._poked:
+                    self._wake.wait(self.poll_seconds)
+                self._poked = False
+
+            with self._lock:
+                if not self._subscribers:
+                    continue
+            try:
+                if connection is None:
+                    connection = self.connect()
+                self._check(connection)
+            except Exception:
+                log.exception("event watcher error")
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                connection = None
+
+    def _check(self, connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT current_month, current_year, version FROM GameSettings WHERE id = 1")
+            settings = cursor.fetchone()
+            if settings is None:
+                return
+
+            with self._lock:
+                league_ids = list(self._subscribers)
+            settled = self._version is not None and settings['version'] != self._version
+            self._version = settings['version']
+
+            for league_id in league_ids:
+                with self._lock:
+                    previous = self._published_rows.get(league_id)
+                if previous is not None and not settled:
+                    continue
+                try:
+                    rows = self.standings_index.query(cursor, league_id, settings['version'], 'top')
+                except LeagueNotFound:
+                    self._fan_out(league_id, {"type": "closed", "leagueId": league_id})
+                    continue
+
+                current = {row['rosterId']: (row['points'], row['rank']) for row in rows}
+                with self._lock:
+                    if league_id in self._subscribers:
+                        self._published_rows[league_id] = current
+                if previous is None and not settled:
+                    # New subscription between settlements: only record what it starts from
+                    continue
+
+                self._fan_out(league_id, {
+                    "type": "settlement",
+                    "leagueId": league_id,
+                    "month": settings['current_month'],
+                    "year": settings['current_year'],
+                    "month_name": month_name[settings['current_month']],
+                    "version": settings['version'],
+                    # Without a baseline every row is sent and the client replaces its table
+                    "full": previous is None,
+                    "changed": [
+                        row for row in rows
+                        if previous is None or previous.get(row['rosterId']) != current[row['rosterId']]
+                    ],
+                    "removed": [roster_id for roster_id in (previous or {}) if roster_id not in current],
+                })
+        finally:
+            # Ends the read snapshot so the next poll sees new commits
+            connection.rollback()
+            cursor.close()
+
+    def _fan_out(self, league_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(league_id, ()))
+            self.published += 1
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "leagues": len(self._subscribers),
+                "subscribers": sum(len(subs) for subs in self._subscribers.values()),
+                "published": self.published,
+                "dropped": sum(sub.dropped for subs in self._subscribers.values() for sub in subs),
+                "version": self._version,
+            }
@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class GameClock:
+    """Process-local cache of the GameSettings row.
+
+    Every worker keeps its own copy of the current month/year together with
+    the row's version counter, and requests are served from memory. Once
+    `watch` is running, one thread per process reads only the version every
+    `poll_seconds`: a version matching the cached one renews the TTL, so
+    requests never touch GameSettings, and a new version (an advance run by
+    another process) drops the copy so the next request reloads it. Without
+    the watcher, or if it stalls, the row is simply re-read once the TTL
+    lapses.
+    """
+
+    def __init__(self, ttl=2.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._settings = None
+        self._loaded_at = 0.0
+        self._watcher = None
+
+    def cached(self):
+        """The cached settings if still within the TTL, else None (no database access)."""
+        with self._lock:
+            if self._settings is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._settings
+            return None
+
+    def get(self, cursor):
+        settings = self.cached()
+        if settings is not None:
+            return settings
+
+        cursor.execute("SELECT current_month, current_year, version FROM GameSettings WHERE id = 1")
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        return self.set(row['current_month'], row['current_year'], row['version'])
+
+    def set(self, month, year, version):
+        settings = {"current_month": month, "current_year": year, "version": version}
+        with self._lock:
+            # Never move backwards if a slower reload races a newer value in
+            if self._settings is None or version >= self._settings['version']:
+                self._settings = settings
+                self._loaded_at = time.monotonic()
+            return self._settings
+
+    def invalidate(self):
+        with self._lock:
+            self._settings = None
+            self._loaded_at = 0.0
+
+    def watch(self, connect, poll_seconds=1.0):
+        """Start the per-process version watcher (once); `connect()` opens its own connection."""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(
+                target=self._watch, args=(connect, poll_seconds), name='game-clock-watcher', daemon=True
+            )
+            self._watcher.start()
+
+    def _watch(self, connect, poll_seconds):
+        connection = None
+        while True:
+            time.sleep(poll_seconds)
+            try:
+                if connection is None:
+                    connection = connect()
+                cursor = connection.cursor()
+                try:
+                    cursor.execute("SELECT version FROM GameSettings WHERE id = 1")
+                    row = cursor.fetchone()
+                finally:
+                    # Ends the read snapshot so the next poll sees new commits
+                    connection.rollback()
+                    cursor.close()
+                self._observe(row['version'] if row else None)
+            except Exception:
+                log.exception("game clock watcher error")
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                connection = None
+
+    def _observe(self, version):
+        with self._lock:
+            if self._settings is None:
+                return
+            if self._settings['version'] == version:
+                self._loaded_at = time.monotonic()
+            elif version is None or version > self._settings['version']:
+                self._settings = None
+                self._loaded_at = 0.0
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._settings['version'] if self._settings else None
@@ -0,0 +1,190 @@
+"""Streaming bulk loader for monthly ArtistStats.
+
+    python ingest_stats.py stats-2024-03.csv [more files...] --batch-size 5000
+
+Files are CSV (with a header row) or NDJSON (.ndjson/.jsonl, one object per
+line) carrying artistId, month, year, listeners, followers, popularity and
+price. Rows are read lazily, checked against the table's check_month and
+check_positive_stats constraints before they reach the server, and inserted
+in batches with the per-row ArtistStats triggers deferred. Each batch then
+refreshes ArtistLatestStats for its artists, re-scores the affected rosters
+once and commits.
+
+Both load modes treat an existing (artistId, month, year) the same way: the
+batch fails and is rolled back unless --ignore-duplicates is given, in which
+case those rows are skipped and counted separately. LOAD DATA LOCAL only
+warns on duplicate keys, so its affected-row count is checked instead.
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from itertools import islice
+
+import MySQLdb
+
+from config import Config
+from db import connect
+
+FIELDS = ('artistId', 'month', 'year', 'listeners', 'followers', 'popularity', 'price')
+
+INSERT_QUERY = (
+    "INSERT {ignore}INTO ArtistStats (artistId, month, year, listeners, followers, popularity, price) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s)"
+)
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def read_rows(path):
+    """Yield (line_number, raw dict) pairs from a CSV or NDJSON file without loading it whole."""
+    with open(path, newline='') as f:
+        if path.endswith(('.ndjson', '.jsonl')):
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+        else:
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, row
+
+
+def validate(raw):
+    """Return the row as an insert tuple, enforcing the ArtistStats CHECK constraints client-side."""
+    try:
+        row = tuple(int(raw[field]) for field in FIELDS)
+    except KeyError as e:
+        raise InvalidRow(f"missing field {e.args[0]}")
+    except (TypeError, ValueError):
+        raise InvalidRow("fields must be integers")
+
+    artist_id, month, year, listeners, followers, popularity, price = row
+    if not 1 <= month <= 12:
+        raise InvalidRow("check_month: month must be between 1 and 12")
+    if min(listeners, followers, popularity, price) < 0:
+        raise InvalidRow("check_positive_stats: stats must not be negative")
+    return row
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def valid_rows(paths, report):
+    for path in paths:
+        for line_number, raw in read_rows(path):
+            try:
+                yield validate(raw)
+            except InvalidRow as e:
+                report['rejected'] += 1
+                if report['rejected'] <= 20:
+                    print(f"{path}:{line_number}: skipped, {e}", file=sys.stderr)
+
+
+def insert_batch(cursor, batch, use_load_data, ignore_duplicates):
+    """Insert one batch and return how many rows the server actually inserted."""
+    if not use_load_data:
+        cursor.executemany(INSERT_QUERY.format(ignore='IGNORE ' if ignore_duplicates else ''), batch)
+        return cursor.rowcount
+
+    with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False) as f:
+        f.writelines('\t'.join(map(str, row)) + '\n' for row in batch)
+    try:
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s {'IGNORE' if ignore_duplicates else ''} INTO TABLE ArtistStats "
+            f"({', '.join(FIELDS)})",
+            (f.name,)
+        )
+    finally:
+        os.unlink(f.name)
+
+    # A LOCAL load skips duplicate keys with a warning even without IGNORE; fail like executemany
+    if not ignore_duplicates and cursor.rowcount < len(batch):
+        raise MySQLdb.IntegrityError(
+            1062, f"{len(batch) - cursor.rowcount} rows duplicate existing ArtistStats entries"
+        )
+    return cursor.rowcount
+
+
+def load_batch(connection, batch, use_load_data=False, ignore_duplicates=False):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SET @defer_stats_triggers = 1")
+        inserted = insert_batch(cursor, batch, use_load_data, ignore_duplicates)
+        cursor.execute("SET @defer_stats_triggers = 0")
+
+        # Derived work runs once for the whole batch instead of once per inserted row
+        cursor.execute("CREATE TEMPORARY TABLE IF NOT EXISTS RecomputeArtist (artistId INT PRIMARY KEY)")
+        cursor.execute("DELETE FROM RecomputeArtist")
+        cursor.executemany(
+            "INSERT IGNORE INTO RecomputeArtist (artistId) VALUES (%s)",
+            [(artist_id,) for artist_id in {row[0] for row in batch}]
+        )
+        cursor.callproc('RecomputeRosterPointsForArtists')
+        connection.commit()
+        return inserted
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def peak_memory_mb():
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def ingest(connection, paths, batch_size=5000, use_load_data=False, ignore_duplicates=False):
+    report = {'inserted': 0, 'duplicates': 0, 'rejected': 0, 'batches': 0}
+    start = time.perf_counter()
+
+    for batch in batches(valid_rows(paths, report), batch_size):
+        inserted = load_batch(connection, batch, use_load_data, ignore_duplicates)
+        report['inserted'] += inserted
+        report['duplicates'] += len(batch) - inserted
+        report['batches'] += 1
+        elapsed = time.perf_counter() - start
+        print(f"batch {report['batches']}: {report['inserted']} rows, "
+              f"{report['inserted'] / elapsed:,.0f} rows/s, peak {peak_memory_mb():.1f} MB")
+
+    report['seconds'] = time.perf_counter() - start
+    report['rowsPerSecond'] = report['inserted'] / report['seconds'] if report['seconds'] else 0.0
+    report['peakMemoryMb'] = peak_memory_mb()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load monthly ArtistStats from CSV or NDJSON files")
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--load-data', action='store_true',
+                        help="use LOAD DATA LOCAL INFILE per batch instead of executemany")
+    parser.add_argument('--ignore-duplicates', action='store_true',
+                        help="skip rows whose (artistId, month, year) already exists")
+    args = parser.parse_args()
+
+    connection = connect(Config, local_infile=1 if args.load_data else 0)
+    try:
+        report = ingest(connection, args.paths, args.batch_size, args.load_data, args.ignore_duplicates)
+    finally:
+        connection.close()
+
+    print(f"inserted {report['inserted']} rows ({report['duplicates']} duplicates skipped, "
+          f"{report['rejected']} rejected) in {report['seconds']:.2f} s: "
+          f"{report['rowsPerSecond']:,.0f} rows/s, peak memory {report['peakMemoryMb']:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
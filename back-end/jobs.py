@@ -0,0 +1,237 @@
+"""Persistent background jobs for heavy administrative operations.
+
+A job is a row in the Job table (migrations/0003_job_table.sql). Submitting
+one only inserts that row, so the request that asked for it returns a job id
+at once. A fixed set of worker threads, each on its own MySQL connection
+outside the request pool, claims queued rows with `FOR UPDATE SKIP LOCKED`
+and runs the handler registered for the job's kind. A worker only claims a job
+while fewer than `max_running` rows are running, counted across every
+process sharing the table; claims take the `job_claim` named lock so two
+processes cannot both pass that count for the last free slot. Requests keep
+the whole pool to themselves.
+
+Handlers get `(connection, params, progress)`. `progress(done, total)` is
+stored on the row for /api/jobs/<id> and doubles as the worker's heartbeat;
+it commits, so handlers call it between their own transactions.
+`progress.job_id` is the row's jobId. A job that raises is retried after a
+growing delay until it has used maxAttempts (JobAborted fails it at once),
+and a job whose worker stopped heartbeating (process killed mid-job) is put
+back on the queue. Handlers must therefore be safe to run again after a
+partial run.
+"""
+import json
+import logging
+import threading
+import time
+
+from db import connect
+
+log = logging.getLogger(__name__)
+
+class JobAborted(Exception):
+    """Raised by a handler when retrying cannot help; the job fails without another attempt."""
+
+
+JOB_COLUMNS = """
+    jobId, kind, params, status, progress, total, result, error,
+    attempts, maxAttempts, createdAt, startedAt, finishedAt, updatedAt
+"""
+
+
+def _decode(job):
+    for key in ('params', 'result'):
+        if job[key] is not None:
+            job[key] = json.loads(job[key])
+    return job
+
+
+class JobRunner:
+    def __init__(self, config, workers=2, max_running=None, max_attempts=3, poll_seconds=2.0,
+                 stale_seconds=600, retry_seconds=10):
+        self.config = config
+        self.workers = workers
+        self.max_running = max_running or workers
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.retry_seconds = retry_seconds
+        self._handlers = {}
+        self._wake = threading.Condition()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._swept_at = 0.0
+
+    def handler(self, kind):
+        def register(fn):
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    def submit(self, connection, kind, params):
+        """Queue a job on the caller's connection and commit it; returns the jobId."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler for job kind '{kind}'")
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO Job (kind, params, maxAttempts) VALUES (%s, %s, %s)",
+                (kind, json.dumps(params), self.max_attempts)
+            )
+            job_id = cursor.lastrowid
+            connection.commit()
+        finally:
+            cursor.close()
+
+        with self._wake:
+            self._wake.notify()
+        return job_id
+
+    def get(self, cursor, job_id):
+        cursor.execute(f"SELECT {JOB_COLUMNS} FROM Job WHERE jobId = %s", (job_id,))
+        job = cursor.fetchone()
+        return _decode(job) if job else None
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        connection = None
+        while True:
+            try:
+                if connection is None:
+                    connection = connect(self.config)
+                job = self._claim(connection)
+                if job is not None:
+                    self._run(connection, job)
+                    continue
+            except Exception:
+                # Lost connection or a failed bookkeeping write; an unfinished job is requeued once stale
+                log.exception("job worker error")
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                connection = None
+
+            with self._wake:
+                self._wake.wait(self.poll_seconds)
+
+    def _claim(self, connection):
+        cursor = connection.cursor()
+        locked = False
+        try:
+            cursor.execute("SELECT GET_LOCK('job_claim', %s) AS acquired", (self.poll_seconds,))
+            locked = cursor.fetchone()['acquired'] == 1
+            if not locked:
+                return None
+
+            cursor.execute("START TRANSACTION")
+            self._requeue_stale(cursor)
+
+            cursor.execute("""
+                SELECT jobId, kind, params, attempts, maxAttempts
+                FROM Job
+                WHERE status = 'queued' AND runAfter <= NOW()
+                  AND (SELECT COUNT(*) FROM Job WHERE status = 'running') < %s
+                ORDER BY jobId
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            """, (self.max_running,))
+            job = cursor.fetchone()
+            if job:
+                cursor.execute("""
+                    UPDATE Job
+                    SET status = 'running', attempts = attempts + 1, startedAt = COALESCE(startedAt, NOW())
+                    WHERE jobId = %s
+                """, (job['jobId'],))
+                job['attempts'] += 1
+                job['params'] = json.loads(job['params'])
+            connection.commit()
+            return job
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            if locked:
+                cursor.execute("DO RELEASE_LOCK('job_claim')")
+            cursor.close()
+
+    def _requeue_stale(self, cursor):
+        now = time.monotonic()
+        if now - self._swept_at < self.poll_seconds:
+            return
+        self._swept_at = now
+
+        # Running rows nobody has touched for stale_seconds belong to a dead worker
+        cursor.execute("""
+            UPDATE Job
+            SET status = 'failed', finishedAt = NOW(), error = 'Worker stopped before the job finished'
+            WHERE status = 'running' AND updatedAt < NOW() - INTERVAL %s SECOND AND attempts >= maxAttempts
+        """, (self.stale_seconds,))
+        cursor.execute("""
+            UPDATE Job
+            SET status = 'queued'
+            WHERE status = 'running' AND updatedAt < NOW() - INTERVAL %s SECOND
+        """, (self.stale_seconds,))
+
+    def _run(self, connection, job):
+        handler = self._handlers.get(job['kind'])
+
+        def progress(done, total=None):
+            cursor = connection.cursor()
+            try:
+                cursor.execute(
+                    "UPDATE Job SET progress = %s, total = COALESCE(%s, total) WHERE jobId = %s",
+                    (done, total, job['jobId'])
+                )
+                connection.commit()
+            finally:
+                cursor.close()
+        progress.job_id = job['jobId']
+
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job kind '{job['kind']}'")
+            result = handler(connection, job['params'], progress)
+        except Exception as e:
+            log.exception("job %s (%s) failed on attempt %d", job['jobId'], job['kind'], job['attempts'])
+            connection.rollback()
+            self._record_failure(connection, job, e)
+            return
+
+        cursor = connection.cursor()
+        try:
+            cursor.execute("""
+                UPDATE Job
+                SET status = 'done', result = %s, error = NULL, finishedAt = NOW(), progress = COALESCE(total, progress)
+                WHERE jobId = %s
+            """, (json.dumps(result), job['jobId']))
+            connection.commit()
+        finally:
+            cursor.close()
+
+    def _record_failure(self, connection, job, error):
+        cursor = connection.cursor()
+        try:
+            if isinstance(error, JobAborted) or job['attempts'] >= job['maxAttempts']:
+                cursor.execute(
+                    "UPDATE Job SET status = 'failed', error = %s, finishedAt = NOW() WHERE jobId = %s",
+                    (str(error), job['jobId'])
+                )
+            else:
+                # Back off a little more after every failed attempt
+                cursor.execute("""
+                    UPDATE Job
+                    SET status = 'queued', error = %s, runAfter = NOW() + INTERVAL %s SECOND
+                    WHERE jobId = %s
+                """, (str(error), self.retry_seconds * job['attempts'], job['jobId']))
+            connection.commit()
+        finally:
+            cursor.close()
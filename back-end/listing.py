@@ -0,0 +1,133 @@
+"""Keyset pagination and streamed responses for the unbounded list endpoints.
+
+A page is requested with `?limit=N` and continued with `?after=<key>`, where
+the key is the last row's stable id (returned in the X-Next-After header).
+Each page is `WHERE key > after ORDER BY key LIMIT N + 1`, an index range
+scan no matter how deep the client has paged, unlike OFFSET.
+
+`?stream=ndjson` (one JSON object per line) or `?stream=json` (one JSON array
+sent in chunks) instead reads the rows through a server-side cursor and
+writes them out as they arrive, so the worker never holds the whole table.
+Without any of these parameters the endpoints keep returning the full array.
+"""
+import MySQLdb.cursors
+from flask import Response, json, stream_with_context
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Rows pulled from the server-side cursor per write
+STREAM_BATCH_SIZE = 500
+
+STREAM_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+class ListArgsError(ValueError):
+    pass
+
+
+class ListArgs:
+    def __init__(self, after=None, limit=None, stream=None):
+        self.after = after
+        self.limit = limit
+        self.stream = stream
+
+    @property
+    def legacy(self):
+        # No paging or streaming asked for: the original full-array response
+        return self.after is None and self.limit is None and self.stream is None
+
+
+def parse_list_args(args):
+    after = args.get('after')
+    limit = args.get('limit')
+    stream = args.get('stream')
+
+    if after is not None:
+        try:
+            after = int(after)
+        except ValueError:
+            raise ListArgsError("after must be an integer id")
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ListArgsError("limit must be an integer")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ListArgsError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    elif after is not None and stream is None:
+        limit = DEFAULT_PAGE_SIZE
+
+    if stream is not None and stream not in STREAM_MIMETYPES:
+        raise ListArgsError(f"stream must be one of: {', '.join(STREAM_MIMETYPES)}")
+
+    return ListArgs(after, limit, stream)
+
+
+def keyset_query(select, key, where=(), params=(), after=None, limit=None):
+    """Append the keyset filter, ordering and limit to `select`; returns (sql, params)."""
+    clauses = list(where)
+    params = list(params)
+    if after is not None:
+        clauses.append(f"{key} > %s")
+        params.append(after)
+
+    sql = select
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY {key}"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    return sql, params
+
+
+def fetch_page(cursor, select, key, key_name, list_args, where=(), params=()):
+    """Run one keyset page; returns (rows, next_after), next_after None on the last page."""
+    # One extra row tells us whether another page exists without a COUNT(*)
+    sql, params = keyset_query(select, key, where, params, list_args.after, list_args.limit + 1)
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    if len(rows) > list_args.limit:
+        rows = rows[:list_args.limit]
+        return rows, rows[-1][key_name]
+    return rows, None
+
+
+def stream_rows(connection, select, key, list_args, where=(), params=()):
+    """Execute the query on a server-side cursor and return a streaming Response."""
+    sql, params = keyset_query(select, key, where, params, list_args.after, list_args.limit)
+    cursor = connection.cursor(MySQLdb.cursors.SSDictCursor)
+    try:
+        cursor.execute(sql, params)
+    except Exception:
+        cursor.close()
+        raise
+
+    as_array = list_args.stream == 'json'
+
+    def generate():
+        try:
+            if as_array:
+                yield '['
+            first = True
+            while True:
+                rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                if as_array:
+                    chunk = ','.join(json.dumps(row) for row in rows)
+                    yield chunk if first else ',' + chunk
+                else:
+                    yield ''.join(json.dumps(row) + '\n' for row in rows)
+                first = False
+            if as_array:
+                yield ']\n'
+        finally:
+            # Closing drains whatever the client did not read, freeing the connection
+            cursor.close()
+
+    return Response(stream_with_context(generate()), mimetype=STREAM_MIMETYPES[list_args.stream])
@@ -0,0 +1,283 @@
+"""Per-endpoint request and SQL instrumentation, rendered for Prometheus.
+
+Every cursor handed out by `mysql.connection.cursor()` is wrapped in an
+`InstrumentedCursor`, which times each statement and counts the rows fetched,
+both into the current request's `RequestStats` and into per-statement totals.
+When the request ends its latency, status and SQL totals are folded into the
+per-endpoint series. Statements slower than the configured threshold are
+logged with the endpoint that ran them.
+
+A statement's label is its queries.py name, or else the endpoint that ran it,
+plus a short hash of the whole normalised text, then the start of the text
+for reading. Long queries that share their first hundred characters still get
+separate series.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from queries import STATEMENTS
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+# Statement text kept in a label after its name and hash, for reading only
+STATEMENT_LABEL_LENGTH = 60
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+
+
+def normalize_statement(sql):
+    # Same text however many ids an IN (...) list had
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return _PLACEHOLDER_LIST.sub('%s, ...', sql)
+
+
+_STATEMENT_NAMES = {normalize_statement(sql): name for name, sql in STATEMENTS.items()}
+
+
+def statement_label(sql, owner=None):
+    sql = normalize_statement(sql)
+    digest = hashlib.blake2s(sql.encode('utf-8'), digest_size=4).hexdigest()
+    owner = _STATEMENT_NAMES.get(sql) or owner or 'background'
+    return f"{owner}:{digest} {sql[:STATEMENT_LABEL_LENGTH]}"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            yield bound, running
+
+
+class RequestStats:
+    """SQL totals for one request, filled in by its cursors."""
+
+    __slots__ = ('endpoint', 'statements', 'db_seconds', 'rows')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+
+
+class _EndpointSeries:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements_per_request = Histogram(STATEMENT_COUNT_BUCKETS)
+        self.responses = {}
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+
+
+class _StatementSeries:
+    __slots__ = ('calls', 'seconds', 'max_seconds', 'rows')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+
+
+class Metrics:
+    def __init__(self, slow_query_seconds=0.2):
+        self.slow_query_seconds = slow_query_seconds
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._statements = {}
+        self.slow_queries = 0
+
+    def observe_statement(self, request_stats, sql, seconds):
+        label = statement_label(sql, request_stats.endpoint if request_stats is not None else None)
+        with self._lock:
+            series = self._statements.get(label)
+            if series is None:
+                series = self._statements[label] = _StatementSeries()
+            series.calls += 1
+            series.seconds += seconds
+            series.max_seconds = max(series.max_seconds, seconds)
+            if seconds >= self.slow_query_seconds:
+                self.slow_queries += 1
+
+        if request_stats is not None:
+            request_stats.statements += 1
+            request_stats.db_seconds += seconds
+
+        if seconds >= self.slow_query_seconds:
+            endpoint = request_stats.endpoint if request_stats is not None else None
+            log.warning("slow query (%.3fs) in %s: %s", seconds, endpoint, normalize_statement(sql))
+        return label
+
+    def observe_rows(self, request_stats, label, count):
+        if not count:
+            return
+        with self._lock:
+            series = self._statements.get(label)
+            if series is not None:
+                series.rows += count
+        if request_stats is not None:
+            request_stats.rows += count
+
+    def observe_request(self, endpoint, method, status, seconds, request_stats=None):
+        with self._lock:
+            series = self._endpoints.get((endpoint, method))
+            if series is None:
+                series = self._endpoints[(endpoint, method)] = _EndpointSeries()
+            series.latency.observe(seconds)
+            series.responses[status] = series.responses.get(status, 0) + 1
+            statements = request_stats.statements if request_stats is not None else 0
+            series.statements_per_request.observe(statements)
+            if request_stats is not None:
+                series.statements += request_stats.statements
+                series.db_seconds += request_stats.db_seconds
+                series.rows += request_stats.rows
+
+    def render(self, pool_stats=None):
+        """Prometheus text exposition of everything recorded so far."""
+        lines = []
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            statements = sorted(self._statements.items())
+
+            _header(lines, 'http_request_duration_seconds', 'histogram', 'Request latency by endpoint.')
+            for (endpoint, method), series in endpoints:
+                _histogram(lines, 'http_request_duration_seconds', series.latency,
+                           endpoint=endpoint, method=method)
+
+            _header(lines, 'http_requests_total', 'counter', 'Responses by endpoint and status.')
+            for (endpoint, method), series in endpoints:
+                for status, count in sorted(series.responses.items()):
+                    _sample(lines, 'http_requests_total', count, endpoint=endpoint, method=method, status=status)
+
+            _header(lines, 'db_statements_per_request', 'histogram', 'SQL statements run by one request.')
+            for (endpoint, method), series in endpoints:
+                _histogram(lines, 'db_statements_per_request', series.statements_per_request,
+                           endpoint=endpoint, method=method)
+
+            for name, kind, attribute, help_text in (
+                ('db_statements_total', 'counter', 'statements', 'SQL statements run by endpoint.'),
+                ('db_seconds_total', 'counter', 'db_seconds', 'Time spent in SQL by endpoint.'),
+                ('db_rows_fetched_total', 'counter', 'rows', 'Rows fetched by endpoint.'),
+            ):
+                _header(lines, name, kind, help_text)
+                for (endpoint, method), series in endpoints:
+                    _sample(lines, name, getattr(series, attribute), endpoint=endpoint, method=method)
+
+            for name, kind, attribute, help_text in (
+                ('db_statement_calls_total', 'counter', 'calls', 'Executions per statement.'),
+                ('db_statement_seconds_total', 'counter', 'seconds', 'Time per statement.'),
+                ('db_statement_seconds_max', 'gauge', 'max_seconds', 'Slowest execution per statement.'),
+                ('db_statement_rows_total', 'counter', 'rows', 'Rows fetched per statement.'),
+            ):
+                _header(lines, name, kind, help_text)
+                for label, series in statements:
+                    _sample(lines, name, getattr(series, attribute), statement=label)
+
+            _header(lines, 'db_slow_queries_total', 'counter',
+                    f'Statements slower than {self.slow_query_seconds}s.')
+            _sample(lines, 'db_slow_queries_total', self.slow_queries)
+
+        if pool_stats:
+            for key, value in sorted(pool_stats.items()):
+                name = f'db_pool_{key}'
+                _header(lines, name, 'gauge', f'Connection pool {key.replace("_", " ")}.')
+                _sample(lines, name, value)
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _header(lines, name, kind, help_text):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def _sample(lines, name, value, **labels):
+    if labels:
+        label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        lines.append(f'{name}{{{label_text}}} {value}')
+    else:
+        lines.append(f'{name} {value}')
+
+
+def _histogram(lines, name, histogram, **labels):
+    for bound, count in histogram.cumulative():
+        _sample(lines, f'{name}_bucket', count, **labels, le=bound)
+    _sample(lines, f'{name}_bucket', histogram.total, **labels, le='+Inf')
+    _sample(lines, f'{name}_sum', round(histogram.sum, 6), **labels)
+    _sample(lines, f'{name}_count', histogram.total, **labels)
+
+
+class InstrumentedCursor:
+    """Times every statement a cursor runs and counts the rows it returns."""
+
+    def __init__(self, cursor, metrics, request_stats):
+        self._cursor = cursor
+        self._metrics = metrics
+        self._request_stats = request_stats
+        self._label = None
+
+    def _timed(self, method, sql, *args):
+        started = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            self._label = self._metrics.observe_statement(
+                self._request_stats, sql, time.perf_counter() - started
+            )
+
+    def execute(self, query, args=None):
+        return self._timed(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed(self._cursor.executemany, query, args)
+
+    def callproc(self, procname, args=()):
+        return self._timed(self._cursor.callproc, procname, args)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._metrics.observe_rows(self._request_stats, self._label, 1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany() if size is None else self._cursor.fetchmany(size)
+        self._metrics.observe_rows(self._request_stats, self._label, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._metrics.observe_rows(self._request_stats, self._label, len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
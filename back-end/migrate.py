@@ -0,0 +1,137 @@
+"""Versioned schema migrations.
+
+Every file in migrations/ (at the repo root, next to create_database.sql) is
+one migration; its file name is its version and they run in name order.
+Applied versions are recorded in SchemaMigration together with a checksum of
+the file, so each migration runs once per database and edits to an
+already-applied file are reported instead of silently ignored.
+
+    python migrate.py            # apply everything pending
+    python migrate.py --status   # list applied and pending migrations
+
+Files may use `DELIMITER //` blocks like stored_procedures.sql. MySQL commits
+DDL implicitly, so a migration that fails halfway is not rolled back; the
+version is only recorded once all of its statements have succeeded.
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+from config import Config
+from db import connect
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS SchemaMigration (
+        version VARCHAR(255) PRIMARY KEY,
+        checksum CHAR(64) NOT NULL,
+        appliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+_DELIMITER = re.compile(r'^\s*DELIMITER\s+(\S+)\s*$', re.I)
+
+
+def split_statements(text):
+    """Split a SQL script into statements, honouring DELIMITER lines and skipping comment-only chunks."""
+    statements = []
+    delimiter = ';'
+    buffer = []
+    for line in text.splitlines():
+        match = _DELIMITER.match(line)
+        if match:
+            delimiter = match.group(1)
+            continue
+        buffer.append(line)
+        if line.rstrip().endswith(delimiter):
+            statements.append('\n'.join(buffer).rstrip()[:-len(delimiter)])
+            buffer = []
+    statements.append('\n'.join(buffer))
+
+    cleaned = []
+    for statement in statements:
+        code = '\n'.join(line for line in statement.splitlines() if not line.strip().startswith('--')).strip()
+        if code:
+            cleaned.append(statement.strip())
+    return cleaned
+
+
+def available():
+    files = sorted(name for name in os.listdir(MIGRATIONS_DIR) if name.endswith('.sql'))
+    migrations = []
+    for name in files:
+        with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+            text = f.read()
+        migrations.append((name[:-len('.sql')], hashlib.sha256(text.encode('utf-8')).hexdigest(), text))
+    return migrations
+
+
+def applied(cursor):
+    cursor.execute(CREATE_TABLE)
+    cursor.execute("SELECT version, checksum FROM SchemaMigration")
+    return {row['version']: row['checksum'] for row in cursor.fetchall()}
+
+
+def migrate(connection, log=print):
+    """Apply pending migrations in order; returns the versions applied."""
+    cursor = connection.cursor()
+    try:
+        done = applied(cursor)
+        ran = []
+        for version, checksum, text in available():
+            if version in done:
+                if done[version] != checksum:
+                    log(f"warning: {version} was changed after it was applied")
+                continue
+            log(f"applying {version}")
+            for statement in split_statements(text):
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO SchemaMigration (version, checksum) VALUES (%s, %s)",
+                (version, checksum)
+            )
+            connection.commit()
+            ran.append(version)
+        return ran
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply schema migrations from migrations/")
+    parser.add_argument('--status', action='store_true', help="list migrations without applying anything")
+    args = parser.parse_args()
+
+    connection = connect(Config)
+    try:
+        if args.status:
+            cursor = connection.cursor()
+            done = applied(cursor)
+            connection.commit()
+            cursor.close()
+            for version, checksum, _ in available():
+                if version not in done:
+                    state = 'pending'
+                elif done[version] != checksum:
+                    state = 'applied (file changed since)'
+                else:
+                    state = 'applied'
+                print(f"{version:<50} {state}")
+            return
+
+        ran = migrate(connection)
+        print(f"applied {len(ran)} migration(s)" if ran else "database is up to date")
+    except Exception as e:
+        sys.exit(f"migration failed: {e}")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Named SQL statements shared by the request handlers.
+
+Lookups that several routes repeat (the player, league, roster and roster
+member checks, the latest price) are written once here, selecting only the
+columns their callers read. Handlers run them by name:
+
+    roster = queries.one(cursor, 'roster', (roster_id,))
+
+Every run is counted and timed per statement name, so /api/query-stats shows
+which statements cost the most in total, not just which are slowest.
+
+With MYSQL_PREPARE_STATEMENTS set, each statement is PREPAREd once per pooled
+connection and then run with EXECUTE. mysqlclient has no binary-protocol
+prepared statements, so this is MySQL's SQL-level PREPARE: the server skips
+re-parsing, but the parameters travel in a separate `SET @...` round trip.
+That only pays off for statements whose parse is expensive relative to a
+round trip, which is why it is off by default; compare the per-statement
+timings with it on and off before enabling it.
+"""
+import threading
+import time
+import weakref
+
+import MySQLdb
+
+STATEMENTS = {
+    'player': "SELECT playerId, playerName FROM Player WHERE playerId = %s",
+    'player_by_username': "SELECT playerId FROM Player WHERE username = %s",
+    'player_login': "SELECT playerId, playerName, username, password FROM Player WHERE username = %s",
+    'player_password': "UPDATE Player SET password = %s WHERE playerId = %s",
+    'player_delete': "DELETE FROM Player WHERE playerId = %s",
+    'league': "SELECT leagueId, ownerId FROM League WHERE leagueId = %s",
+    'league_detail': """
+        SELECT l.leagueId, l.leagueName, l.playerCount, l.ownerId, p.playerName as ownerName
+        FROM League l
+        LEFT JOIN Player p ON l.ownerId = p.playerId
+        WHERE l.leagueId = %s
+    """,
+    'league_owned_by': "SELECT leagueId FROM League WHERE ownerId = %s LIMIT 1",
+    'league_player_count': "SELECT playerCount FROM League WHERE leagueId = %s",
+    'league_join': "UPDATE League SET playerCount = playerCount + 1 WHERE leagueId = %s",
+    'league_leave': "UPDATE League SET playerCount = playerCount - 1 WHERE leagueId = %s",
+    'league_set_owner': "UPDATE League SET ownerId = %s WHERE leagueId = %s",
+    'league_clear_owner': "UPDATE League SET ownerId = NULL WHERE ownerId = %s",
+    'league_first_member': "SELECT playerId FROM Roster WHERE leagueId = %s LIMIT 1",
+    'league_delete': "DELETE FROM League WHERE leagueId = %s",
+    'roster': "SELECT rosterId, playerId, leagueId FROM Roster WHERE rosterId = %s",
+    'roster_detail': """
+        SELECT r.rosterId, r.rosterName, r.budget, r.points, r.playerId, r.leagueId,
+               p.playerName, l.leagueName
+        FROM Roster r
+        JOIN Player p ON r.playerId = p.playerId
+        JOIN League l ON r.leagueId = l.leagueId
+        WHERE r.rosterId = %s
+    """,
+    'roster_insert': "INSERT INTO Roster (rosterName, budget, points, playerId, leagueId) VALUES (%s, %s, %s, %s, %s)",
+    # One settled chunk's new points, pushed into the in-memory standings
+    'roster_points_range': "SELECT rosterId, leagueId, points FROM Roster WHERE rosterId > %s AND rosterId <= %s",
+    'roster_in_league': "SELECT rosterId FROM Roster WHERE playerId = %s AND leagueId = %s",
+    'roster_count_in_league': "SELECT COUNT(*) as roster_count FROM Roster WHERE playerId = %s AND leagueId = %s",
+    'roster_member': "SELECT artistId FROM RosterMember WHERE rosterId = %s AND artistId = %s",
+    'artist_latest_price': "SELECT price FROM ArtistLatestStats WHERE artistId = %s",
+    'artist_owners': "SELECT owners FROM ArtistOwnership WHERE artistId = %s",
+    # Counted from Roster itself: League.playerCount is not kept exact
+    'roster_total': "SELECT COUNT(*) AS rosters FROM Roster",
+    'league_roster_total': "SELECT COUNT(*) AS rosters FROM Roster WHERE leagueId = %s",
+    'most_owned': """
+        SELECT o.artistId, a.artistName, o.owners, s.price
+        FROM ArtistOwnership o
+        JOIN Artist a ON a.artistId = o.artistId
+        LEFT JOIN ArtistLatestStats s ON s.artistId = o.artistId
+        WHERE o.owners > 0
+        ORDER BY o.owners DESC, o.artistId
+        LIMIT %s
+    """,
+    'league_most_owned': """
+        SELECT o.artistId, a.artistName, o.owners, s.price
+        FROM LeagueArtistOwnership o
+        JOIN Artist a ON a.artistId = o.artistId
+        LEFT JOIN ArtistLatestStats s ON s.artistId = o.artistId
+        WHERE o.leagueId = %s AND o.owners > 0
+        ORDER BY o.owners DESC, o.artistId
+        LIMIT %s
+    """,
+}
+
+# MySQL error raised by EXECUTE when the server no longer knows the statement
+_UNKNOWN_STATEMENT = 1243
+
+
+class _StatementStats:
+    __slots__ = ('calls', 'seconds', 'max_seconds', 'rows', 'prepares')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.prepares = 0
+
+
+class Queries:
+    def __init__(self, statements=STATEMENTS, prepare=False):
+        self.statements = dict(statements)
+        self.prepare = prepare
+        self._lock = threading.Lock()
+        self._stats = {name: _StatementStats() for name in self.statements}
+        # Names already PREPAREd on each raw connection; forgotten with the connection
+        self._prepared = weakref.WeakKeyDictionary()
+
+    def execute(self, cursor, name, params=()):
+        sql = self.statements[name]
+        started = time.perf_counter()
+        try:
+            if self.prepare:
+                self._execute_prepared(cursor, name, sql, params)
+            else:
+                cursor.execute(sql, params)
+        finally:
+            self._observe(name, time.perf_counter() - started)
+        return cursor
+
+    def one(self, cursor, name, params=()):
+        row = self.execute(cursor, name, params).fetchone()
+        if row is not None:
+            self._observe_rows(name, 1)
+        return row
+
+    def all(self, cursor, name, params=()):
+        rows = self.execute(cursor, name, params).fetchall()
+        self._observe_rows(name, len(rows))
+        return rows
+
+    def _execute_prepared(self, cursor, name, sql, params):
+        connection = cursor.connection
+        prepared = self._prepared.setdefault(connection, set())
+        handle = f"q_{name}"
+        variables = [f"@{handle}_{i}" for i in range(len(params))]
+
+        if name not in prepared:
+            self._prepare(cursor, name, handle, sql)
+            prepared.add(name)
+        if params:
+            cursor.execute(f"SET {', '.join(f'{var} = %s' for var in variables)}", params)
+        using = f" USING {', '.join(variables)}" if variables else ""
+        try:
+            cursor.execute(f"EXECUTE {handle}{using}")
+        except MySQLdb.Error as e:
+            if not e.args or e.args[0] != _UNKNOWN_STATEMENT:
+                raise
+            # The server dropped it (e.g. a reconnect); prepare again and retry once
+            self._prepare(cursor, name, handle, sql)
+            cursor.execute(f"EXECUTE {handle}{using}")
+
+    def _prepare(self, cursor, name, handle, sql):
+        # PREPARE takes the statement as a string literal with ? markers
+        cursor.execute(f"PREPARE {handle} FROM %s", (sql.replace('%s', '?'),))
+        with self._lock:
+            self._stats[name].prepares += 1
+
+    def _observe(self, name, seconds):
+        with self._lock:
+            stats = self._stats[name]
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+
+    def _observe_rows(self, name, count):
+        with self._lock:
+            self._stats[name].rows += count
+
+    def stats(self):
+        """Per-statement totals, most expensive first."""
+        with self._lock:
+            report = [
+                {
+                    "name": name,
+                    "calls": stats.calls,
+                    "seconds": round(stats.seconds, 6),
+                    "avgSeconds": round(stats.seconds / stats.calls, 6) if stats.calls else 0.0,
+                    "maxSeconds": round(stats.max_seconds, 6),
+                    "rows": stats.rows,
+                    "prepares": stats.prepares,
+                }
+                for name, stats in self._stats.items()
+            ]
+        report.sort(key=lambda item: item["seconds"], reverse=True)
+        return report
@@ -0,0 +1,192 @@
+"""Chunked, resumable month settlement.
+
+The original advance_month settles every roster in one transaction while it
+holds the GameSettings row lock. Here a settlement run walks the rosters in
+rosterId order, a chunk at a time, and commits each chunk together with its
+checkpoint in SettlementRun. If the process dies, the next call finds the
+unfinished run and carries on after the last committed rosterId, so no roster
+is paid twice. A run can cover several months at once: each chunk aggregates
+all of the months in one pass over RosterMember x ArtistStats.
+
+The game clock only moves when the last chunk is done.
+"""
+
+
+class SettlementError(Exception):
+    pass
+
+
+def period_ordinal(month, year):
+    return year * 12 + (month - 1)
+
+
+def from_ordinal(ordinal):
+    return ordinal % 12 + 1, ordinal // 12
+
+
+SETTLE_CHUNK_QUERY = """
+    UPDATE Roster r
+    JOIN (
+        SELECT rosterId,
+               SUM(ROUND(total_pop * 0.1)) AS points_gain,
+               SUM(ROUND(total_value * 0.05)) AS budget_gain
+        FROM (
+            SELECT rm.rosterId,
+                   s.year,
+                   s.month,
+                   SUM(s.popularity) AS total_pop,
+                   SUM(s.price) AS total_value
+            FROM RosterMember rm
+            JOIN ArtistStats s ON rm.artistId = s.artistId
+            WHERE rm.rosterId > %s AND rm.rosterId <= %s
+              AND s.year * 12 + s.month - 1 BETWEEN %s AND %s
+            GROUP BY rm.rosterId, s.year, s.month
+        ) per_month
+        GROUP BY rosterId
+    ) stats ON r.rosterId = stats.rosterId
+    SET
+        r.points = r.points + stats.points_gain,
+        r.budget = r.budget + stats.budget_gain
+"""
+
+
+def _start_or_resume(connection, months, job_id):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("START TRANSACTION")
+
+        # Short lock on the clock only while the run is registered
+        cursor.execute("SELECT current_month, current_year FROM GameSettings WHERE id = 1 FOR UPDATE")
+        settings = cursor.fetchone()
+        if not settings:
+            raise SettlementError("Game settings not initialized")
+
+        cursor.execute("SELECT * FROM SettlementRun WHERE status = 'running' ORDER BY runId LIMIT 1 FOR UPDATE")
+        run = cursor.fetchone()
+        resumed = run is not None
+
+        if not run:
+            cursor.execute(
+                "INSERT INTO SettlementRun (fromMonth, fromYear, months, jobId) VALUES (%s, %s, %s, %s)",
+                (settings['current_month'], settings['current_year'], months, job_id)
+            )
+            cursor.execute("SELECT * FROM SettlementRun WHERE runId = %s", (cursor.lastrowid,))
+            run = cursor.fetchone()
+
+        connection.commit()
+        return run, resumed
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _settle_chunk(connection, run, chunk_size):
+    """Settle the next chunk of rosters; returns (count, lower, upper), count 0 once the run is exhausted."""
+    first = period_ordinal(run['fromMonth'], run['fromYear'])
+    last = first + run['months'] - 1
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("START TRANSACTION")
+
+        # Re-read the checkpoint under lock so two resumers can never pay the same chunk
+        cursor.execute("SELECT lastRosterId, status FROM SettlementRun WHERE runId = %s FOR UPDATE", (run['runId'],))
+        checkpoint = cursor.fetchone()
+        if checkpoint['status'] != 'running':
+            connection.rollback()
+            return 0, None, None
+
+        cursor.execute("""
+            SELECT COUNT(*) AS settled, MAX(rosterId) AS upper
+            FROM (
+                SELECT rosterId FROM Roster
+                WHERE rosterId > %s
+                ORDER BY rosterId
+                LIMIT %s
+            ) chunk
+        """, (checkpoint['lastRosterId'], chunk_size))
+        chunk = cursor.fetchone()
+        if not chunk['settled']:
+            connection.rollback()
+            return 0, None, None
+
+        cursor.execute(SETTLE_CHUNK_QUERY, (checkpoint['lastRosterId'], chunk['upper'], first, last))
+        cursor.execute(
+            "UPDATE SettlementRun SET lastRosterId = %s WHERE runId = %s",
+            (chunk['upper'], run['runId'])
+        )
+        connection.commit()
+        return chunk['settled'], checkpoint['lastRosterId'], chunk['upper']
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _finish(connection, run):
+    next_month, next_year = from_ordinal(period_ordinal(run['fromMonth'], run['fromYear']) + run['months'])
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("START TRANSACTION")
+        cursor.execute("SELECT status FROM SettlementRun WHERE runId = %s FOR UPDATE", (run['runId'],))
+        if cursor.fetchone()['status'] == 'running':
+            # Only move the clock from the month this run paid out; if anything moved it
+            # meanwhile, those payments were for a month that has already been settled
+            cursor.execute("""
+                UPDATE GameSettings SET current_month = %s, current_year = %s, version = version + 1
+                WHERE id = 1 AND current_month = %s AND current_year = %s
+            """, (next_month, next_year, run['fromMonth'], run['fromYear']))
+            if cursor.rowcount == 0:
+                cursor.execute("UPDATE SettlementRun SET status = 'failed' WHERE runId = %s", (run['runId'],))
+                connection.commit()
+                raise SettlementError(
+                    f"Settlement run {run['runId']} started at {run['fromMonth']}/{run['fromYear']} "
+                    "but the game clock has moved since; the run was marked failed"
+                )
+            cursor.execute("UPDATE SettlementRun SET status = 'done' WHERE runId = %s", (run['runId'],))
+
+        cursor.execute("SELECT current_month, current_year, version FROM GameSettings WHERE id = 1")
+        settings = cursor.fetchone()
+        connection.commit()
+        return settings
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def settle(connection, months=1, chunk_size=500, on_chunk=None, job_id=None):
+    """Advance the game `months` months, settling rosters in committed chunks.
+
+    An unfinished run is resumed instead of starting a new one (its own month
+    count wins). `on_chunk(lower, upper)` is called after each chunk commits
+    with the (exclusive, inclusive) rosterId range it covered. A new run is
+    recorded as started by `job_id`; the summary's jobId is the run's owner,
+    so a caller can tell when it finished another job's run. Returns a
+    summary including the new GameSettings row.
+    """
+    run, resumed = _start_or_resume(connection, months, job_id)
+
+    settled = 0
+    while True:
+        count, lower, upper = _settle_chunk(connection, run, chunk_size)
+        if not count:
+            break
+        settled += count
+        if on_chunk is not None:
+            on_chunk(lower, upper)
+
+    settings = _finish(connection, run)
+    return {
+        "runId": run['runId'],
+        "resumed": resumed,
+        "jobId": run['jobId'],
+        "months": run['months'],
+        "rostersSettled": settled,
+        "settings": settings
+    }
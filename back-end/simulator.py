@@ -0,0 +1,407 @@
+"""Offline season simulator for trying out scoring rules.
+
+`take_snapshot` copies Roster, RosterMember, ArtistStats and GameSettings
+into NumPy arrays in one consistent read, and `Snapshot.save`/`load` keep it
+in a single .npz file. `load` also accepts a full-state export directory
+written by columnar.py, whose columns it memory-maps. From then on nothing touches MySQL: `simulate` replays
+any range of months over the snapshot with a pluggable scoring function.
+Each month is scored for every roster at once by summing per-artist values
+over the flat (roster, artist) membership arrays with `np.bincount`.
+
+A scoring function takes a `Month` and returns `(points_gain, budget_gain)`,
+one value per roster. `settlement_scoring` is what advance_month does today:
+
+    python simulator.py snapshot season.npz
+    python simulator.py run season.npz --months 12 --scoring mymodule:my_scoring --top 5
+
+Roster membership is frozen at snapshot time; trades made during the
+simulated months are not modelled.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from columnar import read_export
+from config import Config
+
+# What join_league and create_roster give a new roster, not the Roster.budget column default
+DEFAULT_BUDGET = Config.ROSTER_STARTING_BUDGET
+STAT_COLUMNS = ('price', 'popularity', 'listeners', 'followers')
+
+
+def period_ordinal(month, year):
+    return year * 12 + (month - 1)
+
+
+def from_ordinal(ordinal):
+    return ordinal % 12 + 1, ordinal // 12
+
+
+def sql_round(values):
+    # MySQL ROUND on exact values: half away from zero (np.round is half to even)
+    return np.sign(values) * np.floor(np.abs(values) + 0.5)
+
+
+class Snapshot:
+    def __init__(self, artist_ids, first_period, stats, roster_ids, league_ids, player_ids,
+                 points, budget, member_roster, member_artist, current_period):
+        self.artist_ids = artist_ids
+        self.first_period = first_period
+        # Column name -> artists x months float64 matrix, NaN where there is no ArtistStats row
+        self.stats = stats
+        self.roster_ids = roster_ids
+        self.league_ids = league_ids
+        self.player_ids = player_ids
+        self.points = points
+        self.budget = budget
+        # One entry per RosterMember row, as indexes into the roster and artist arrays
+        self.member_roster = member_roster
+        self.member_artist = member_artist
+        self.current_period = current_period
+
+    @property
+    def months(self):
+        return self.stats['price'].shape[1]
+
+    @property
+    def last_period(self):
+        return self.first_period + self.months - 1
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            artist_ids=self.artist_ids,
+            roster_ids=self.roster_ids,
+            league_ids=self.league_ids,
+            player_ids=self.player_ids,
+            points=self.points,
+            budget=self.budget,
+            member_roster=self.member_roster,
+            member_artist=self.member_artist,
+            periods=np.array([self.first_period, self.current_period], dtype=np.int64),
+            **{f'stats_{name}': matrix for name, matrix in self.stats.items()}
+        )
+
+    @classmethod
+    def load(cls, path):
+        if os.path.isdir(path):
+            return cls.from_export(path)
+        with np.load(path) as data:
+            first_period, current_period = (int(x) for x in data['periods'])
+            return cls(
+                artist_ids=data['artist_ids'],
+                first_period=first_period,
+                stats={name: data[f'stats_{name}'] for name in STAT_COLUMNS},
+                roster_ids=data['roster_ids'],
+                league_ids=data['league_ids'],
+                player_ids=data['player_ids'],
+                points=data['points'],
+                budget=data['budget'],
+                member_roster=data['member_roster'],
+                member_artist=data['member_artist'],
+                current_period=current_period,
+            )
+
+
+    @classmethod
+    def from_export(cls, path, batch_size=1000000):
+        """Build a snapshot from a columnar.py export; ArtistStats is read a batch at a time."""
+        export = read_export(path)
+        settings = export['GameSettings']
+        if not settings.rows:
+            raise ValueError("Game settings not initialized")
+        current_period = period_ordinal(int(settings['current_month'][0]), int(settings['current_year'][0]))
+        artist_ids = np.asarray(export['Artist']['artistId'], dtype=np.int64)
+
+        history = export['ArtistStats']
+        batches = [(start, min(start + batch_size, history.rows)) for start in range(0, history.rows, batch_size)]
+
+        def periods(start, stop):
+            return history['year'][start:stop].astype(np.int64) * 12 + history['month'][start:stop] - 1
+
+        first, last = current_period, current_period - 1
+        if batches:
+            # Rows are in (artistId, month, year) order, so the period range needs a pass of its own
+            bounds = [(int(p.min()), int(p.max())) for p in (periods(start, stop) for start, stop in batches)]
+            first, last = min(low for low, _ in bounds), max(high for _, high in bounds)
+        stats = {name: np.full((len(artist_ids), last - first + 1), np.nan) for name in STAT_COLUMNS}
+        for start, stop in batches:
+            r = np.searchsorted(artist_ids, history['artistId'][start:stop])
+            c = periods(start, stop) - first
+            for name in STAT_COLUMNS:
+                stats[name][r, c] = history[name][start:stop]
+
+        rosters = export['Roster']
+        roster_ids = np.asarray(rosters['rosterId'], dtype=np.int64)
+        members = export['RosterMember']
+        return cls(
+            artist_ids=artist_ids,
+            first_period=first,
+            stats=stats,
+            roster_ids=roster_ids,
+            league_ids=np.asarray(rosters['leagueId'], dtype=np.int64),
+            player_ids=np.asarray(rosters['playerId'], dtype=np.int64),
+            points=np.asarray(rosters['points'], dtype=np.int64),
+            budget=np.asarray(rosters['budget'], dtype=np.int64),
+            member_roster=np.searchsorted(roster_ids, members['rosterId']),
+            member_artist=np.searchsorted(artist_ids, members['artistId']),
+            current_period=current_period,
+        )
+
+
+def _column(rows, name, dtype=np.int64):
+    return np.fromiter((row[name] for row in rows), dtype=dtype, count=len(rows))
+
+
+def take_snapshot(connection, batch_size=50000):
+    """Read everything the simulator needs in one consistent snapshot; the only step that uses MySQL."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+
+        cursor.execute("SELECT current_month, current_year FROM GameSettings WHERE id = 1")
+        settings = cursor.fetchone()
+        if not settings:
+            raise ValueError("Game settings not initialized")
+        current_period = period_ordinal(settings['current_month'], settings['current_year'])
+
+        cursor.execute("SELECT artistId FROM Artist ORDER BY artistId")
+        artist_ids = _column(cursor.fetchall(), 'artistId')
+
+        cursor.execute("SELECT MIN(year * 12 + month - 1) AS first, MAX(year * 12 + month - 1) AS last FROM ArtistStats")
+        bounds = cursor.fetchone()
+        first = int(bounds['first']) if bounds['first'] is not None else current_period
+        last = int(bounds['last']) if bounds['last'] is not None else current_period - 1
+        stats = {name: np.full((len(artist_ids), last - first + 1), np.nan) for name in STAT_COLUMNS}
+
+        cursor.execute("""
+            SELECT artistId, year * 12 + month - 1 AS period, price, popularity, listeners, followers
+            FROM ArtistStats
+        """)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            r = np.searchsorted(artist_ids, _column(rows, 'artistId'))
+            c = _column(rows, 'period') - first
+            for name in STAT_COLUMNS:
+                stats[name][r, c] = _column(rows, name, np.float64)
+
+        cursor.execute("SELECT rosterId, leagueId, playerId, points, budget FROM Roster ORDER BY rosterId")
+        rosters = cursor.fetchall()
+        roster_ids = _column(rosters, 'rosterId')
+
+        cursor.execute("SELECT rosterId, artistId FROM RosterMember")
+        members = cursor.fetchall()
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return Snapshot(
+        artist_ids=artist_ids,
+        first_period=first,
+        stats=stats,
+        roster_ids=roster_ids,
+        league_ids=_column(rosters, 'leagueId'),
+        player_ids=_column(rosters, 'playerId'),
+        points=_column(rosters, 'points'),
+        budget=_column(rosters, 'budget'),
+        member_roster=np.searchsorted(roster_ids, _column(members, 'rosterId')),
+        member_artist=np.searchsorted(artist_ids, _column(members, 'artistId')),
+        current_period=current_period,
+    )
+
+
+class Month:
+    """What a scoring function sees for one simulated month."""
+
+    def __init__(self, snapshot, column, points, budget):
+        self.month, self.year = from_ordinal(snapshot.first_period + column)
+        self.column = column
+        # Running totals before this month is scored (read-only for scoring functions)
+        self.points = points
+        self.budget = budget
+        self._snapshot = snapshot
+
+    def __getattr__(self, name):
+        # month.price, month.popularity, ...: per-artist values for this month, NaN if missing
+        if name in STAT_COLUMNS:
+            return self._snapshot.stats[name][:, self.column]
+        raise AttributeError(name)
+
+    def per_roster(self, artist_values):
+        """Sum a per-artist array over each roster's members; artists without stats count as 0."""
+        snapshot = self._snapshot
+        values = np.nan_to_num(artist_values[snapshot.member_artist], nan=0.0)
+        return np.bincount(snapshot.member_roster, weights=values, minlength=len(snapshot.roster_ids))
+
+    def held(self):
+        """Per-roster count of members that have stats this month."""
+        return self.per_roster(np.where(np.isnan(self.price), np.nan, 1.0))
+
+
+def settlement_scoring(month):
+    # advance_month / SETTLE_CHUNK_QUERY: 10% of summed popularity, 5% of summed price
+    return sql_round(month.per_roster(month.popularity) * 0.1), sql_round(month.per_roster(month.price) * 0.05)
+
+
+def latest_stats_scoring(month):
+    # CalculateRosterPoints' formula, paid out monthly instead of overwriting points
+    artist_points = month.listeners / 1000000 + month.followers / 1000000 + month.popularity * 2
+    return sql_round(month.per_roster(artist_points)), sql_round(month.per_roster(month.price) * 0.05)
+
+
+class SimulationResult:
+    def __init__(self, snapshot, points, budget, first_period, months, seconds):
+        self.snapshot = snapshot
+        self.points = points
+        self.budget = budget
+        self.first_period = first_period
+        self.months = months
+        self.seconds = seconds
+
+    def ranks(self):
+        """Competition rank of every roster within its league (1 + rosters with strictly more points)."""
+        leagues = self.snapshot.league_ids
+        order = np.lexsort((self.snapshot.roster_ids, -self.points, leagues))
+        sorted_leagues, sorted_points = leagues[order], self.points[order]
+
+        new_league = np.ones(len(order), dtype=bool)
+        new_league[1:] = sorted_leagues[1:] != sorted_leagues[:-1]
+        new_score = new_league.copy()
+        new_score[1:] |= sorted_points[1:] != sorted_points[:-1]
+
+        positions = np.arange(len(order))
+        league_start = np.maximum.accumulate(np.where(new_league, positions, 0))
+        score_start = np.maximum.accumulate(np.where(new_score, positions, 0))
+
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = score_start - league_start + 1
+        return ranks
+
+    def standings(self, top=None):
+        """League id -> rows ordered by rank, optionally only the first `top` per league."""
+        snapshot = self.snapshot
+        ranks = self.ranks()
+        order = np.lexsort((snapshot.roster_ids, ranks, snapshot.league_ids))
+        standings = {}
+        for i in order:
+            rows = standings.setdefault(int(snapshot.league_ids[i]), [])
+            if top is not None and len(rows) >= top:
+                continue
+            rows.append({
+                "rank": int(ranks[i]),
+                "rosterId": int(snapshot.roster_ids[i]),
+                "playerId": int(snapshot.player_ids[i]),
+                "points": int(self.points[i]),
+                "budget": int(self.budget[i]),
+            })
+        return standings
+
+
+def simulate(snapshot, scoring=settlement_scoring, from_period=None, months=None, fresh=False):
+    """Replay `months` months starting at `from_period` (default: the snapshot's game month)."""
+    start = snapshot.current_period if from_period is None else from_period
+    if months is None:
+        months = snapshot.last_period - start + 1
+    if months < 1:
+        raise ValueError("Nothing to simulate: no stats at or after the starting month")
+
+    if fresh:
+        points = np.zeros(len(snapshot.roster_ids), dtype=np.int64)
+        budget = np.full(len(snapshot.roster_ids), DEFAULT_BUDGET, dtype=np.int64)
+    else:
+        points = snapshot.points.astype(np.int64)
+        budget = snapshot.budget.astype(np.int64)
+
+    started = time.perf_counter()
+    for offset in range(months):
+        column = start + offset - snapshot.first_period
+        if not 0 <= column < snapshot.months:
+            # No stats loaded for this month: nobody scores, like the SQL JOIN
+            continue
+        points_gain, budget_gain = scoring(Month(snapshot, column, points, budget))
+        points = points + np.asarray(points_gain).astype(np.int64)
+        budget = budget + np.asarray(budget_gain).astype(np.int64)
+
+    return SimulationResult(snapshot, points, budget, start, months, time.perf_counter() - started)
+
+
+def load_scoring(spec):
+    # "module:function"; a bare name is looked up in this module
+    module_name, _, attribute = spec.rpartition(':')
+    module = importlib.import_module(module_name) if module_name else sys.modules[__name__]
+    return getattr(module, attribute)
+
+
+def parse_period(text):
+    month, year = (int(part) for part in text.split('/'))
+    return period_ordinal(month, year)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline season simulator")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    snap = commands.add_parser('snapshot', help="copy the tables the simulator needs into an .npz file")
+    snap.add_argument('path')
+
+    run = commands.add_parser('run', help="replay months over a saved snapshot")
+    run.add_argument('path', help="an .npz snapshot or a columnar.py export directory")
+    run.add_argument('--from', dest='start', help="first month to score as M/YYYY (default: the game month)")
+    run.add_argument('--months', type=int, help="months to replay (default: up to the last month with stats)")
+    run.add_argument('--scoring', default='settlement_scoring', help="module:function (default: settlement_scoring)")
+    run.add_argument('--fresh', action='store_true', help=f"start from 0 points and a {DEFAULT_BUDGET} budget")
+    run.add_argument('--top', type=int, default=3, help="rows per league to print")
+    run.add_argument('--json', help="write the full standings to this file")
+    args = parser.parse_args()
+
+    if args.command == 'snapshot':
+        from config import Config
+        from db import connect
+
+        connection = connect(Config)
+        try:
+            snapshot = take_snapshot(connection)
+        finally:
+            connection.close()
+        snapshot.save(args.path)
+        print(f"saved {len(snapshot.roster_ids)} rosters, {len(snapshot.member_roster)} members, "
+              f"{len(snapshot.artist_ids)} artists x {snapshot.months} months to {args.path}")
+        return
+
+    snapshot = Snapshot.load(args.path)
+    result = simulate(
+        snapshot,
+        scoring=load_scoring(args.scoring),
+        from_period=parse_period(args.start) if args.start else None,
+        months=args.months,
+        fresh=args.fresh,
+    )
+    first_month, first_year = from_ordinal(result.first_period)
+    print(f"simulated {result.months} month(s) from {first_month}/{first_year} for "
+          f"{len(snapshot.roster_ids)} rosters in {result.seconds:.3f}s")
+
+    standings = result.standings()
+    for league_id, rows in list(standings.items())[:20]:
+        print(f"league {league_id}")
+        for row in rows[:args.top]:
+            print(f"  {row['rank']:>4}  roster {row['rosterId']:<8} points {row['points']:<10} budget {row['budget']}")
+    if len(standings) > 20:
+        print(f"... {len(standings) - 20} more leagues")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({str(league_id): rows for league_id, rows in standings.items()}, f)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""Per-league standings kept in memory and maintained incrementally.
+
+Each league's rosters sit in an order-statistic treap keyed by
+(-points, rosterId), so top-K, a single player's rank and the rows around a
+player all cost O(log n) (plus the rows returned) instead of a sorted query.
+Leagues are loaded on first use; writes that move Roster.points push the new
+values in with `apply`, and anything that happens outside this process (e.g.
+CalculateRosterPoints fired by a stats load) is picked up when the entry's
+TTL runs out or the game clock version changes. A league loaded while an
+`apply` or drop for it ran is returned to its caller but not kept, so those
+newer points are not overwritten by the older rows until the TTL expires.
+"""
+import random
+import threading
+import time
+
+
+class LeagueNotFound(LookupError):
+    pass
+
+
+class _Node:
+    __slots__ = ('key', 'priority', 'left', 'right', 'size')
+
+    def __init__(self, key):
+        self.key = key
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.size = 1
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _update(node):
+    node.size = 1 + _size(node.left) + _size(node.right)
+
+
+def _split(node, key, inclusive):
+    # Returns (keys < key, keys >= key), or (keys <= key, keys > key) when inclusive
+    if node is None:
+        return None, None
+    if node.key < key or (inclusive and node.key == key):
+        left, right = _split(node.right, key, inclusive)
+        node.right = left
+        _update(node)
+        return node, right
+    left, right = _split(node.left, key, inclusive)
+    node.left = right
+    _update(node)
+    return left, node
+
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+class OrderStatisticTree:
+    def __init__(self):
+        self._root = None
+
+    def __len__(self):
+        return _size(self._root)
+
+    def insert(self, key):
+        left, right = _split(self._root, key, False)
+        self._root = _merge(_merge(left, _Node(key)), right)
+
+    def remove(self, key):
+        left, rest = _split(self._root, key, False)
+        _, right = _split(rest, key, True)
+        self._root = _merge(left, right)
+
+    def rank(self, key):
+        """Number of keys strictly smaller than `key`."""
+        node, count = self._root, 0
+        while node:
+            if node.key < key:
+                count += _size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def select(self, index):
+        node = self._root
+        while node:
+            left = _size(node.left)
+            if index < left:
+                node = node.left
+            elif index == left:
+                return node.key
+            else:
+                index -= left + 1
+                node = node.right
+        raise IndexError(index)
+
+    def slice(self, start, stop):
+        stop = min(stop, len(self))
+        return [self.select(i) for i in range(max(start, 0), stop)]
+
+
+class LeagueStandings:
+    def __init__(self, league_id, version):
+        self.league_id = league_id
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.rows = {}
+        self.roster_by_player = {}
+        self.tree = OrderStatisticTree()
+
+    def put(self, row):
+        old = self.rows.get(row['rosterId'])
+        if old is not None:
+            self.tree.remove((-old['points'], old['rosterId']))
+            row = {**old, **row}
+        self.rows[row['rosterId']] = row
+        self.roster_by_player[row['playerId']] = row['rosterId']
+        self.tree.insert((-row['points'], row['rosterId']))
+
+    def discard(self, roster_id):
+        row = self.rows.pop(roster_id, None)
+        if row is not None:
+            self.tree.remove((-row['points'], roster_id))
+            self.roster_by_player.pop(row['playerId'], None)
+
+    def _ranked(self, key):
+        row = dict(self.rows[key[1]])
+        # Competition ranking: 1 + rosters with strictly more points
+        row['rank'] = self.tree.rank((key[0], 0)) + 1
+        return row
+
+    def top(self, limit=None, offset=0):
+        stop = len(self.tree) if limit is None else offset + limit
+        return [self._ranked(key) for key in self.tree.slice(offset, stop)]
+
+    def player(self, player_id):
+        roster_id = self.roster_by_player.get(player_id)
+        if roster_id is None:
+            return None
+        return self._ranked((-self.rows[roster_id]['points'], roster_id))
+
+    def around(self, player_id, radius):
+        roster_id = self.roster_by_player.get(player_id)
+        if roster_id is None:
+            return None
+        position = self.tree.rank((-self.rows[roster_id]['points'], roster_id))
+        return [self._ranked(key) for key in self.tree.slice(position - radius, position + radius + 1)]
+
+
+class StandingsIndex:
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._leagues = {}
+        # Bumped by every change; a load is only stored if its league's generation did not move
+        self._epoch = 0
+        self._changes = {}
+
+    def _generation(self, league_id):
+        return self._epoch, self._changes.get(league_id, 0)
+
+    def _changed(self, league_id):
+        self._changes[league_id] = self._changes.get(league_id, 0) + 1
+
+    def league(self, cursor, league_id, version=None):
+        """Return the LeagueStandings for `league_id`, loading it if needed; None if the league does not exist."""
+        with self._lock:
+            standings = self._leagues.get(league_id)
+            if (standings is not None and standings.version == version
+                    and time.monotonic() - standings.loaded_at < self.ttl):
+                return standings
+            generation = self._generation(league_id)
+
+        cursor.execute("""
+            SELECT l.leagueId, p.playerId, p.playerName, r.points, r.rosterId
+            FROM League l
+            LEFT JOIN Roster r ON r.leagueId = l.leagueId
+            LEFT JOIN Player p ON r.playerId = p.playerId
+            WHERE l.leagueId = %s
+        """, (league_id,))
+        rows = cursor.fetchall()
+        if not rows:
+            with self._lock:
+                if self._generation(league_id) == generation:
+                    self._leagues.pop(league_id, None)
+            return None
+
+        standings = LeagueStandings(league_id, version)
+        for row in rows:
+            if row['rosterId'] is not None:
+                standings.put({key: row[key] for key in ('playerId', 'playerName', 'points', 'rosterId')})
+
+        with self._lock:
+            if self._generation(league_id) == generation:
+                self._leagues[league_id] = standings
+        return standings
+
+    def query(self, cursor, league_id, version, method, *args):
+        """Run a LeagueStandings read (`top`, `player`, `around`) under the index lock."""
+        standings = self.league(cursor, league_id, version)
+        if standings is None:
+            raise LeagueNotFound(league_id)
+        with self._lock:
+            return getattr(standings, method)(*args)
+
+    def refresh(self, cursor, version=None, chunk_size=500):
+        """Re-read Roster.points for every league held in memory, e.g. after a month is settled."""
+        with self._lock:
+            league_ids = list(self._leagues)
+        for start in range(0, len(league_ids), chunk_size):
+            chunk = league_ids[start:start + chunk_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(
+                f"SELECT rosterId, leagueId, points FROM Roster WHERE leagueId IN ({placeholders})",
+                chunk
+            )
+            self.apply(cursor.fetchall(), version)
+
+    def stamp(self, version):
+        # Everything in memory is known to be current as of `version`
+        with self._lock:
+            for standings in self._leagues.values():
+                standings.version = version
+
+    def apply(self, rows, version=None):
+        """Push new points for rosters ({rosterId, leagueId, points}) into the leagues held in memory."""
+        with self._lock:
+            for row in rows:
+                self._changed(row['leagueId'])
+                standings = self._leagues.get(row['leagueId'])
+                if standings is None:
+                    continue
+                if row['rosterId'] in standings.rows:
+                    standings.put({'rosterId': row['rosterId'], 'points': row['points']})
+                else:
+                    # A roster we have never seen needs its player details; reload the league lazily
+                    self._leagues.pop(row['leagueId'])
+                    continue
+                if version is not None:
+                    standings.version = version
+
+    def drop_league(self, league_id):
+        with self._lock:
+            self._changed(league_id)
+            self._leagues.pop(league_id, None)
+
+    def drop_player(self, player_id):
+        with self._lock:
+            # The player's leagues are only known for those in memory
+            self._epoch += 1
+            for league_id, standings in list(self._leagues.items()):
+                if player_id in standings.roster_by_player:
+                    del self._leagues[league_id]
+
+    def invalidate(self):
+        with self._lock:
+            self._epoch += 1
+            self._leagues.clear()
@@ -0,0 +1,65 @@
+import unittest
+
+from artist_index import ArtistIndex
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return list(self.rows)
+
+
+NAMES = {
+    1: 'The Beatles',
+    2: 'Beat Happening',
+    3: 'Beat',
+    4: 'English Beat',
+    5: 'Heartbeat City',
+    6: 'Taylor Swift',
+}
+
+
+def loaded_index(names=NAMES):
+    index = ArtistIndex()
+    index.load(FakeCursor([{'artistId': artist_id, 'artistName': name} for artist_id, name in names.items()]))
+    return index
+
+
+class ArtistIndexTest(unittest.TestCase):
+    def test_exact_then_prefix_then_substring(self):
+        # Substring matches come alphabetically: "english beat" < "heartbeat city" < "the beatles"
+        self.assertEqual(loaded_index().search('beat', 10), [3, 2, 4, 5, 1])
+
+    def test_search_is_case_insensitive(self):
+        self.assertEqual(loaded_index().search('BEAT', 1), [3])
+        self.assertEqual(loaded_index().search('swift', 10), [6])
+
+    def test_limit_stops_early(self):
+        self.assertEqual(loaded_index().search('beat', 3), [3, 2, 4])
+
+    def test_two_letter_terms_use_bigrams(self):
+        self.assertEqual(loaded_index().search('ft', 10), [6])
+
+    def test_short_terms_and_misses(self):
+        index = loaded_index()
+        self.assertEqual(index.search('b', 10), [])
+        self.assertEqual(index.search('beat', 0), [])
+        self.assertEqual(index.search('zzz', 10), [])
+        # Every gram is present, but never in one name
+        self.assertEqual(index.search('beatswift', 10), [])
+
+    def test_add_keeps_alphabetical_order(self):
+        index = loaded_index()
+        index.add(7, 'Arcade Beat')
+        index.add(3, 'Ignored Rename')
+        self.assertEqual(len(index), 7)
+        self.assertEqual(index.search('beat', 10), [3, 2, 7, 4, 5, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
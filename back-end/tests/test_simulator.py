@@ -0,0 +1,43 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from simulator import SimulationResult, sql_round
+
+
+def result(league_ids, points):
+    snapshot = SimpleNamespace(
+        league_ids=np.array(league_ids),
+        roster_ids=np.arange(1, len(league_ids) + 1),
+        player_ids=np.arange(1, len(league_ids) + 1) * 10,
+    )
+    points = np.array(points, dtype=np.int64)
+    return SimulationResult(snapshot, points, np.zeros_like(points), 0, 1, 0.0)
+
+
+class RanksTest(unittest.TestCase):
+    def test_competition_ranking_within_each_league(self):
+        ranks = result([1, 1, 1, 1, 2, 2], [50, 80, 50, 20, 5, 9]).ranks()
+        self.assertEqual(ranks.tolist(), [2, 1, 2, 4, 2, 1])
+
+    def test_all_tied(self):
+        self.assertEqual(result([3, 3, 3], [7, 7, 7]).ranks().tolist(), [1, 1, 1])
+
+    def test_interleaved_leagues(self):
+        ranks = result([2, 1, 2, 1], [10, 10, 30, 40]).ranks()
+        self.assertEqual(ranks.tolist(), [2, 2, 1, 1])
+
+    def test_standings_top(self):
+        standings = result([1, 1, 1], [10, 30, 30]).standings(top=2)
+        self.assertEqual([(row['rosterId'], row['rank']) for row in standings[1]], [(2, 1), (3, 1)])
+
+
+class SqlRoundTest(unittest.TestCase):
+    def test_halves_round_away_from_zero(self):
+        values = np.array([0.5, 1.5, 2.5, -0.5, -2.5, 2.4, -2.6])
+        self.assertEqual(sql_round(values).tolist(), [1.0, 2.0, 3.0, -1.0, -3.0, 2.0, -3.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
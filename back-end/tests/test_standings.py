@@ -0,0 +1,139 @@
+import random
+import unittest
+
+from standings import LeagueStandings, OrderStatisticTree, StandingsIndex
+
+
+class FakeCursor:
+    def __init__(self, rows, on_execute=None):
+        self.rows = rows
+        self.on_execute = on_execute
+
+    def execute(self, query, params=None):
+        if self.on_execute:
+            self.on_execute()
+
+    def fetchall(self):
+        return list(self.rows)
+
+
+def league_rows(league_id, points_by_roster):
+    return [
+        {'leagueId': league_id, 'playerId': roster_id * 10, 'playerName': f'p{roster_id}',
+         'points': points, 'rosterId': roster_id}
+        for roster_id, points in points_by_roster.items()
+    ]
+
+
+class OrderStatisticTreeTest(unittest.TestCase):
+    def test_matches_a_sorted_list(self):
+        rng = random.Random(7)
+        tree, expected = OrderStatisticTree(), []
+        for _ in range(500):
+            key = (rng.randint(-50, 0), rng.randint(1, 10000))
+            if key in expected:
+                continue
+            tree.insert(key)
+            expected.append(key)
+        for key in rng.sample(expected, 200):
+            tree.remove(key)
+            expected.remove(key)
+        expected.sort()
+
+        self.assertEqual(len(tree), len(expected))
+        self.assertEqual(tree.slice(0, len(expected)), expected)
+        for index, key in enumerate(expected):
+            self.assertEqual(tree.rank(key), index)
+            self.assertEqual(tree.select(index), key)
+
+    def test_rank_of_absent_key_counts_smaller_keys(self):
+        tree = OrderStatisticTree()
+        for key in (1, 3, 5):
+            tree.insert(key)
+        self.assertEqual(tree.rank(0), 0)
+        self.assertEqual(tree.rank(4), 2)
+        self.assertEqual(tree.rank(9), 3)
+
+    def test_select_out_of_range(self):
+        tree = OrderStatisticTree()
+        tree.insert(1)
+        with self.assertRaises(IndexError):
+            tree.select(1)
+
+    def test_slice_clamps_bounds(self):
+        tree = OrderStatisticTree()
+        for key in range(5):
+            tree.insert(key)
+        self.assertEqual(tree.slice(-2, 2), [0, 1])
+        self.assertEqual(tree.slice(3, 10), [3, 4])
+
+
+class LeagueStandingsTest(unittest.TestCase):
+    def standings(self, points_by_roster):
+        standings = LeagueStandings(1, None)
+        for row in league_rows(1, points_by_roster):
+            del row['leagueId']
+            standings.put(row)
+        return standings
+
+    def test_competition_ranking_shares_ranks_on_ties(self):
+        standings = self.standings({1: 50, 2: 80, 3: 50, 4: 20})
+        ranked = [(row['rosterId'], row['rank']) for row in standings.top()]
+        self.assertEqual(ranked, [(2, 1), (1, 2), (3, 2), (4, 4)])
+
+    def test_put_moves_an_existing_roster(self):
+        standings = self.standings({1: 50, 2: 80})
+        standings.put({'rosterId': 1, 'points': 90})
+        self.assertEqual(standings.player(10)['rank'], 1)
+        self.assertEqual(standings.player(20)['rank'], 2)
+        self.assertEqual(standings.player(10)['playerName'], 'p1')
+
+    def test_top_with_offset_and_limit(self):
+        standings = self.standings({1: 10, 2: 20, 3: 30, 4: 40})
+        self.assertEqual([row['rosterId'] for row in standings.top(limit=2, offset=1)], [3, 2])
+
+    def test_around_stops_at_the_edges(self):
+        standings = self.standings({1: 10, 2: 20, 3: 30, 4: 40})
+        self.assertEqual([row['rosterId'] for row in standings.around(40, 1)], [4, 3])
+        self.assertEqual([row['rosterId'] for row in standings.around(20, 1)], [3, 2, 1])
+        self.assertIsNone(standings.around(99, 1))
+
+    def test_discard(self):
+        standings = self.standings({1: 10, 2: 20})
+        standings.discard(2)
+        self.assertIsNone(standings.player(20))
+        self.assertEqual(standings.player(10)['rank'], 1)
+
+
+class StandingsIndexTest(unittest.TestCase):
+    def test_load_is_cached(self):
+        index = StandingsIndex()
+        index.league(FakeCursor(league_rows(1, {1: 10})), 1)
+        cursor = FakeCursor([], on_execute=lambda: self.fail("league was reloaded"))
+        self.assertEqual(index.query(cursor, 1, None, 'player', 10)['points'], 10)
+
+    def test_missing_league(self):
+        self.assertIsNone(StandingsIndex().league(FakeCursor([]), 1))
+
+    def test_load_racing_an_apply_is_not_stored(self):
+        index = StandingsIndex()
+        # The settlement's apply lands after the load's SELECT has read the old points
+        cursor = FakeCursor(
+            league_rows(1, {1: 10}),
+            on_execute=lambda: index.apply([{'rosterId': 1, 'leagueId': 1, 'points': 99}])
+        )
+        self.assertEqual(index.league(cursor, 1).player(10)['points'], 10)
+
+        reloaded = index.league(FakeCursor(league_rows(1, {1: 99})), 1)
+        self.assertEqual(reloaded.player(10)['points'], 99)
+
+    def test_apply_updates_a_loaded_league(self):
+        index = StandingsIndex()
+        index.league(FakeCursor(league_rows(1, {1: 10, 2: 20})), 1)
+        index.apply([{'rosterId': 1, 'leagueId': 1, 'points': 30}], version=4)
+        standings = index.league(FakeCursor([], on_execute=lambda: self.fail("league was reloaded")), 1, 4)
+        self.assertEqual(standings.player(10)['rank'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
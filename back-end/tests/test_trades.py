@@ -0,0 +1,31 @@
+import unittest
+
+from trades import TradeError, _id_list, refund_for
+
+
+class RefundTest(unittest.TestCase):
+    def test_rounds_half_away_from_zero(self):
+        # 70% of 5 is 3.5 and of 15 is 10.5; MySQL stores both rounded up
+        self.assertEqual(refund_for(5), 4)
+        self.assertEqual(refund_for(15), 11)
+
+    def test_exact_and_truncated_values(self):
+        self.assertEqual(refund_for(0), 0)
+        self.assertEqual(refund_for(10), 7)
+        self.assertEqual(refund_for(1), 1)
+        self.assertEqual(refund_for(3), 2)
+        self.assertEqual(refund_for(1000), 700)
+
+
+class IdListTest(unittest.TestCase):
+    def test_accepts_integer_lists(self):
+        self.assertEqual(_id_list([3, 1], 'add'), [3, 1])
+
+    def test_rejects_duplicates_and_non_integers(self):
+        for values in ([1, 1], [1, '2'], [True], 'abc'):
+            with self.assertRaises(TradeError):
+                _id_list(values, 'add')
+
+
+if __name__ == '__main__':
+    unittest.main()
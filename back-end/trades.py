@@ -0,0 +1,150 @@
+"""Batch roster trades: many adds and drops in one transaction.
+
+The single-artist endpoints each run their own pre-checks and stored
+procedure call. A trade instead locks the roster row once, resolves the
+latest price of every artist involved in one query, checks the net budget
+once, and applies all deletes, inserts and the budget change before a single
+commit, so it either fully happens or not at all.
+
+A single purchase goes through the PurchaseArtist procedure instead: one CALL
+reserves the budget with a conditional UPDATE and inserts the RosterMember
+row, so no lock is held while Python runs and concurrent buyers on the same
+roster cannot overspend.
+"""
+import MySQLdb
+
+# RemoveArtistFromRoster refunds 70% of the current price
+REFUND_RATE_TENTHS = 7
+
+# Errors PurchaseArtist can end with -> (message, status)
+ER_SIGNAL_EXCEPTION = 1644
+ER_DUP_ENTRY = 1062
+ER_NO_REFERENCED_ROW = 1452
+PURCHASE_SIGNAL_STATUS = {
+    'Artist not found': 404,
+    'Roster not found': 404,
+    'Not enough budget to add this artist': 400,
+}
+
+
+class TradeError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def refund_for(price):
+    # Same as MySQL storing price * 0.7 into an INT column (rounds half away from zero)
+    return (price * REFUND_RATE_TENTHS + 5) // 10
+
+
+def _id_list(values, name):
+    if not isinstance(values, list) or not all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        raise TradeError(f"{name} must be a list of artist IDs")
+    if len(set(values)) != len(values):
+        raise TradeError(f"{name} contains duplicate artist IDs")
+    return values
+
+
+def _in_clause(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def latest_prices(cursor, artist_ids):
+    cursor.execute(
+        f"SELECT artistId, price FROM ArtistLatestStats WHERE artistId IN ({_in_clause(artist_ids)})",
+        artist_ids
+    )
+    return {row['artistId']: row['price'] for row in cursor.fetchall()}
+
+
+def apply_trade(connection, roster_id, adds, drops):
+    adds = _id_list(adds, 'add')
+    drops = _id_list(drops, 'drop')
+    if not adds and not drops:
+        raise TradeError("Nothing to trade")
+    if set(adds) & set(drops):
+        raise TradeError("An artist cannot be added and dropped in the same trade")
+
+    involved = adds + drops
+    cursor = connection.cursor()
+    try:
+        cursor.execute("START TRANSACTION")
+
+        cursor.execute("SELECT budget FROM Roster WHERE rosterId = %s FOR UPDATE", (roster_id,))
+        roster = cursor.fetchone()
+        if not roster:
+            raise TradeError("Roster not found", 404)
+
+        cursor.execute(
+            f"SELECT artistId FROM RosterMember WHERE rosterId = %s AND artistId IN ({_in_clause(involved)})",
+            (roster_id, *involved)
+        )
+        held = {row['artistId'] for row in cursor.fetchall()}
+
+        already_held = [artist_id for artist_id in adds if artist_id in held]
+        if already_held:
+            raise TradeError(f"Artists already in the roster: {already_held}", 409)
+        not_held = [artist_id for artist_id in drops if artist_id not in held]
+        if not_held:
+            raise TradeError(f"Artists not in the roster: {not_held}", 404)
+
+        prices = latest_prices(cursor, involved)
+        unknown = [artist_id for artist_id in adds if artist_id not in prices]
+        if unknown:
+            raise TradeError(f"Artists not found: {unknown}", 404)
+
+        cost = sum(prices[artist_id] for artist_id in adds)
+        refund = sum(refund_for(prices.get(artist_id, 0)) for artist_id in drops)
+        if roster['budget'] + refund - cost < 0:
+            raise TradeError("Not enough budget for this trade")
+
+        if drops:
+            cursor.execute(
+                f"DELETE FROM RosterMember WHERE rosterId = %s AND artistId IN ({_in_clause(drops)})",
+                (roster_id, *drops)
+            )
+        if adds:
+            cursor.executemany(
+                "INSERT INTO RosterMember (artistId, rosterId) VALUES (%s, %s)",
+                [(artist_id, roster_id) for artist_id in adds]
+            )
+        cursor.execute(
+            "UPDATE Roster SET budget = budget + %s WHERE rosterId = %s",
+            (refund - cost, roster_id)
+        )
+        connection.commit()
+
+        return {
+            "added": adds,
+            "dropped": drops,
+            "cost": cost,
+            "refund": refund,
+            "budget": roster['budget'] + refund - cost
+        }
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def purchase_artist(connection, roster_id, artist_id):
+    """Buy one artist in a single round trip; returns {"price", "budget"} after the purchase."""
+    cursor = connection.cursor()
+    try:
+        # Not callproc: it sends a SET for the argument variables first, a second round trip
+        cursor.execute("CALL PurchaseArtist(%s, %s)", (roster_id, artist_id))
+        return cursor.fetchone()
+    except MySQLdb.Error as e:
+        code = e.args[0] if e.args else None
+        message = e.args[1] if len(e.args) > 1 else str(e)
+        if code == ER_SIGNAL_EXCEPTION and message in PURCHASE_SIGNAL_STATUS:
+            raise TradeError(message, PURCHASE_SIGNAL_STATUS[message])
+        if code == ER_DUP_ENTRY:
+            raise TradeError("Artist is already in the roster", 409)
+        if code == ER_NO_REFERENCED_ROW:
+            raise TradeError("Roster not found", 404)
+        raise
+    finally:
+        cursor.close()
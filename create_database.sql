@@ -56,11 +56,39 @@ CREATE TABLE ArtistStats (
     CONSTRAINT check_positive_stats CHECK (listeners >= 0 AND followers >= 0 AND popularity >= 0 AND price >= 0)
 );
 
+-- One row per artist holding its most recent ArtistStats row, so "current price"
+-- is a primary-key read. Maintained by after_artist_stats_update, the bulk
+-- recompute procedures and RefreshAllArtistLatestStats.
+CREATE TABLE ArtistLatestStats (
+    artistId INT PRIMARY KEY,
+    month INT NOT NULL,
+    year INT NOT NULL,
+    listeners INT NOT NULL,
+    followers INT NOT NULL,
+    popularity INT NOT NULL,
+    price INT NOT NULL,
+    FOREIGN KEY (artistId) REFERENCES Artist(artistId) ON DELETE CASCADE
+);
+
 CREATE TABLE GameSettings (
   id INT PRIMARY KEY DEFAULT 1,
   current_month INT NOT NULL,
   current_year INT NOT NULL,
+  version INT NOT NULL DEFAULT 0,
   CONSTRAINT single_row CHECK (id = 1)
 );
 
+CREATE TABLE SettlementRun (
+    runId INT PRIMARY KEY AUTO_INCREMENT,
+    fromMonth INT NOT NULL,
+    fromYear INT NOT NULL,
+    months INT NOT NULL DEFAULT 1,
+    lastRosterId INT NOT NULL DEFAULT 0,
+    status VARCHAR(10) NOT NULL DEFAULT 'running',
+    startedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_settlement_status (status),
+    CONSTRAINT check_settlement_months CHECK (months >= 1)
+);
+
 INSERT INTO GameSettings (current_month, current_year) VALUES (1, 2024);
\ No newline at end of file
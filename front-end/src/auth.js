@@ -0,0 +1,5 @@
+// Session token issued at login/sign-up, sent with requests that act as the player
+export const authHeaders = () => {
+  const user = JSON.parse(localStorage.getItem('user') || 'null');
+  return user?.token ? { Authorization: `Bearer ${user.token}` } : {};
+};
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import '../App.css';
+import { authHeaders } from '../auth';
 
 const LeagueManagement = ({ userId, username }) => {
   const [leagues, setLeagues] = useState([]);
@@ -58,6 +59,28 @@ const LeagueManagement = ({ userId, username }) => {
     }
   };
 
+  // Standings changes are pushed once per settlement instead of being polled
+  useEffect(() => {
+    if (!selectedLeague) return undefined;
+    const leagueId = selectedLeague.leagueId;
+    const source = new EventSource(`http://localhost:5000/api/events/leagues/${leagueId}`);
+
+    source.addEventListener('settlement', (e) => {
+      const update = JSON.parse(e.data);
+      setLeagueStandings(prev => {
+        const rows = new Map(update.full ? [] : prev.map(row => [row.rosterId, row]));
+        update.removed.forEach(rosterId => rows.delete(rosterId));
+        update.changed.forEach(row => rows.set(row.rosterId, row));
+        return [...rows.values()].sort((a, b) => b.points - a.points || a.rosterId - b.rosterId);
+      });
+    });
+    // Missed updates while the tab was slow: reload the table once
+    source.addEventListener('resync', () => fetchLeagueStandings(leagueId));
+    source.addEventListener('closed', () => source.close());
+
+    return () => source.close();
+  }, [selectedLeague?.leagueId]);
+
   const handleLeagueSelect = (league) => {
     setSelectedLeague(league);
     fetchLeagueStandings(league.leagueId);
@@ -79,6 +102,7 @@ const LeagueManagement = ({ userId, username }) => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders(),
         },
         body: JSON.stringify({
           leagueName: newLeagueName,
@@ -113,6 +137,7 @@ const LeagueManagement = ({ userId, username }) => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders(),
         },
         body: JSON.stringify({
           playerId: userId
@@ -1,7 +1,8 @@
 import React, { useState } from 'react';
+import { authHeaders } from '../auth';
 import '../App.css';
 
-const PlayerList = ({ players, refreshPlayers }) => {
+const PlayerList = ({ players, refreshPlayers, hasMore, loadMore }) => {
   const [selectedPlayer, setSelectedPlayer] = useState(null);
   const [hoveredPlayer, setHoveredPlayer] = useState(null);
   const [newPassword, setNewPassword] = useState('');
@@ -31,6 +32,7 @@ const PlayerList = ({ players, refreshPlayers }) => {
     try {
       const response = await fetch(`http://localhost:5000/api/delete_player/${playerId}`, {
         method: 'DELETE',
+        headers: authHeaders(),
       });
 
       const data = await response.json();
@@ -66,6 +68,7 @@ const PlayerList = ({ players, refreshPlayers }) => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders(),
         },
         body: JSON.stringify({
           new_password: newPassword,
@@ -94,7 +97,7 @@ const PlayerList = ({ players, refreshPlayers }) => {
       {error && <div className="error-message">{error}</div>}
 
       <div className="debug-info" style={{ marginBottom: '20px' }}>
-        <p>Total players: {formattedPlayers.length}</p>
+        <p>Players loaded: {formattedPlayers.length}{hasMore ? ' (more available)' : ''}</p>
         <p>Sample player data: {JSON.stringify(formattedPlayers[0] || 'No players')}</p>
       </div>
       
@@ -138,6 +141,11 @@ const PlayerList = ({ players, refreshPlayers }) => {
               ))}
             </tbody>
           </table>
+          {hasMore && (
+            <button onClick={loadMore} className="submit-button">
+              Load more players
+            </button>
+          )}
         </div>
         
         {hoveredPlayer && (
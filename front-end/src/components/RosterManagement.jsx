@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import ArtistSearch from './ArtistSearch';
+import { authHeaders } from '../auth';
 import '../App.css';
 
 const RosterManagement = ({ userId, username }) => {
@@ -27,6 +28,14 @@ const RosterManagement = ({ userId, username }) => {
     fetchCurrentDate();
   }, [userId]);
 
+  // Keep the open roster in step with the latest dashboard data
+  useEffect(() => {
+    if (!selectedRoster) return;
+    const fresh = rosters.find(r => r.rosterId === selectedRoster.rosterId);
+    setSelectedRoster(fresh || null);
+    setRosterArtists(fresh ? fresh.artists : []);
+  }, [rosters]);
+
   // Fetch current game date
   const fetchCurrentDate = async () => {
     try {
@@ -43,19 +52,19 @@ const RosterManagement = ({ userId, username }) => {
     }
   };
 
-  // Original fetchRosters function
+  // One dashboard call brings every roster with its priced holdings and league rank
   const fetchRosters = async () => {
     try {
       setLoading(true);
       setError('');
-      const response = await fetch(`http://localhost:5000/api/rosters?playerId=${userId}`);
+      const response = await fetch(`http://localhost:5000/api/players/${userId}/dashboard`);
       
       if (!response.ok) {
         throw new Error('Failed to fetch rosters');
       }
       
       const data = await response.json();
-      setRosters(data);
+      setRosters(data.rosters);
     } catch (err) {
       setError('Error fetching rosters: ' + err.message);
       console.error('Error:', err);
@@ -74,7 +83,8 @@ const RosterManagement = ({ userId, username }) => {
       setIsAdvancing(true);
       setError('');
       const response = await fetch('http://localhost:5000/api/advance-month', {
-        method: 'POST'
+        method: 'POST',
+        headers: authHeaders()
       });
 
       if (!response.ok) {
@@ -97,34 +107,13 @@ const RosterManagement = ({ userId, username }) => {
     }
   };
 
-  // Original roster selection handler
+  // Holdings already came with the dashboard; no extra request per roster
   const handleRosterSelect = (roster) => {
     setSelectedRoster(roster);
-    fetchRosterArtists(roster.rosterId);
+    setRosterArtists(roster.artists);
     setShowArtistSearch(false);
   };
 
-  // Original fetch roster artists
-  const fetchRosterArtists = async (rosterId) => {
-    try {
-      setLoading(true);
-      setError('');
-      const response = await fetch(`http://localhost:5000/api/rosters/${rosterId}/artists`);
-      
-      if (!response.ok) {
-        throw new Error('Failed to fetch roster artists');
-      }
-      
-      const data = await response.json();
-      setRosterArtists(data);
-    } catch (err) {
-      setError('Error fetching roster artists: ' + err.message);
-      console.error('Error:', err);
-    } finally {
-      setLoading(false);
-    }
-  };
-
   // Original delete roster handler
   const handleDeleteRoster = async (rosterId) => {
     if (!window.confirm('Are you sure you want to delete this roster? This will remove all artists from the roster.')) {
@@ -136,6 +125,7 @@ const RosterManagement = ({ userId, username }) => {
       setError('');
       const response = await fetch(`http://localhost:5000/api/rosters/${rosterId}`, {
         method: 'DELETE',
+        headers: authHeaders(),
       });
 
       const data = await response.json();
@@ -170,7 +160,7 @@ const RosterManagement = ({ userId, username }) => {
       setError('');
       const response = await fetch(
         `http://localhost:5000/api/rosters/${selectedRoster.rosterId}/artists/${artistId}`,
-        { method: 'DELETE' }
+        { method: 'DELETE', headers: authHeaders() }
       );
 
       const data = await response.json();
@@ -181,15 +171,7 @@ const RosterManagement = ({ userId, username }) => {
       
       setMessage(data.message || 'Artist removed from roster successfully!');
       
-      const artistToRemove = rosterArtists.find(a => a.artistId === artistId);
-      if (artistToRemove) {
-        setSelectedRoster({
-          ...selectedRoster,
-          budget: selectedRoster.budget + artistToRemove.price
-        });
-      }
-      
-      fetchRosterArtists(selectedRoster.rosterId);
+      fetchRosters();
     } catch (err) {
       setError(err.message || 'Failed to remove artist');
       console.error('Error:', err);
@@ -212,7 +194,7 @@ const RosterManagement = ({ userId, username }) => {
         `http://localhost:5000/api/rosters/${selectedRoster.rosterId}/artists`,
         {
           method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
+          headers: { 'Content-Type': 'application/json', ...authHeaders() },
           body: JSON.stringify({ artistId: artist.artistId })
         }
       );
@@ -225,12 +207,7 @@ const RosterManagement = ({ userId, username }) => {
       
       setMessage(data.message || `Artist "${artist.artistName}" added to roster successfully!`);
       
-      setSelectedRoster({
-        ...selectedRoster,
-        budget: selectedRoster.budget - artist.price
-      });
-      
-      fetchRosterArtists(selectedRoster.rosterId);
+      fetchRosters();
       
       setShowArtistSearch(false);
     } catch (err) {
@@ -293,7 +270,7 @@ const RosterManagement = ({ userId, username }) => {
                   <div className="roster-info">
                     <span className="roster-name">{roster.rosterName}</span>
                     <span className="roster-meta">
-                      {roster.leagueName} • ${roster.budget} • {roster.points} pts
+                      {roster.leagueName} • ${roster.budget} • {roster.points} pts • #{roster.leagueRank} of {roster.leagueSize}
                     </span>
                   </div>
                   <div className="roster-actions">
@@ -331,6 +308,14 @@ const RosterManagement = ({ userId, username }) => {
                   <span className="stat-label">Points:</span>
                   <span className="stat-value">{selectedRoster.points}</span>
                 </div>
+                <div className="stat">
+                  <span className="stat-label">Holdings:</span>
+                  <span className="stat-value">${selectedRoster.totalValue}</span>
+                </div>
+                <div className="stat">
+                  <span className="stat-label">League rank:</span>
+                  <span className="stat-value">{selectedRoster.leagueRank} / {selectedRoster.leagueSize}</span>
+                </div>
               </div>
             </div>
             
@@ -5,10 +5,13 @@ import LeagueManagement from '../components/LeagueManagement';
 import RosterManagement from '../components/RosterManagement';
 import '../App.css';
 
+const PLAYER_PAGE_SIZE = 100;
+
 const Actions = () => {
   const [user, setUser] = useState(null);
   const [activeTab, setActiveTab] = useState('players');
   const [players, setPlayers] = useState([]);
+  const [nextPlayersAfter, setNextPlayersAfter] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const navigate = useNavigate();
@@ -28,7 +31,7 @@ const Actions = () => {
   const fetchPlayers = async () => {
     try {
       setLoading(true);
-      const response = await fetch('http://localhost:5000/api/get_players');
+      const response = await fetch(`http://localhost:5000/api/get_players?limit=${PLAYER_PAGE_SIZE}`);
       
       if (!response.ok) {
         throw new Error('Failed to fetch players');
@@ -36,6 +39,7 @@ const Actions = () => {
       
       const data = await response.json();
       setPlayers(data);
+      setNextPlayersAfter(response.headers.get('X-Next-After'));
     } catch (err) {
       setError('Error fetching players: ' + err.message);
       console.error('Error:', err);
@@ -44,6 +48,27 @@ const Actions = () => {
     }
   };
 
+  const loadMorePlayers = async () => {
+    if (!nextPlayersAfter) return;
+    
+    try {
+      const response = await fetch(
+        `http://localhost:5000/api/get_players?limit=${PLAYER_PAGE_SIZE}&after=${nextPlayersAfter}`
+      );
+      
+      if (!response.ok) {
+        throw new Error('Failed to fetch players');
+      }
+      
+      const data = await response.json();
+      setPlayers(prev => [...prev, ...data]);
+      setNextPlayersAfter(response.headers.get('X-Next-After'));
+    } catch (err) {
+      setError('Error fetching players: ' + err.message);
+      console.error('Error:', err);
+    }
+  };
+
   const handleLogout = () => {
     localStorage.removeItem('user');
     navigate('/');
@@ -95,6 +120,8 @@ const Actions = () => {
               <PlayerList 
                 players={players} 
                 refreshPlayers={fetchPlayers} 
+                hasMore={Boolean(nextPlayersAfter)}
+                loadMore={loadMorePlayers}
               />
             )}
             
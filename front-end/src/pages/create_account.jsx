@@ -40,6 +40,7 @@ const CreateAccount = () => {
         localStorage.setItem('user', JSON.stringify({
           username: username,
           playerId: data.playerId || null,
+          token: data.token,
         }));
         
         setTimeout(() => navigate('/actions'), 1500);
@@ -30,12 +30,13 @@ const Login = () => {
         const body = await res.json().catch(() => ({}));
         throw new Error(body.error || res.statusText);
       }
-      const { player } = await res.json();
+      const { player, token } = await res.json();
 
       localStorage.setItem('user', JSON.stringify({
         username: player.username,
         playerId: player.playerId,
-        playerName: player.playerName
+        playerName: player.playerName,
+        token
       }));
       
       navigate('/actions');
@@ -0,0 +1,323 @@
+-- Baseline for databases created before migrations/ existed. The game clock
+-- version, SettlementRun, the ArtistLatestStats snapshot, the set-based
+-- recompute procedures and the deferrable ArtistStats trigger were first
+-- written into create_database.sql, stored_procedures.sql and triggers.sql,
+-- which only a fresh install runs; later migrations (0004 onwards) build on
+-- them. Everything here is safe to apply to a database that already has
+-- these objects: tables are created if missing, the version column is added
+-- only when absent, and procedures and triggers are replaced.
+CREATE TABLE IF NOT EXISTS ArtistLatestStats (
+    artistId INT PRIMARY KEY,
+    month INT NOT NULL,
+    year INT NOT NULL,
+    listeners INT NOT NULL,
+    followers INT NOT NULL,
+    popularity INT NOT NULL,
+    price INT NOT NULL,
+    FOREIGN KEY (artistId) REFERENCES Artist(artistId) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS SettlementRun (
+    runId INT PRIMARY KEY AUTO_INCREMENT,
+    fromMonth INT NOT NULL,
+    fromYear INT NOT NULL,
+    months INT NOT NULL DEFAULT 1,
+    lastRosterId INT NOT NULL DEFAULT 0,
+    status VARCHAR(10) NOT NULL DEFAULT 'running',
+    startedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_settlement_status (status),
+    CONSTRAINT check_settlement_months CHECK (months >= 1)
+);
+
+-- MySQL has no ADD COLUMN IF NOT EXISTS
+DROP PROCEDURE IF EXISTS AddGameSettingsVersion;
+
+DELIMITER //
+CREATE PROCEDURE AddGameSettingsVersion()
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'GameSettings' AND COLUMN_NAME = 'version'
+    ) THEN
+        ALTER TABLE GameSettings ADD COLUMN version INT NOT NULL DEFAULT 0;
+    END IF;
+END //
+DELIMITER ;
+
+CALL AddGameSettingsVersion();
+DROP PROCEDURE AddGameSettingsVersion;
+
+DROP PROCEDURE IF EXISTS AddArtistToRoster;
+DROP PROCEDURE IF EXISTS RemoveArtistFromRoster;
+DROP PROCEDURE IF EXISTS GetLeagueStandings;
+DROP PROCEDURE IF EXISTS RefreshAllArtistLatestStats;
+DROP PROCEDURE IF EXISTS RefreshArtistLatestStatsForArtists;
+DROP PROCEDURE IF EXISTS CalculateRosterPoints;
+DROP PROCEDURE IF EXISTS UpdateAllRosterPoints;
+DROP PROCEDURE IF EXISTS RecomputeRosterPointsForArtist;
+DROP PROCEDURE IF EXISTS RecomputeRosterPointsForArtists;
+DROP PROCEDURE IF EXISTS RecomputeRosterPointsForPeriod;
+
+DELIMITER //
+CREATE PROCEDURE AddArtistToRoster(IN p_rosterId INT, IN p_artistId INT)
+BEGIN
+    DECLARE artist_price INT;
+    DECLARE current_budget INT;
+    
+    SELECT price INTO artist_price
+    FROM ArtistLatestStats
+    WHERE artistId = p_artistId;
+    
+    SELECT budget INTO current_budget
+    FROM Roster
+    WHERE rosterId = p_rosterId;
+    
+    IF current_budget < artist_price THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Not enough budget to add this artist';
+    END IF;
+    
+    START TRANSACTION;
+    
+    INSERT INTO RosterMember (artistId, rosterId)
+    VALUES (p_artistId, p_rosterId);
+    
+    UPDATE Roster
+    SET budget = budget - artist_price
+    WHERE rosterId = p_rosterId;
+    
+    COMMIT;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE RemoveArtistFromRoster(IN p_rosterId INT, IN p_artistId INT)
+BEGIN
+    DECLARE artist_price INT;
+    
+    SELECT price INTO artist_price
+    FROM ArtistLatestStats
+    WHERE artistId = p_artistId;
+    
+    START TRANSACTION;
+    
+    DELETE FROM RosterMember
+    WHERE rosterId = p_rosterId AND artistId = p_artistId;
+    
+    UPDATE Roster
+    SET budget = budget + (artist_price * 0.7)
+    WHERE rosterId = p_rosterId;
+    
+    COMMIT;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE GetLeagueStandings(IN p_leagueId INT)
+BEGIN
+    -- unique_player_league allows one roster per player, so there is nothing to re-aggregate
+    SELECT r.playerId, p.playerName, r.points as total_points
+    FROM Roster r
+    JOIN Player p ON r.playerId = p.playerId
+    WHERE r.leagueId = p_leagueId
+    ORDER BY r.points DESC, r.rosterId;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE RefreshAllArtistLatestStats()
+BEGIN
+    -- Rebuild the latest-stats snapshot from the full ArtistStats history
+    INSERT INTO ArtistLatestStats (artistId, month, year, listeners, followers, popularity, price)
+    SELECT s.artistId, s.month, s.year, s.listeners, s.followers, s.popularity, s.price
+    FROM ArtistStats s
+    JOIN (
+        SELECT artistId, MAX(year * 12 + month) AS latest
+        FROM ArtistStats
+        GROUP BY artistId
+    ) m ON s.artistId = m.artistId AND s.year * 12 + s.month = m.latest
+    ON DUPLICATE KEY UPDATE
+        ArtistLatestStats.month = VALUES(month),
+        ArtistLatestStats.year = VALUES(year),
+        ArtistLatestStats.listeners = VALUES(listeners),
+        ArtistLatestStats.followers = VALUES(followers),
+        ArtistLatestStats.popularity = VALUES(popularity),
+        ArtistLatestStats.price = VALUES(price);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE RefreshArtistLatestStatsForArtists()
+BEGIN
+    -- Same as RefreshAllArtistLatestStats, limited to the session's RecomputeArtist table
+    INSERT INTO ArtistLatestStats (artistId, month, year, listeners, followers, popularity, price)
+    SELECT s.artistId, s.month, s.year, s.listeners, s.followers, s.popularity, s.price
+    FROM RecomputeArtist ra
+    JOIN ArtistStats s ON s.artistId = ra.artistId
+    WHERE s.year * 12 + s.month = (
+        SELECT MAX(year * 12 + month)
+        FROM ArtistStats
+        WHERE artistId = s.artistId
+    )
+    ON DUPLICATE KEY UPDATE
+        ArtistLatestStats.month = VALUES(month),
+        ArtistLatestStats.year = VALUES(year),
+        ArtistLatestStats.listeners = VALUES(listeners),
+        ArtistLatestStats.followers = VALUES(followers),
+        ArtistLatestStats.popularity = VALUES(popularity),
+        ArtistLatestStats.price = VALUES(price);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE CalculateRosterPoints(IN p_rosterId INT)
+BEGIN
+    -- Score each member on its latest stats; a roster with no priced members scores 0
+    UPDATE Roster r
+    LEFT JOIN (
+        SELECT rm.rosterId,
+               SUM(
+                   (l.listeners / 1000000) +
+                   (l.followers / 1000000) +
+                   (l.popularity * 2)
+               ) AS total_points
+        FROM RosterMember rm
+        JOIN ArtistLatestStats l ON rm.artistId = l.artistId
+        WHERE rm.rosterId = p_rosterId
+        GROUP BY rm.rosterId
+    ) p ON r.rosterId = p.rosterId
+    SET r.points = COALESCE(p.total_points, 0)
+    WHERE r.rosterId = p_rosterId;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE UpdateAllRosterPoints()
+BEGIN
+    -- One pass over every roster instead of a cursor calling CalculateRosterPoints per row
+    CALL RefreshAllArtistLatestStats();
+    
+    UPDATE Roster r
+    LEFT JOIN (
+        SELECT rm.rosterId,
+               SUM(
+                   (l.listeners / 1000000) +
+                   (l.followers / 1000000) +
+                   (l.popularity * 2)
+               ) AS total_points
+        FROM RosterMember rm
+        JOIN ArtistLatestStats l ON rm.artistId = l.artistId
+        GROUP BY rm.rosterId
+    ) p ON r.rosterId = p.rosterId
+    SET r.points = COALESCE(p.total_points, 0);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE RecomputeRosterPointsForArtist(IN p_artistId INT)
+BEGIN
+    -- Every roster holding p_artistId, re-scored in a single statement
+    UPDATE Roster r
+    JOIN (
+        SELECT rm.rosterId,
+               SUM(
+                   (l.listeners / 1000000) +
+                   (l.followers / 1000000) +
+                   (l.popularity * 2)
+               ) AS total_points
+        FROM RosterMember held
+        JOIN RosterMember rm ON rm.rosterId = held.rosterId
+        JOIN ArtistLatestStats l ON rm.artistId = l.artistId
+        WHERE held.artistId = p_artistId
+        GROUP BY rm.rosterId
+    ) p ON r.rosterId = p.rosterId
+    SET r.points = p.total_points;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE RecomputeRosterPointsForArtists()
+BEGIN
+    -- Batch form of RecomputeRosterPointsForArtist for bulk loads run with
+    -- @defer_stats_triggers = 1: refreshes the snapshot for every artist listed in
+    -- the session's RecomputeArtist temporary table, then re-scores every roster
+    -- holding any of them exactly once
+    CALL RefreshArtistLatestStatsForArtists();
+    
+    UPDATE Roster r
+    JOIN (
+        SELECT rm.rosterId,
+               SUM(
+                   (l.listeners / 1000000) +
+                   (l.followers / 1000000) +
+                   (l.popularity * 2)
+               ) AS total_points
+        FROM (
+            SELECT DISTINCT held.rosterId
+            FROM RecomputeArtist ra
+            JOIN RosterMember held ON held.artistId = ra.artistId
+        ) affected
+        JOIN RosterMember rm ON rm.rosterId = affected.rosterId
+        JOIN ArtistLatestStats l ON rm.artistId = l.artistId
+        GROUP BY rm.rosterId
+    ) p ON r.rosterId = p.rosterId
+    SET r.points = p.total_points;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE RecomputeRosterPointsForPeriod(IN p_month INT, IN p_year INT)
+BEGIN
+    -- Whole-month counterpart of RecomputeRosterPointsForArtists: run once after
+    -- loading a month of stats with @defer_stats_triggers = 1
+    DROP TEMPORARY TABLE IF EXISTS RecomputeArtist;
+    CREATE TEMPORARY TABLE RecomputeArtist (artistId INT PRIMARY KEY);
+    
+    INSERT INTO RecomputeArtist (artistId)
+    SELECT artistId
+    FROM ArtistStats
+    WHERE month = p_month AND year = p_year;
+    
+    CALL RecomputeRosterPointsForArtists();
+    
+    DROP TEMPORARY TABLE RecomputeArtist;
+END //
+DELIMITER ;
+
+-- The per-row price_change_monitor computed a value it threw away
+DROP TRIGGER IF EXISTS price_change_monitor;
+DROP TRIGGER IF EXISTS after_artist_stats_update;
+
+DELIMITER //
+CREATE TRIGGER after_artist_stats_update
+AFTER INSERT ON ArtistStats
+FOR EACH ROW
+BEGIN
+    -- Bulk loaders set @defer_stats_triggers = 1 for their session and re-score
+    -- once per batch (RecomputeRosterPointsForArtists / RecomputeRosterPointsForPeriod)
+    IF COALESCE(@defer_stats_triggers, 0) = 0 THEN
+        -- Keep the latest-stats snapshot current before anything re-scores from it
+        IF NOT EXISTS (
+            SELECT 1 FROM ArtistLatestStats
+            WHERE artistId = NEW.artistId
+            AND year * 12 + month > NEW.year * 12 + NEW.month
+        ) THEN
+            INSERT INTO ArtistLatestStats (artistId, month, year, listeners, followers, popularity, price)
+            VALUES (NEW.artistId, NEW.month, NEW.year, NEW.listeners, NEW.followers, NEW.popularity, NEW.price)
+            ON DUPLICATE KEY UPDATE
+                month = NEW.month,
+                year = NEW.year,
+                listeners = NEW.listeners,
+                followers = NEW.followers,
+                popularity = NEW.popularity,
+                price = NEW.price;
+        END IF;
+        
+        CALL RecomputeRosterPointsForArtist(NEW.artistId);
+    END IF;
+END //
+DELIMITER ;
+
+-- Backfill the snapshot from the existing history
+CALL RefreshAllArtistLatestStats();
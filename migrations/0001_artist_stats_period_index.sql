@@ -0,0 +1,4 @@
+-- The legacy advance_month settlement and RecomputeRosterPointsForPeriod filter
+-- ArtistStats by (month, year) across all artists; the (artistId, month, year)
+-- primary key cannot serve that, so every settlement read the whole table.
+ALTER TABLE ArtistStats ADD INDEX idx_artist_stats_period (year, month);
@@ -0,0 +1,4 @@
+-- Standings, the dashboard's league ranks and the in-memory standings loads all
+-- read Roster by leagueId ordered by points. unique_player_league leads with
+-- playerId, so these fell back to the FK index and sorted every league.
+ALTER TABLE Roster ADD INDEX idx_roster_league_points (leagueId, points);
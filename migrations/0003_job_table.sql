@@ -0,0 +1,23 @@
+-- Background jobs for advance_month, owner leave_league and delete_player.
+-- Workers claim queued rows with SKIP LOCKED, so several processes can share
+-- the queue; runAfter delays a retry and updatedAt doubles as the heartbeat
+-- used to requeue jobs whose worker died.
+CREATE TABLE Job (
+    jobId INT PRIMARY KEY AUTO_INCREMENT,
+    kind VARCHAR(32) NOT NULL,
+    params JSON NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'queued',
+    progress INT NOT NULL DEFAULT 0,
+    total INT NULL,
+    result JSON NULL,
+    error TEXT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    maxAttempts INT NOT NULL DEFAULT 3,
+    runAfter TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    startedAt TIMESTAMP NULL,
+    finishedAt TIMESTAMP NULL,
+    updatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_job_status (status, runAfter),
+    CONSTRAINT check_job_attempts CHECK (maxAttempts >= 1)
+);
@@ -0,0 +1,58 @@
+-- Race-free purchase: the budget is reserved by a conditional UPDATE, so the
+-- check and the debit are one step under the roster's row lock, and the
+-- RosterMember insert happens in the same transaction inside one CALL.
+-- AddArtistToRoster read the budget without a lock before updating it, so two
+-- concurrent buys on one roster could both pass the check and overspend.
+DROP PROCEDURE IF EXISTS PurchaseArtist;
+
+DELIMITER //
+CREATE PROCEDURE PurchaseArtist(IN p_rosterId INT, IN p_artistId INT)
+BEGIN
+    DECLARE artist_price INT;
+    DECLARE remaining INT;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    SELECT price INTO artist_price
+    FROM ArtistLatestStats
+    WHERE artistId = p_artistId;
+
+    IF artist_price IS NULL THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Artist not found';
+    END IF;
+
+    -- ROW_COUNT() counts changed rows, so a free artist would look like a failed check
+    IF artist_price > 0 THEN
+        UPDATE Roster
+        SET budget = budget - artist_price
+        WHERE rosterId = p_rosterId AND budget >= artist_price;
+
+        IF ROW_COUNT() = 0 THEN
+            IF EXISTS (SELECT 1 FROM Roster WHERE rosterId = p_rosterId) THEN
+                SIGNAL SQLSTATE '45000'
+                SET MESSAGE_TEXT = 'Not enough budget to add this artist';
+            END IF;
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Roster not found';
+        END IF;
+    END IF;
+
+    -- A duplicate (1062) or a missing roster (1452) rolls the debit back via the handler
+    INSERT INTO RosterMember (artistId, rosterId)
+    VALUES (p_artistId, p_rosterId);
+
+    SELECT budget INTO remaining
+    FROM Roster
+    WHERE rosterId = p_rosterId;
+
+    COMMIT;
+
+    SELECT artist_price AS price, remaining AS budget;
+END //
+DELIMITER ;
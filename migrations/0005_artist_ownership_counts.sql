@@ -0,0 +1,112 @@
+-- How many rosters hold each artist, overall and per league, kept current by
+-- triggers on RosterMember so every add, remove, trade, roster deletion and
+-- player deletion moves the counters inside its own transaction. The most-owned
+-- leaderboards read these rows through the owners indexes instead of grouping
+-- all of RosterMember on every request.
+CREATE TABLE ArtistOwnership (
+    artistId INT PRIMARY KEY,
+    owners INT NOT NULL DEFAULT 0,
+    INDEX idx_artist_ownership_rank (owners DESC, artistId),
+    FOREIGN KEY (artistId) REFERENCES Artist(artistId) ON DELETE CASCADE
+);
+
+CREATE TABLE LeagueArtistOwnership (
+    leagueId INT NOT NULL,
+    artistId INT NOT NULL,
+    owners INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (leagueId, artistId),
+    INDEX idx_league_artist_ownership_rank (leagueId, owners DESC, artistId),
+    FOREIGN KEY (leagueId) REFERENCES League(leagueId) ON DELETE CASCADE,
+    FOREIGN KEY (artistId) REFERENCES Artist(artistId) ON DELETE CASCADE
+);
+
+DROP TRIGGER IF EXISTS after_roster_member_insert;
+DROP TRIGGER IF EXISTS after_roster_member_delete;
+DROP TRIGGER IF EXISTS before_roster_delete;
+DROP PROCEDURE IF EXISTS RebuildArtistOwnership;
+
+DELIMITER //
+CREATE TRIGGER after_roster_member_insert
+AFTER INSERT ON RosterMember
+FOR EACH ROW
+BEGIN
+    -- Bulk loaders set @defer_ownership_triggers = 1 and CALL RebuildArtistOwnership() once
+    IF COALESCE(@defer_ownership_triggers, 0) = 0 THEN
+        INSERT INTO ArtistOwnership (artistId, owners)
+        VALUES (NEW.artistId, 1)
+        ON DUPLICATE KEY UPDATE owners = owners + 1;
+
+        INSERT INTO LeagueArtistOwnership (leagueId, artistId, owners)
+        SELECT leagueId, NEW.artistId, 1
+        FROM Roster
+        WHERE rosterId = NEW.rosterId
+        ON DUPLICATE KEY UPDATE owners = owners + 1;
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER after_roster_member_delete
+AFTER DELETE ON RosterMember
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@defer_ownership_triggers, 0) = 0 THEN
+        UPDATE ArtistOwnership
+        SET owners = owners - 1
+        WHERE artistId = OLD.artistId;
+
+        -- The roster row is still there: every delete path removes members first
+        UPDATE LeagueArtistOwnership lo
+        JOIN Roster r ON r.leagueId = lo.leagueId
+        SET lo.owners = lo.owners - 1
+        WHERE r.rosterId = OLD.rosterId
+        AND lo.artistId = OLD.artistId;
+    END IF;
+END //
+DELIMITER ;
+
+-- Foreign-key cascades do not fire triggers, so a roster deleted while it still
+-- has members takes its members' counts down here, before the cascade removes them
+DELIMITER //
+CREATE TRIGGER before_roster_delete
+BEFORE DELETE ON Roster
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@defer_ownership_triggers, 0) = 0 THEN
+        UPDATE ArtistOwnership ao
+        JOIN RosterMember rm ON rm.artistId = ao.artistId
+        SET ao.owners = ao.owners - 1
+        WHERE rm.rosterId = OLD.rosterId;
+
+        UPDATE LeagueArtistOwnership lo
+        JOIN RosterMember rm ON rm.artistId = lo.artistId
+        SET lo.owners = lo.owners - 1
+        WHERE rm.rosterId = OLD.rosterId
+        AND lo.leagueId = OLD.leagueId;
+    END IF;
+END //
+DELIMITER ;
+
+-- Recounts both tables from RosterMember: the backfill below, after bulk loads,
+-- and a repair if rows were ever removed behind the triggers' back (e.g. a
+-- Player or League deleted directly, which cascades without firing them)
+DELIMITER //
+CREATE PROCEDURE RebuildArtistOwnership()
+BEGIN
+    DELETE FROM LeagueArtistOwnership;
+    DELETE FROM ArtistOwnership;
+
+    INSERT INTO ArtistOwnership (artistId, owners)
+    SELECT artistId, COUNT(*)
+    FROM RosterMember
+    GROUP BY artistId;
+
+    INSERT INTO LeagueArtistOwnership (leagueId, artistId, owners)
+    SELECT r.leagueId, rm.artistId, COUNT(*)
+    FROM RosterMember rm
+    JOIN Roster r ON rm.rosterId = r.rosterId
+    GROUP BY r.leagueId, rm.artistId;
+END //
+DELIMITER ;
+
+CALL RebuildArtistOwnership();
@@ -0,0 +1,5 @@
+-- Which background job registered a settlement run. A job that resumes a run
+-- it did not start (one left behind by another job or by a chunked request)
+-- has finished someone else's advance, not its own, and must not report it
+-- as done. NULL for runs started outside the job queue.
+ALTER TABLE SettlementRun ADD COLUMN jobId INT NULL;
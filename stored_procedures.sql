@@ -1,4 +1,14 @@
-LIMIT 1;
+USE music_fantasy_league;
+
+DELIMITER //
+CREATE PROCEDURE AddArtistToRoster(IN p_rosterId INT, IN p_artistId INT)
+BEGIN
+    DECLARE artist_price INT;
+    DECLARE current_budget INT;
+    
+    SELECT price INTO artist_price
+    FROM ArtistLatestStats
+    WHERE artistId = p_artistId;
     
     SELECT budget INTO current_budget
     FROM Roster
@@ -28,10 +38,8 @@ BEGIN
     DECLARE artist_price INT;
     
     SELECT price INTO artist_price
-    FROM ArtistStats
-    WHERE artistId = p_artistId
-    ORDER BY year DESC, month DESC
-    LIMIT 1;
+    FROM ArtistLatestStats
+    WHERE artistId = p_artistId;
     
     START TRANSACTION;
     
@@ -49,60 +57,171 @@ DELIMITER ;
 DELIMITER //
 CREATE PROCEDURE GetLeagueStandings(IN p_leagueId INT)
 BEGIN
-    SELECT r.playerId, p.playerName, SUM(r.points) as total_points
+    -- unique_player_league allows one roster per player, so there is nothing to re-aggregate
+    SELECT r.playerId, p.playerName, r.points as total_points
     FROM Roster r
     JOIN Player p ON r.playerId = p.playerId
     WHERE r.leagueId = p_leagueId
-    GROUP BY r.playerId, p.playerName
-    ORDER BY total_points DESC;
+    ORDER BY r.points DESC, r.rosterId;
 END //
 DELIMITER ;
 
 DELIMITER //
-CREATE PROCEDURE CalculateRosterPoints(IN p_rosterId INT)
+CREATE PROCEDURE RefreshAllArtistLatestStats()
 BEGIN
-    DECLARE total_points INT DEFAULT 0;
-    
-    SELECT SUM(
-        (s.listeners / 1000000) +
-        (s.followers / 1000000) +
-        (s.popularity * 2)
-    ) INTO total_points
-    FROM RosterMember rm
-    JOIN ArtistStats s ON rm.artistId = s.artistId
-    WHERE rm.rosterId = p_rosterId
-    AND (s.year, s.month) IN (
-        SELECT MAX(year), MAX(month)
+    -- Rebuild the latest-stats snapshot from the full ArtistStats history
+    INSERT INTO ArtistLatestStats (artistId, month, year, listeners, followers, popularity, price)
+    SELECT s.artistId, s.month, s.year, s.listeners, s.followers, s.popularity, s.price
+    FROM ArtistStats s
+    JOIN (
+        SELECT artistId, MAX(year * 12 + month) AS latest
         FROM ArtistStats
-        WHERE artistId = s.artistId
         GROUP BY artistId
-    );
-    
-    UPDATE Roster
-    SET points = total_points
-    WHERE rosterId = p_rosterId;
+    ) m ON s.artistId = m.artistId AND s.year * 12 + s.month = m.latest
+    ON DUPLICATE KEY UPDATE
+        ArtistLatestStats.month = VALUES(month),
+        ArtistLatestStats.year = VALUES(year),
+        ArtistLatestStats.listeners = VALUES(listeners),
+        ArtistLatestStats.followers = VALUES(followers),
+        ArtistLatestStats.popularity = VALUES(popularity),
+        ArtistLatestStats.price = VALUES(price);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE RefreshArtistLatestStatsForArtists()
+BEGIN
+    -- Same as RefreshAllArtistLatestStats, limited to the session's RecomputeArtist table
+    INSERT INTO ArtistLatestStats (artistId, month, year, listeners, followers, popularity, price)
+    SELECT s.artistId, s.month, s.year, s.listeners, s.followers, s.popularity, s.price
+    FROM RecomputeArtist ra
+    JOIN ArtistStats s ON s.artistId = ra.artistId
+    WHERE s.year * 12 + s.month = (
+        SELECT MAX(year * 12 + month)
+        FROM ArtistStats
+        WHERE artistId = s.artistId
+    )
+    ON DUPLICATE KEY UPDATE
+        ArtistLatestStats.month = VALUES(month),
+        ArtistLatestStats.year = VALUES(year),
+        ArtistLatestStats.listeners = VALUES(listeners),
+        ArtistLatestStats.followers = VALUES(followers),
+        ArtistLatestStats.popularity = VALUES(popularity),
+        ArtistLatestStats.price = VALUES(price);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE CalculateRosterPoints(IN p_rosterId INT)
+BEGIN
+    -- Score each member on its latest stats; a roster with no priced members scores 0
+    UPDATE Roster r
+    LEFT JOIN (
+        SELECT rm.rosterId,
+               SUM(
+                   (l.listeners / 1000000) +
+                   (l.followers / 1000000) +
+                   (l.popularity * 2)
+               ) AS total_points
+        FROM RosterMember rm
+        JOIN ArtistLatestStats l ON rm.artistId = l.artistId
+        WHERE rm.rosterId = p_rosterId
+        GROUP BY rm.rosterId
+    ) p ON r.rosterId = p.rosterId
+    SET r.points = COALESCE(p.total_points, 0)
+    WHERE r.rosterId = p_rosterId;
 END //
 DELIMITER ;
 
 DELIMITER //
 CREATE PROCEDURE UpdateAllRosterPoints()
 BEGIN
-    DECLARE done INT DEFAULT 0;
-    DECLARE roster_id INT;
-    DECLARE cur CURSOR FOR SELECT rosterId FROM Roster;
-    DECLARE CONTINUE HANDLER FOR NOT FOUND SET done = 1;
-    
-    OPEN cur;
-    
-    roster_loop: LOOP
-        FETCH cur INTO roster_id;
-        IF done THEN
-            LEAVE roster_loop;
-        END IF;
-        
-        CALL CalculateRosterPoints(roster_id);
-    END LOOP;
-    
-    CLOSE cur;
+    -- One pass over every roster instead of a cursor calling CalculateRosterPoints per row
+    CALL RefreshAllArtistLatestStats();
+    
+    UPDATE Roster r
+    LEFT JOIN (
+        SELECT rm.rosterId,
+               SUM(
+                   (l.listeners / 1000000) +
+                   (l.followers / 1000000) +
+                   (l.popularity * 2)
+               ) AS total_points
+        FROM RosterMember rm
+        JOIN ArtistLatestStats l ON rm.artistId = l.artistId
+        GROUP BY rm.rosterId
+    ) p ON r.rosterId = p.rosterId
+    SET r.points = COALESCE(p.total_points, 0);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE RecomputeRosterPointsForArtist(IN p_artistId INT)
+BEGIN
+    -- Every roster holding p_artistId, re-scored in a single statement
+    UPDATE Roster r
+    JOIN (
+        SELECT rm.rosterId,
+               SUM(
+                   (l.listeners / 1000000) +
+                   (l.followers / 1000000) +
+                   (l.popularity * 2)
+               ) AS total_points
+        FROM RosterMember held
+        JOIN RosterMember rm ON rm.rosterId = held.rosterId
+        JOIN ArtistLatestStats l ON rm.artistId = l.artistId
+        WHERE held.artistId = p_artistId
+        GROUP BY rm.rosterId
+    ) p ON r.rosterId = p.rosterId
+    SET r.points = p.total_points;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE RecomputeRosterPointsForArtists()
+BEGIN
+    -- Batch form of RecomputeRosterPointsForArtist for bulk loads run with
+    -- @defer_stats_triggers = 1: refreshes the snapshot for every artist listed in
+    -- the session's RecomputeArtist temporary table, then re-scores every roster
+    -- holding any of them exactly once
+    CALL RefreshArtistLatestStatsForArtists();
+    
+    UPDATE Roster r
+    JOIN (
+        SELECT rm.rosterId,
+               SUM(
+                   (l.listeners / 1000000) +
+                   (l.followers / 1000000) +
+                   (l.popularity * 2)
+               ) AS total_points
+        FROM (
+            SELECT DISTINCT held.rosterId
+            FROM RecomputeArtist ra
+            JOIN RosterMember held ON held.artistId = ra.artistId
+        ) affected
+        JOIN RosterMember rm ON rm.rosterId = affected.rosterId
+        JOIN ArtistLatestStats l ON rm.artistId = l.artistId
+        GROUP BY rm.rosterId
+    ) p ON r.rosterId = p.rosterId
+    SET r.points = p.total_points;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE RecomputeRosterPointsForPeriod(IN p_month INT, IN p_year INT)
+BEGIN
+    -- Whole-month counterpart of RecomputeRosterPointsForArtists: run once after
+    -- loading a month of stats with @defer_stats_triggers = 1
+    DROP TEMPORARY TABLE IF EXISTS RecomputeArtist;
+    CREATE TEMPORARY TABLE RecomputeArtist (artistId INT PRIMARY KEY);
+    
+    INSERT INTO RecomputeArtist (artistId)
+    SELECT artistId
+    FROM ArtistStats
+    WHERE month = p_month AND year = p_year;
+    
+    CALL RecomputeRosterPointsForArtists();
+    
+    DROP TEMPORARY TABLE RecomputeArtist;
 END //
 DELIMITER ;
\ No newline at end of file
@@ -5,26 +5,28 @@ CREATE TRIGGER after_artist_stats_update
 AFTER INSERT ON ArtistStats
 FOR EACH ROW
 BEGIN
-    DECLARE done INT DEFAULT 0;
-    DECLARE roster_id INT;
-    DECLARE cur CURSOR FOR 
-        SELECT rm.rosterId 
-        FROM RosterMember rm 
-        WHERE rm.artistId = NEW.artistId;
-    DECLARE CONTINUE HANDLER FOR NOT FOUND SET done = 1;
-    
-    OPEN cur;
-    
-    roster_loop: LOOP
-        FETCH cur INTO roster_id;
-        IF done THEN
-            LEAVE roster_loop;
+    -- Bulk loaders set @defer_stats_triggers = 1 for their session and re-score
+    -- once per batch (RecomputeRosterPointsForArtists / RecomputeRosterPointsForPeriod)
+    IF COALESCE(@defer_stats_triggers, 0) = 0 THEN
+        -- Keep the latest-stats snapshot current before anything re-scores from it
+        IF NOT EXISTS (
+            SELECT 1 FROM ArtistLatestStats
+            WHERE artistId = NEW.artistId
+            AND year * 12 + month > NEW.year * 12 + NEW.month
+        ) THEN
+            INSERT INTO ArtistLatestStats (artistId, month, year, listeners, followers, popularity, price)
+            VALUES (NEW.artistId, NEW.month, NEW.year, NEW.listeners, NEW.followers, NEW.popularity, NEW.price)
+            ON DUPLICATE KEY UPDATE
+                month = NEW.month,
+                year = NEW.year,
+                listeners = NEW.listeners,
+                followers = NEW.followers,
+                popularity = NEW.popularity,
+                price = NEW.price;
         END IF;
         
-        CALL CalculateRosterPoints(roster_id);
-    END LOOP;
-    
-    CLOSE cur;
+        CALL RecomputeRosterPointsForArtist(NEW.artistId);
+    END IF;
 END //
 DELIMITER ;
 
@@ -65,24 +67,7 @@ BEGIN
 END //
 DELIMITER ;
 
-DELIMITER //
-CREATE TRIGGER price_change_monitor
-AFTER INSERT ON ArtistStats
-FOR EACH ROW
-BEGIN
-    DECLARE old_price INT;
-    DECLARE price_change DECIMAL(10,2);
-    
-    SELECT price INTO old_price
-    FROM ArtistStats
-    WHERE artistId = NEW.artistId
-    AND ((year = NEW.year AND month = NEW.month - 1) OR 
-         (year = NEW.year - 1 AND month = 12 AND NEW.month = 1))
-    ORDER BY year DESC, month DESC
-    LIMIT 1;
-    
-    IF old_price IS NOT NULL THEN
-        SET price_change = ((NEW.price - old_price) / old_price) * 100;
-    END IF;
-END //
-DELIMITER ;
\ No newline at end of file
+-- Month-over-month price change is computed for every artist at once by
+-- back-end/analytics.py; the old per-row price_change_monitor trigger only
+-- computed it to throw it away
+DROP TRIGGER IF EXISTS price_change_monitor;